@@ -1,7 +1,10 @@
-import json
 import os
 import sys
 
+import catalog
+import jsoncodec
+import jsonl
+
 def interactive_mode():
     def show_menu():
         """Display main menu and get user choice"""
@@ -17,26 +20,15 @@ def interactive_mode():
                 return choice
             print("Nepareiza ievade! Lūdzu ievadi 1, 2, 3 vai 4")
 
+    json_catalog = catalog.FileCatalog()  #kešots starp izvēlnes darbībām
+
     def get_json_files():
         """Get list of JSON files in current directory"""
-        return [f for f in os.listdir() if f.endswith('.json')]
+        return json_catalog.names()
 
     def select_files(files, action):
-        """Let user select files for action"""
-        print(f"\nPieejamie JSON faili ({len(files)}):")
-        for i, f in enumerate(files, 1):
-            print(f"{i}. {f}")
-        
-        print(f"\nIzvēlies failus ko {action} (piem., '1 3 4') vai 'visu'")
-        while True:
-            choice = input("> ").strip().lower()
-            if choice == 'visu':
-                return files
-            try:
-                selected = [files[int(i)-1] for i in choice.split()]
-                return selected
-            except (ValueError, IndexError):
-                print("Kļūda! Ievadiet vēlreiz")
+        """Let user select files for action (pa lapām, ar filtru)"""
+        return catalog.choose(json_catalog, f"Izvēlies failus ko {action} (piem., '1 3 4')", multiple=True) or []
 
     def create_json():
         """Creates an empty JSON file with user-specified name"""
@@ -60,7 +52,7 @@ def interactive_mode():
             # Create the file
             try:
                 with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump({}, f, indent=4, ensure_ascii=False)
+                    jsoncodec.dump({}, f, indent=4)
                 print(f"Veiksmīgi izveidots: {filename}")
                 return
             except Exception as e:
@@ -81,21 +73,28 @@ def interactive_mode():
             return
         
         output_file = input("\nIevadi izvades faila nosaukumu (default: merged.json): ").strip() or "merged.json"
-        if not output_file.endswith('.json'):
+        if not output_file.endswith(('.json',) + jsonl.JSONL_EXTENSIONS):
             output_file += '.json'
-        
-        combined = []
-        for file in selected:
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    combined.append(json.load(f))
-                print(f"✓ {file}")
-            except Exception as e:
-                print(f"✕ Kļūda lasot {file}: {e}")
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(combined, f, indent=2, ensure_ascii=False)
-        print(f"\nVeiksmīgi apvienoti {len(combined)} faili uz {output_file}")
+
+        def load_selected():
+            for file in selected:
+                try:
+                    with open(file, 'r', encoding='utf-8') as f:
+                        data = jsoncodec.load(f)
+                    print(f"✓ {file}")
+                    yield data
+                except Exception as e:
+                    print(f"✕ Kļūda lasot {file}: {e}")
+
+        if jsonl.is_jsonl(output_file):
+            # Katrs fails kļūst par vienu rindu - atmiņā vienlaikus ir tikai viens fails
+            count = jsonl.write_jsonl(output_file, load_selected())
+        else:
+            combined = list(load_selected())
+            with open(output_file, 'w', encoding='utf-8') as f:
+                jsoncodec.dump(combined, f, indent=2)
+            count = len(combined)
+        print(f"\nVeiksmīgi apvienoti {count} faili uz {output_file}")
 
     def delete_files():
         """Delete selected JSON files"""
@@ -121,7 +120,7 @@ def interactive_mode():
         deleted = 0
         for file in selected:
             try:
-                os.remove(file)
+                json_catalog.remove(file)
                 print(f"izdzēsts {file}")
                 deleted += 1
             except Exception as e:
@@ -1,87 +1,335 @@
 #!/usr/bin/env python3
 import argparse
-import json
 import os
 import sys
+import tempfile
+import unittest
 from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from unittest import mock
 
-def merge_json(a, b):
+import catalog
+import incremental
+import jsoncodec
+import jsondiff
+import locking
+import query_index
+import stats as metrics
+from atomic_write import DURABILITY_LEVELS, write_json_atomic
+from mmap_load import load_file
+from policies import PolicyError, compile_policy
+from struct_hash import freeze
+
+MERGE_MODES = ("copy", "inplace", "share")
+
+def merge_json(a, b, mode="copy", _memo=None, policy=None):
     """
     Rekursīvi apvieno divus JSON objektus/dictionaries.
     - Dziļi apvieno vārdnīcas
     - Apvieno sarakstus, izvairoties no dublikātiem
     - Saglabā esošos datus, ja struktūras nesakrīt
+
+    mode nosaka, kā tiek veidots rezultāts:
+    - "copy": katrs apstaigātais konteiners tiek nokopēts (noklusējums)
+    - "inplace": `a` tiek mainīts uz vietas, bez kopijām
+    - "share": kopē tikai tos konteinerus, kas mainās; nemainītie apakškoki paliek
+      kopīgi ar ievadi (ja nekas nemainās, atgriež pašu `a`)
+
+    policy: konfliktu politika (policies.py - dict, ceļš vai Policy); tad vērtības apvieno
+    pēc tās noteikumiem, mode netiek ņemts vērā (rezultāts dala nemainītos apakškokus kā "share").
     """
+    if policy is not None:
+        return compile_policy(policy).merge(a, b)
+    if _memo is None:
+        _memo = {}  #strukturālo hash kešs visai rekursijai
     if isinstance(a, MutableMapping) and isinstance(b, MutableMapping):
-        result = a.copy()
+        result = a if mode == "inplace" else a.copy() if mode == "copy" else None
         for key, value in b.items():
-            if key in result:
-                result[key] = merge_json(result[key], value)
+            if key in a:
+                merged = merge_json(a[key], value, mode, _memo)
+                if merged is a[key]:
+                    continue  #nekas nav mainījies
             else:
-                result[key] = value
-        return result
+                merged = value
+            if result is None:
+                result = a.copy()  #copy-on-write: pirmā izmaiņa šajā līmenī
+            result[key] = merged
+        return a if result is None else result
     elif isinstance(a, list) and isinstance(b, list):
-        # Pārbauda dublikātus pēc satura (nevis atsauces)
-        existing = {json.dumps(item, sort_keys=True) for item in a}
-        combined = a.copy()
+        # Pārbauda dublikātus pēc satura (nevis atsauces) ar strukturālo hash
+        existing = {freeze(item, _memo) for item in a}
+        combined = a if mode == "inplace" else a.copy() if mode == "copy" else None
         for item in b:
-            if json.dumps(item, sort_keys=True) not in existing:
+            if freeze(item, _memo) not in existing:
+                if combined is None:
+                    combined = a.copy()
                 combined.append(item)
-        return combined
+        return a if combined is None else combined
     else:
         # Saglabā esošos datus, ja tipi nesakrīt
         return a if a is not None else b
 
+class InputError(Exception):
+    """Ievades failu nevarēja nolasīt vai parsēt."""
+
+
+def _read_input(path, old_tree=None, use_incremental=False):
+    """Nolasa vienu ievadi; inkrementālajā režīmā atgriež tikai mainītos apakškokus un hash koku."""
+    try:
+        data = load_file(path)  #lieli faili tiek parsēti tieši no mmap
+    except Exception as e:
+        raise InputError(f"Nevarēja nolasīt {path}: {str(e)}") from e
+    if not use_incremental:
+        return data, None
+    tree = incremental.subtree_hashes(data)
+    return incremental.changed_part(data, tree, old_tree), tree
+
+
+def _read_chunk(tasks):
+    """Procesa pūla darbs: nolasa un parsē gabala ievades + šī procesa mērījumi (galvenajā procesā tos pieskaita)."""
+    worker_stats = metrics.Stats()
+    with metrics.activate(worker_stats):
+        read = [_read_input(*task) for task in tasks]
+    return read, worker_stats.report()
+
+
+def read_inputs(tasks, jobs=1):
+    """
+    Nolasa ievades secībā, ģenerē (dati, hash koks). Ja jobs > 1, ievades sadala secīgos
+    gabalos, kurus nolasa un parsē atsevišķi procesi; rezultāti tiek atdoti ievades secībā.
+    """
+    if jobs <= 1 or len(tasks) < 2:
+        for task in tasks:
+            yield _read_input(*task)
+        return
+    jobs = min(jobs, len(tasks))
+    size = -(-len(tasks) // jobs)
+    chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        for read, report in pool.map(_read_chunk, chunks):
+            metrics.current().absorb(report)  #procesu posmu laiki tiek summēti (pārklājas laikā)
+            yield from read
+
+
+def merge_inputs(tasks, jobs=1, base=None, mode="inplace"):
+    """
+    Apvieno ievades secībā (kreisā salocīšana), katru failu parsējot tikai vienreiz.
+    tasks: saraksts ar (ceļš, iepriekšējais hash koks, inkrementāls?).
+    base: sākuma vērtība (piem. esošā izvade); rezultāts ir tāds pats kā pēc kārtas katrai
+    ievadei izsaucot merge_json(rezultāts, ievade, mode). Tikko nolasītās ievades pieder tikai
+    šai funkcijai, tāpēc bez `base` tās droši apvieno "inplace".
+    merge_json nav asociatīvs (ja tipi nesakrīt, paliek kreisā vērtība), tāpēc ar jobs > 1
+    paralēli tiek tikai nolasīti un parsēti faili (read_inputs), apvienošana vienmēr ir secīga.
+    """
+    result, trees = base, []
+    stats = metrics.current()
+    for data, tree in read_inputs(tasks, jobs):
+        with stats.stage("merge"):
+            result = data if result is None else merge_json(result, data, mode)
+        trees.append(tree)
+    stats.add("inputs", len(tasks))
+    return result, trees
+
+
+def _output_indent(args):
+    """Kompakta izvade (bez atstarpēm) failiem, kurus lasa tikai programmas."""
+    return None if getattr(args, "compact", False) else 4
+
+
+def _report_diff(args, before, after):
+    """
+    Ja prasīts (--diff), saglabā JSON Patch starp veco un jauno izvadi.
+    Atgriež False, ja fails nav jāraksta (--dry-run).
+    """
+    if getattr(args, "diff", None):
+        with metrics.current().stage("diff"):
+            patch = jsondiff.diff(before, after)
+        if args.diff == "-":
+            print(jsoncodec.dumps(patch))
+        else:
+            write_json_atomic(args.diff, patch, "none")
+        print(f"IZMAIŅAS: {len(patch)} operācijas ({args.output})")
+    if getattr(args, "dry_run", False):
+        print(f"SAUSAIS PALAIDIENS: {args.output} netika mainīts")
+        return False
+    return True
+
+
 def process_command_line(args):
     """Apstrādā komandrindas argumentus"""
+    inputs = args.input if isinstance(args.input, list) else [args.input]
+    inputs_label = ", ".join(inputs)
     # Validācija pirms apstrādes
-    if not os.path.exists(args.input):
-        print(f"KĻŪDA: Ievades fails {args.input} neeksistē!")
-        sys.exit(1)
+    for path in inputs:
+        if not os.path.exists(path):
+            print(f"KĻŪDA: Ievades fails {path} neeksistē!")
+            sys.exit(1)
+
+    apply_batch = partial(_apply_queue_batch, args)
+    if getattr(args, "queue", False):
+        # Rindas režīms: ievade tiek pierakstīta <output>.queue, izvadi raksta tas, kurš tur slēdzeni
+        operation = args.operation.lower()
+        tasks = [(path, None, False) for path in inputs]
+        durability = getattr(args, "durability", "fsync")
+        try:
+            if operation == "merge":
+                #katra ievade savs ieraksts: rindas apstrāde sakrīt ar secīgiem palaidieniem
+                entries = [data for data, _ in read_inputs(tasks, getattr(args, "jobs", 1) or 1)]
+            else:
+                entries = [merge_inputs(tasks, getattr(args, "jobs", 1) or 1)[0]]
+            for data in entries[:-1]:
+                locking.enqueue(args.output, {"operation": operation, "data": data}, durability)
+            applied = locking.submit(args.output, {"operation": operation, "data": entries[-1]},
+                                     apply_batch, durability)
+        except InputError as e:
+            print(f"KĻŪDA: {str(e)}")
+            sys.exit(1)
+        except Exception as e:
+            print(f"KĻŪDA: Nevarēja saglabāt {args.output}: {str(e)}")
+            sys.exit(1)
+        if applied is None:
+            print(f"IEVIETOTS RINDĀ: {inputs_label} → {args.output} (ierakstīs process, kas tur slēdzeni)")
+        else:
+            print(f"RINDA APSTRĀDĀTA ({applied} ieraksti): {inputs_label} → {args.output}")
+        return
 
+    # Slēdzene: vienlaicīgi palaidieni ar to pašu izvadi nepazaudē viens otra izmaiņas
+    with locking.FileLock(args.output):
+        _process_locked(args, inputs, inputs_label)
     try:
-        with open(args.input, "r", encoding="utf-8") as f:
-            data_input = json.load(f)
+        locking.drain(args.output, apply_batch)  #ieraksti, ko rindā ielika, kamēr turējām slēdzeni
     except Exception as e:
-        print(f"KĻŪDA: Nevarēja nolasīt {args.input}: {str(e)}")
+        print(f"KĻŪDA: Nevarēja apstrādāt {locking.queue_path(args.output)}: {str(e)}")
         sys.exit(1)
 
+
+def _apply_queue_batch(args, entries):
+    """Visa rindas partija vienā nolasīšanā-apvienošanā-ierakstīšanā (izsauc ar izvades slēdzeni)."""
+    data = None
+    if os.path.exists(args.output):
+        try:
+            data = load_file(args.output)
+        except Exception as e:
+            print(f"Brīdinājums: Nevarēja ielādēt {args.output}: {str(e)}")
+            print("Turpinām ar tukšu bāzi...")
+    for entry in entries:
+        if entry["operation"] == "overwrite":
+            data = entry["data"]
+        else:
+            with metrics.current().stage("merge"):
+                data = merge_json(data if data is not None else {}, entry["data"], "inplace")
+    write_json_atomic(args.output, data, getattr(args, "durability", "fsync"), _output_indent(args))
+    _update_index(args)
+
+
+def _update_index(args):
+    """Vaicājumu indekss (--index vai jau esošs <output>.idx.json) seko izvadei."""
+    try:
+        query_index.refresh_if_present(args.output, getattr(args, "index", False))
+    except (OSError, ValueError) as e:
+        print(f"Brīdinājums: Nevarēja atjaunot {query_index.index_path(args.output)}: {str(e)}")
+
+
+def _combine_inputs(args, tasks, base=None, mode="inplace"):
+    """Ievades (pēc `base`, ja dots) apvienotas secībā vai pēc --policy; kļūdas gadījumā iziet."""
+    try:
+        if getattr(args, "policy", None):
+            # Politika: visas versijas (izvade + ievades) tiek apvienotas vienā piegājienā
+            policy = compile_policy(args.policy)
+            read = [_read_input(*task) for task in tasks]
+            versions = ([] if base is None else [base]) + [data for data, _ in read]
+            with metrics.current().stage("merge"):
+                return policy.reduce(versions), [tree for _, tree in read]
+        return merge_inputs(tasks, getattr(args, "jobs", 1) or 1, base=base, mode=mode)
+    except (InputError, PolicyError) as e:
+        print(f"KĻŪDA: {str(e)}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"KĻŪDA: Nevarēja ielādēt politiku {args.policy}: {str(e)}")
+        sys.exit(1)
+
+
+def _process_locked(args, inputs, inputs_label):
+    # Tikai norādītie apakškoki: pārējā izvades faila daļa netiek parsēta, tikai nokopēta
+    if getattr(args, "paths", None):
+        from partial_merge import merge_file_paths  #importē šeit, jo partial_merge izmanto merge_json no šī faila
+        try:
+            changed = merge_file_paths(inputs, args.output, args.paths, args.operation.lower(),
+                                       getattr(args, "merge_mode", "copy"), getattr(args, "durability", "fsync"),
+                                       _output_indent(args))
+        except Exception as e:
+            print(f"KĻŪDA: Neizdevās apvienot ceļus {', '.join(args.paths)}: {str(e)}")
+            sys.exit(1)
+        print(f"CEĻI APSTRĀDĀTI ({changed}): {inputs_label} → {args.output}")
+        _update_index(args)
+        return
+
+    # Inkrementālais režīms: ievades, kas nav mainījušās kopš pēdējās reizes, tiek izlaistas
+    #ar politiku vienmēr pilna apvienošana (main() šo kombināciju noraida)
+    use_incremental = (args.operation.lower() == "merge" and getattr(args, "incremental", False)
+                       and not getattr(args, "policy", None))
+    fingerprints = {}
+    if use_incremental:
+        manifest = incremental.load_manifest(args.output)
+        for path in inputs:
+            fingerprint = incremental.input_fingerprint(manifest, path)
+            if fingerprint is not None:
+                fingerprints[path] = fingerprint
+        if not fingerprints:
+            print(f"BEZ IZMAIŅĀM: {inputs_label} jau ir apvienots ar {args.output}")
+            return
+        tasks = [(path, incremental.previous_subtrees(manifest, path), True) for path in fingerprints]
+    else:
+        tasks = [(path, None, False) for path in inputs]
+
     if args.operation.lower() == "merge":
         # Ielādē esošos datus, ja fails eksistē
         data_output = {}
         if os.path.exists(args.output):
             try:
-                with open(args.output, "r", encoding="utf-8") as f:
-                    data_output = json.load(f)
+                data_output = load_file(args.output)
             except Exception as e:
                 print(f"Brīdinājums: Nevarēja ielādēt {args.output}: {str(e)}")
                 print("Turpinām ar tukšu bāzi...")
         
-        merged = merge_json(data_output, data_input)
+        merge_mode = getattr(args, "merge_mode", "copy")
+        if getattr(args, "diff", None) and merge_mode == "inplace":
+            merge_mode = "share"  #diff vajag neskartu veco versiju
+        #ievades tiek apvienotas ar izvadi pa vienai, tāpat kā secīgos palaidienos
+        merged, trees = _combine_inputs(args, tasks, data_output, merge_mode)
+        if not _report_diff(args, data_output, merged):
+            return
         
         try:
-            with open(args.output, "w", encoding="utf-8") as f:
-                json.dump(merged, f, indent=4, ensure_ascii=False) #f=izvelata faila obj
-                f.flush()  # Piespiež rakstīšanu buferī
-                os.fsync(f.fileno())  # Piespiež rakstīšanu diskā
-            print(f"APVIENOŠANA VEIKSMĪGA: {args.input} uz {args.output}")
+            # Raksta pagaidu failā un atomāri pārsauc, lai avārija neatstātu bojātu failu
+            write_json_atomic(args.output, merged, getattr(args, "durability", "fsync"), _output_indent(args))
+            print(f"APVIENOŠANA VEIKSMĪGA: {inputs_label} uz {args.output}")
+            if use_incremental:
+                for (path, _old_tree, _), tree in zip(tasks, trees):
+                    incremental.record_input(manifest, path, fingerprints[path], tree)
+                incremental.save_manifest(args.output, manifest)
         except Exception as e:
             print(f"KĻŪDA: Nevarēja saglabāt {args.output}: {str(e)}")
             sys.exit(1)
+        _update_index(args)
 
     elif args.operation.lower() == "overwrite":
-        # PILNĪGA PĀRRAKSTĪŠANA ar papildu validāciju
+        # PILNĪGA PĀRRAKSTĪŠANA ar papildu validāciju (vairākas ievades vispirms tiek apvienotas)
+        data_input, _ = _combine_inputs(args, tasks)
         try:
             # Pārbauda, vai ievade ir derīgs JSON objekts
             if not isinstance(data_input, (dict, list)):
                 print("KĻŪDA: Ievadei jābūt JSON objektam vai masīvam!")
                 sys.exit(1)
+
+            if getattr(args, "diff", None) or getattr(args, "dry_run", False):
+                data_output = load_file(args.output) if os.path.exists(args.output) else None
+                if not _report_diff(args, data_output, data_input):
+                    return
                 
-            with open(args.output, "w", encoding="utf-8", errors="strict") as f:
-                json.dump(data_input, f, indent=4, ensure_ascii=False)
-                f.flush()
-                os.fsync(f.fileno())
-            print(f"PĀRRAKSTĪŠANA VEIKSMĪGA: {args.input} → {args.output}")
+            write_json_atomic(args.output, data_input, getattr(args, "durability", "fsync"), _output_indent(args))
+            print(f"PĀRRAKSTĪŠANA VEIKSMĪGA: {inputs_label} → {args.output}")
             
             # Pārbauda, vai fails faktiski tika ierakstīts
             if os.path.getsize(args.output) == 0:
@@ -89,14 +337,15 @@ def process_command_line(args):
         except Exception as e:
             print(f"KĻŪDA: Neizdevās pārrakstīt {args.output}: {str(e)}")
             sys.exit(1)
+        _update_index(args)
 
-def list_json_files():
-    """Atgriež .json failu sarakstu pašreizējā direktorijā"""
-    return [f for f in os.listdir(".") 
-            if f.endswith(".json") and os.path.isfile(f)]
+def list_json_files(json_catalog=None):
+    """Atgriež .json failu sarakstu pašreizējā direktorijā (katalogs nepārskata nemainītu direktoriju)"""
+    return (json_catalog or catalog.FileCatalog()).names()
 
 def interactive_mode():
     """Interaktīvais režīms"""
+    json_catalog = catalog.FileCatalog()  #viens katalogs visai sesijai - metadati tiek kešoti
     while True:
         print("\n=== JSON RĪKS ===")
         print("1. Izveidot JSON")
@@ -107,11 +356,8 @@ def interactive_mode():
         choice = input("Izvēle (1-4): ").strip()
         
         if choice == "1":
-            files = list_json_files()
-            if files:
-                print("\nEsošie faili:")
-                for i, f in enumerate(files, 1):
-                    print(f"{i}. {f}")
+            if list_json_files(json_catalog):
+                catalog.print_page(json_catalog)  #tikai pirmā lapa
                     
             filename = input("\nJauna faila nosaukums: ").strip()
             if not filename.endswith(".json"):
@@ -119,57 +365,46 @@ def interactive_mode():
                 
             try:
                 content = input("JSON saturs (tukšs = {}): ").strip() or "{}"
-                data = json.loads(content)
+                data = jsoncodec.loads(content)
                 with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4)
+                    jsoncodec.dump(data, f, ensure_ascii=True)
                 print(f"Fails {filename} izveidots!")
             except Exception as e:
                 print(f"Kļūda: {str(e)}")
 
         elif choice == "2":
-            files = list_json_files()
-            if len(files) < 2:
+            if len(list_json_files(json_catalog)) < 2:
                 print("Nepietiek failu!")
                 continue
                 
-            print("\nPieejamie faili:")
-            for i, f in enumerate(files, 1):
-                print(f"{i}. {f}")
-                
             try:
-                src_idx = int(input("Izvēlies avota failu (nr): ")) - 1
-                dst_idx = int(input("Izvēlies mērķa failu (nr): ")) - 1
-                src_file = files[src_idx]
-                dst_file = files[dst_idx]
+                src_file = catalog.choose(json_catalog, "Izvēlies avota failu")
+                dst_file = src_file and catalog.choose(json_catalog, "Izvēlies mērķa failu")
+                if not dst_file:
+                    continue
                 
                 with open(src_file, "r", encoding="utf-8") as f:
-                    src_data = json.load(f)
+                    src_data = jsoncodec.load(f)
                 with open(dst_file, "r", encoding="utf-8") as f:
-                    dst_data = json.load(f)
+                    dst_data = jsoncodec.load(f)
                     
                 merged = merge_json(dst_data, src_data)
                 
                 with open(dst_file, "w", encoding="utf-8") as f:
-                    json.dump(merged, f, indent=4)
+                    jsoncodec.dump(merged, f, ensure_ascii=True)
                 print("Apvienošana veiksmīga!")
             except Exception as e:
                 print(f"Kļūda: {str(e)}")
 
         elif choice == "3":
-            files = list_json_files()
-            if not files:
+            if not list_json_files(json_catalog):
                 print("Nav failu!")
                 continue
                 
-            print("\nPieejamie faili:")
-            for i, f in enumerate(files, 1):
-                print(f"{i}. {f}")
-                
             try:
-                del_idx = int(input("Izvēlies dzēšamo failu (nr): ")) - 1
-                target = files[del_idx]
-                if input(f"Dzēst {target}? (jā/nē): ").lower() == "jā":
-                    os.remove(target)
+                target = catalog.choose(json_catalog, "Izvēlies dzēšamo failu")
+                if target and input(f"Dzēst {target}? (jā/nē): ").lower() == "jā":
+                    json_catalog.remove(target)
                     print("Fails dzēsts!")
             except Exception as e:
                 print(f"Kļūda: {str(e)}")
@@ -183,23 +418,119 @@ def interactive_mode():
 def main():
     parser = argparse.ArgumentParser(
         description="JSON apstrādes rīks ar drošu pārrakstīšanu un apvienošanu",
-        epilog="Piemērs: ./script.py -c overwrite -f modem.json -o config.json"
+        epilog="Piemērs: ./script.py -c merge -f modem1.json modem2.json modem3.json -o config.json"
     )
     parser.add_argument("-i", "--interactive", action="store_true", help="Interaktīvais režīms")
     parser.add_argument("-c", "--operation", choices=["merge", "overwrite"], help="Darbība: merge vai overwrite")
-    parser.add_argument("-f", "--input", help="Ievades fails")
+    parser.add_argument("-f", "--input", nargs="+", help="Ievades fails (vai vairāki faili)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Procesu skaits ievades failu nolasīšanai un apvienošanai")
     parser.add_argument("-o", "--output", help="Izvades fails")
+    parser.add_argument("--merge-mode", choices=MERGE_MODES, default="copy",
+                        help="copy (noklusējums), inplace (bez kopijām) vai share (kopē tikai mainīto)")
+    parser.add_argument("--durability", choices=DURABILITY_LEVELS, default="fsync",
+                        help="none (tikai atomāra pārsaukšana), fsync (noklusējums) vai full (+ direktorijas fsync)")
+    parser.add_argument("-p", "--path", dest="paths", action="append",
+                        help="Apstrādāt tikai šo apakškoku (piem. Modem.Alarms vai /Modem/Alarms), var atkārtot")
+    parser.add_argument("--diff", metavar="FAILS",
+                        help="Saglabāt izmaiņas kā JSON Patch (RFC 6902) failā vai '-' (konsole)")
+    parser.add_argument("--dry-run", action="store_true", help="Neko nerakstīt (kopā ar --diff parāda izmaiņas)")
+    parser.add_argument("--compact", action="store_true", help="Rakstīt kompaktu JSON (bez atkāpēm); ar --path ievietotie apakškoki seko faila stilam")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Izlaist nemainītas ievades (nospiedumi glabājas <output>.manifest.json)")
+    parser.add_argument("--policy", metavar="FAILS",
+                        help="Konfliktu politika (JSON noteikumi pa ceļiem, skat. policies.py); ievades netiek dalītas -j")
+    parser.add_argument("--index", action="store_true",
+                        help="Izveidot vaicājumu indeksu <output>.idx.json (esošs indekss tiek atjaunots vienmēr)")
+    parser.add_argument("--queue", action="store_true",
+                        help="Ievietot rindā <output>.queue; izvadi partijās raksta tas, kurš tur slēdzeni")
+    metrics.add_arguments(parser)
     
     args = parser.parse_args()
+    if args.queue and (args.paths or args.incremental or args.diff or args.dry_run):
+        print("KĻŪDA: --queue nevar apvienot ar --path, --incremental, --diff vai --dry-run")
+        sys.exit(1)
+    if args.paths and (args.incremental or args.diff or args.dry_run):
+        #ceļu režīms raksta izvadi uzreiz, vecā versija netiek parsēta salīdzināšanai
+        print("KĻŪDA: --path nevar apvienot ar --incremental, --diff vai --dry-run")
+        sys.exit(1)
+    if args.policy and (args.paths or args.queue or args.incremental):
+        #politikas (right, newest, max ...) atkarīgas no secības un nemainītajām vērtībām
+        print("KĻŪDA: --policy nevar apvienot ar --path, --queue vai --incremental")
+        sys.exit(1)
     
     if args.interactive:
         interactive_mode()
     elif all([args.operation, args.input, args.output]):
-        process_command_line(args)
+        with metrics.from_args(args):
+            process_command_line(args)
     else:
         parser.print_help()
         sys.exit(1)
 
+class TestMergeInputs(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.inputs = []
+        for i, data in enumerate([{"k": {"x": 1}}, {"k": {"z": 0}}, {"k": [1]}, {"k": {"y": 2}}]):
+            self.inputs.append(self.write(f"in{i}.json", data))
+
+    def tearDown(self):
+        for name in os.listdir(self.workdir):
+            os.remove(os.path.join(self.workdir, name))
+        os.rmdir(self.workdir)
+
+    def write(self, name, data):
+        path = os.path.join(self.workdir, name)
+        write_json_atomic(path, data, "none")
+        return path
+
+    def run_cli(self, inputs, output, **options):
+        args = argparse.Namespace(operation="merge", input=inputs, output=output, durability="none", **options)
+        with mock.patch("builtins.print"):
+            process_command_line(args)
+        return load_file(output)
+
+    def test_parallel_equals_sequential(self): #merge_json nav asociatīvs - gabalus nedrīkst apvienot savā starpā
+        expected = {"k": {"x": 1, "z": 0, "y": 2}}
+        tasks = [(path, None, False) for path in self.inputs]
+        self.assertEqual(merge_inputs(tasks)[0], expected)
+        self.assertEqual(merge_inputs(tasks, jobs=2)[0], expected)
+        sequential = os.path.join(self.workdir, "seq.json")
+        for path in self.inputs:
+            self.run_cli([path], sequential)
+        self.assertEqual(load_file(sequential), expected)
+        self.assertEqual(self.run_cli(self.inputs, os.path.join(self.workdir, "par.json"), jobs=2), expected)
+
+    def test_path_rejects_unsupported_flags(self): #--dry-run/--diff ar --path nedrīkst klusi pārrakstīt izvadi
+        output = self.write("out.json", {"Modem": {"Alarms": {"a": 1}}})
+        with open(output, "rb") as f:
+            before = f.read()
+        argv = ["prog", "-c", "overwrite", "-f", self.inputs[0], "-o", output, "--path", "Modem.Alarms"]
+        for extra in (["--dry-run", "--diff", "-"], ["--diff", "-"], ["--incremental"]):
+            with mock.patch("sys.argv", argv + extra), mock.patch("builtins.print"), \
+                    self.assertRaises(SystemExit) as exit_info:
+                main()
+            self.assertEqual(exit_info.exception.code, 1)
+        with open(output, "rb") as f:
+            self.assertEqual(f.read(), before)
+
+    def test_policy_rejects_incremental(self): #inkrementāli apvienota tikai mainītā daļa dotu citu rezultātu
+        policy = self.write("policy.json", {"default": "right"})
+        output = os.path.join(self.workdir, "out.json")
+        argv = ["prog", "-c", "merge", "-f", self.inputs[0], self.inputs[1], "-o", output, "--policy", policy,
+                "--incremental"]
+        with mock.patch("sys.argv", argv), mock.patch("builtins.print"), \
+                self.assertRaises(SystemExit) as exit_info:
+            main()
+        self.assertEqual(exit_info.exception.code, 1)
+        self.assertFalse(os.path.exists(output))
+
+    def test_existing_output_merged_first(self): #izvade ar citu tipu - kā N secīgi palaidieni
+        output = self.write("out.json", {"k": [0]})
+        self.assertEqual(self.run_cli(self.inputs[1:], output, jobs=2), {"k": [0, 1]})
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,204 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+import compressed_io
+import jsoncodec
+from stats import current as current_stats
+
+# none  - tikai atomāra pārsaukšana (dati var palikt OS kešā)
+# fsync - fails tiek fsync'ots pirms pārsaukšanas (kā iepriekš process_command_line)
+# full  - fsync + arī direktorija tiek fsync'ota, lai pārsaukšana būtu noturīga
+DURABILITY_LEVELS = ("none", "fsync", "full")
+
+
+def _fsync_directory(directory):
+    if os.name != "posix":
+        return  #Windows neļauj atvērt direktoriju fsync vajadzībām
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        with current_stats().stage("fsync"):
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _open_temp(path, binary=False):
+    """Izveido pagaidu failu tajā pašā direktorijā (lai os.replace būtu atomārs)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    if binary:
+        return os.fdopen(fd, "wb"), tmp_path
+    return os.fdopen(fd, "w", encoding="utf-8"), tmp_path
+
+
+def _finish_temp(f, tmp_path, path, durability):
+    stats = current_stats()
+    f.flush()
+    stats.add("bytes_written", os.fstat(f.fileno()).st_size)
+    if durability != "none":
+        with stats.stage("fsync"):
+            os.fsync(f.fileno())
+    f.close()
+    if os.path.exists(path):
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)  #saglabā esošā faila tiesības
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)  #mkstemp izveido 0600, parasts fails būtu 0666 & ~umask
+
+
+def _write_temp(path, data, durability, indent):
+    """Ieraksta datus pagaidu failā tajā pašā direktorijā un atgriež tā ceļu."""
+    stats = current_stats()
+    codec = compressed_io.codec_from_name(path)
+    f, tmp_path = _open_temp(path, binary=codec is not None)
+    try:
+        with stats.stage("serialize"):
+            text = jsoncodec.dumps(data, indent)
+        if codec is not None:
+            with stats.stage("compress"):
+                text = compressed_io.compress(text.encode("utf-8"), codec)
+        with stats.stage("write"):
+            f.write(text)
+        _finish_temp(f, tmp_path, path, durability)
+    except BaseException:
+        f.close()
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+@contextmanager
+def atomic_open(path, durability="fsync", binary=False):
+    """
+    Fails rakstīšanai pa daļām (piem. JSON Lines), kas tiek atomāri pārsaukts
+    uz `path` tikai tad, ja with bloks beidzas bez kļūdas. binary=True -> baitu režīms.
+    Ja `path` ir saspiesta faila paplašinājums (.gz, .zst, .lz4), dati tiek saspiesti plūsmā.
+    """
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Nezināms noturības līmenis: {durability}")
+    codec = compressed_io.codec_from_name(path)
+    if codec is None:
+        f, tmp_path = _open_temp(path, binary)
+        stream = f
+    else:
+        f, tmp_path = _open_temp(path, binary=True)
+        stream = compressed_io.wrap_writer(f, codec)
+        if not binary:
+            stream = io.TextIOWrapper(stream, encoding="utf-8")
+    try:
+        yield stream
+        if stream is not f:
+            stream.close()  #ieraksta saspiestās plūsmas beigas, `f` paliek atvērts
+        _finish_temp(f, tmp_path, path, durability)
+    except BaseException:
+        f.close()
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    if durability == "full":
+        _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def write_json_atomic(path, data, durability="fsync", indent=4):
+    """
+    Ieraksta JSON failu atomāri: vispirms pagaidu failā, tad os.replace() uz mērķi.
+    Ja process avarē rakstīšanas laikā, mērķa fails paliek vecajā (veselajā) stāvoklī.
+    indent=None raksta kompaktu JSON (failiem, kurus lasa tikai programmas).
+    """
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Nezināms noturības līmenis: {durability}")
+    tmp_path = _write_temp(path, data, durability, indent)
+    os.replace(tmp_path, path)
+    if durability == "full":
+        _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class BatchWriter:
+    """
+    Sagrupē vairākus ierakstus vienā noturīgā commit:
+    - atkārtoti ieraksti uz to pašu failu tiek apvienoti (tiek rakstīta tikai pēdējā versija)
+    - vispirms tiek ierakstīti visi pagaidu faili, tad visi pārsaukti
+    - direktorija tiek fsync'ota vienreiz, nevis pēc katra faila
+
+    with BatchWriter(durability="full") as batch:
+        batch.stage("merged.json", data)
+    """
+
+    def __init__(self, durability="fsync", indent=4):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Nezināms noturības līmenis: {durability}")
+        self.durability = durability
+        self.indent = indent
+        self.pending = {}
+
+    def stage(self, path, data):
+        self.pending[path] = data
+
+    def commit(self):
+        """Ieraksta visus sagatavotos failus. Atgriež ierakstīto failu sarakstu."""
+        staged, self.pending = self.pending, {}
+        temp_files = []
+        try:
+            for path, data in staged.items():
+                temp_files.append((_write_temp(path, data, self.durability, self.indent), path))
+        except BaseException:
+            for tmp_path, _path in temp_files:
+                os.remove(tmp_path)
+            raise
+        directories = set()
+        for tmp_path, path in temp_files:
+            os.replace(tmp_path, path)
+            directories.add(os.path.dirname(os.path.abspath(path)))
+        if self.durability == "full":
+            for directory in directories:
+                _fsync_directory(directory)
+        return list(staged)
+
+    def discard(self):
+        self.pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+
+class TestAtomicWrite(unittest.TestCase):
+
+    def tearDown(self):
+        for name in ('test_atomic.json', 'test_atomic2.json'):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def test_write_and_keep_on_failure(self):
+        write_json_atomic('test_atomic.json', {"a": 1}, durability="full")
+        with open('test_atomic.json', 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"a": 1})
+        with self.assertRaises(TypeError): #nav serializējams -> vecais fails paliek neskarts
+            write_json_atomic('test_atomic.json', {"a": object()})
+        with open('test_atomic.json', 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"a": 1})
+        self.assertFalse([n for n in os.listdir('.') if n.startswith('.test_atomic.json.')]) #nav palikušu pagaidu failu
+
+    def test_batch_writer(self):
+        with BatchWriter(durability="none") as batch:
+            batch.stage('test_atomic.json', {"v": 1})
+            batch.stage('test_atomic.json', {"v": 2}) #tiek ierakstīta tikai pēdējā versija
+            batch.stage('test_atomic2.json', [1])
+        with open('test_atomic.json', 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {"v": 2})
+        self.assertTrue(os.path.exists('test_atomic2.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
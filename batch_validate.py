@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import os
+import sys
+import time
+import unittest
+from functools import partial
+from multiprocessing import Pool
+
+import jsoncodec
+from schema import compile_schema
+from valideJSNO import DEFAULT_CHUNK_SIZE, check_json_file
+
+
+def collect_paths(patterns, recursive=False, extension='.json'):
+    """Pārvērš direktorijas, glob šablonus un failus vienā sakārtotā failu sarakstā (bez dublikātiem)."""
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                for root, _dirs, names in os.walk(pattern):
+                    for name in names:
+                        if name.endswith(extension):
+                            found[os.path.join(root, name)] = None
+            else:
+                for entry in os.scandir(pattern):
+                    if entry.name.endswith(extension) and entry.is_file():
+                        found[entry.path] = None
+        elif glob.has_magic(pattern):
+            for path in glob.glob(pattern, recursive=True):
+                if os.path.isfile(path):
+                    found[path] = None
+        else:
+            found[pattern] = None  #neesošs fails parādīsies rezultātos kā "missing"
+    return sorted(found)
+
+
+def validate_many(paths, workers=None, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, schema=None):
+    """
+    Pārbauda failus paralēli procesu pūlā un atgriež rezultātus, tiklīdz tie ir gatavi
+    (secība var atšķirties no ievades secības). schema tiek nokompilēta vienreiz;
+    procesi kompilēto kodu ielādē no diska keša.
+    """
+    if schema is not None:
+        schema = compile_schema(schema)
+    check = partial(check_json_file, streaming=streaming, chunk_size=chunk_size, schema=schema)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        yield from map(check, paths)  #nav jēgas startēt procesus
+        return
+    chunksize = max(1, min(64, len(paths) // (workers * 4)))  #mazāk IPC, bet joprojām vienmērīga slodze
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(check, paths, chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pārbauda daudzu JSON failu sintaksi paralēli, rezultāti JSON Lines formātā",
+        epilog="Piemērs: ./batch_validate.py configs/ 'deploy/**/*.json' -j 8"
+    )
+    parser.add_argument("paths", nargs="+", help="Faili, direktorijas vai glob šabloni")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Procesu skaits (noklusējums: CPU skaits)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Pārbaudīt arī apakšdirektorijas")
+    parser.add_argument("-s", "--streaming", action="store_true", help="Streaming validācija (ierobežota atmiņa)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Gabala izmērs streaming režīmā")
+    parser.add_argument("--schema", help="Pārbaudīt arī tipus pēc shēmas faila")
+    args = parser.parse_args()
+
+    paths = collect_paths(args.paths, args.recursive)
+    counts = {"valid": 0, "invalid": 0, "schema": 0, "missing": 0, "unreadable": 0}
+    started = time.perf_counter()
+    try:
+        schema = compile_schema(args.schema) if args.schema else None
+    except (OSError, ValueError) as e:
+        print(f"KĻŪDA: Nevarēja ielādēt shēmu: {str(e)}")
+        sys.exit(1)
+    for result in validate_many(paths, args.workers, args.streaming, args.chunk_size, schema):
+        counts[result["status"]] += 1
+        print(jsoncodec.dumps(result, indent=None), flush=True)
+
+    summary = dict(counts, total=len(paths), seconds=round(time.perf_counter() - started, 3))
+    print(jsoncodec.dumps({"summary": summary}, indent=None))
+    sys.exit(0 if counts["valid"] == len(paths) else 1)
+
+
+class TestBatchValidate(unittest.TestCase):
+
+    def setUp(self):
+        os.makedirs('test_batch_dir', exist_ok=True)
+        with open('test_batch_dir/ok.json', 'w', encoding='utf-8') as f:
+            f.write('[{"name": "item1", "value": 100}]')
+        with open('test_batch_dir/bad.json', 'w', encoding='utf-8') as f:
+            f.write('{"name": "item1",\n "value": 100')
+
+    def tearDown(self):
+        for name in ('ok.json', 'bad.json'):
+            os.remove(os.path.join('test_batch_dir', name))
+        os.rmdir('test_batch_dir')
+
+    def test_validate_many(self):
+        paths = collect_paths(['test_batch_dir', 'test_batch_dir/*.json', 'test_batch_dir/nav.json'])
+        self.assertEqual(len(paths), 3) #direktorija un glob dod tos pašus failus
+        results = {os.path.basename(r["file"]): r for r in validate_many(paths, workers=2)}
+        self.assertEqual(results['ok.json']["status"], "valid")
+        self.assertEqual(results['bad.json']["status"], "invalid")
+        self.assertEqual((results['bad.json']["line"], results['bad.json']["column"]), (2, 14))
+        self.assertEqual(results['nav.json']["status"], "missing")
+
+
+if __name__ == "__main__":
+    main()
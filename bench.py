@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Veiktspējas mērījumi apvienošanas un validācijas "karstajiem" ceļiem.
+
+    ./bench.py                         # palaiž visus mērījumus (scale=small)
+    ./bench.py --scale medium --save bench_baseline.json
+    ./bench.py --compare bench_baseline.json --tolerance 0.25
+
+Dati tiek ģenerēti sintētiski (ieraksti {"name", "value"} un Modem dokumenti pēc
+l.json / 4.json / safrule parauga), katram mērījumam tiek norādīts labākais laiks no
+vairākiem atkārtojumiem, caurlaidspēja un maksimālā atmiņa (tracemalloc).
+"""
+import argparse
+import contextlib
+import copy
+import gc
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import jsoncodec
+import old
+from argumntunodnokomandrindas import merge_json
+from merge import merge_json_files
+from valideJSNO import validate_json_file
+
+SCALES = {
+    # ieraksti, Modem sekciju dziļums, masīvu garums, Modem dokumentu skaits
+    "small": {"records": 20_000, "depth": 2, "array_len": 16, "documents": 20},
+    "medium": {"records": 200_000, "depth": 3, "array_len": 64, "documents": 100},
+    "large": {"records": 1_000_000, "depth": 4, "array_len": 256, "documents": 300},
+}
+
+_MODULATIONS = ["QPSK", "8PSK", "16APSK", "32APSK", "64QAM", "128QAM", "256QAM", ""]
+
+
+def make_records(count, overlap=0.3, seed=0):
+    """Plakani ieraksti kā merge.py piemēros; `overlap` daļai ir atkārtoti vārdi (konflikti)."""
+    rng = random.Random(seed)
+    unique = max(1, int(count * (1 - overlap)))
+    return [{"name": f"item{rng.randrange(unique) if i >= unique else i}", "value": f"v{i}"}
+            for i in range(count)]
+
+
+def make_modem(depth=2, array_len=16, seed=0):
+    """Modem dokuments ar virkņu skaitļiem un gariem paralēliem masīviem, kā l.json."""
+    rng = random.Random(seed)
+
+    def section(level):
+        data = {
+            "file": "40_X_NWB_EGEv3a",
+            "bandwidth_khz": str(rng.choice([20000, 40000, 80000])),
+            "profile_min": str(rng.randrange(4)),
+            "rxLevel": f"{-rng.randrange(40, 100)} dBm",
+            "radialMse": f"{-rng.uniform(5, 35):.1f} dB",
+            "ldpcDecoderStress": f"{rng.random() / 100:.1e}",
+            "profiles": hex(rng.randrange(0x10000)),
+            "acmModulations": [rng.choice(_MODULATIONS) for _ in range(array_len)],
+            "acm_configuration_modulation": [str(2 ** rng.randrange(2, 9)) for _ in range(array_len)],
+            "acm_configuration_acmNumOfSymbols": [str(rng.randrange(9000, 30000)) for _ in range(array_len)],
+        }
+        if level > 1:
+            for name in ("Configuration", "Status", "Alarms"):
+                data[name] = section(level - 1)
+        return data
+
+    return {"Modem": {name: section(depth) for name in
+                      ("ConfigurationFile", "Configuration", "Alarms", "Status", "MailboxOut")}}
+
+
+def measure(func, repeat, setup=None):
+    """
+    Atgriež (labākais laiks sekundēs, maksimālā atmiņa baitos).
+    setup() (ja dots) tiek izsaukts pirms katras palaišanas ārpus laika mērīšanas,
+    tā rezultāts tiek padots func.
+    """
+    def once():
+        arg = setup() if setup else None
+        gc.collect()
+        gc.disable()  #tāpat kā timeit - GC pauzes neiekrīt mērījumā
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):  #merge_json_files drukā paziņojumus
+                started = time.perf_counter()
+                func(arg) if setup else func()
+                return time.perf_counter() - started
+        finally:
+            gc.enable()
+
+    best = min(once() for _ in range(repeat))
+    arg = setup() if setup else None
+    tracemalloc.start()  #atmiņu mēra atsevišķā palaišanā, jo tracemalloc palēnina kodu
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(arg) if setup else func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(scale, repeat, only=None):
+    params = SCALES[scale]
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    results = {}
+
+    def bench(name, func, units, unit_name, setup=None):
+        if only and not any(pattern in name for pattern in only):
+            return
+        seconds, peak = measure(func, repeat, setup)
+        results[name] = {"seconds": round(seconds, 6), "throughput": round(units / seconds, 1),
+                         "unit": f"{unit_name}/s", "peak_bytes": peak}
+        print(f"{name:<32} {seconds * 1000:10.1f} ms {units / seconds:14,.0f} {unit_name}/s "
+              f"{peak / 1024 / 1024:9.1f} MB", file=sys.stderr)
+
+    try:
+        records = make_records(params["records"])
+        halves = [records[:len(records) // 2], records[len(records) // 2:]]
+        record_files = []
+        for i, part in enumerate(halves):
+            path = os.path.join(workdir, f"records{i}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                jsoncodec.dump(part, f)
+            record_files.append(path)
+        output = os.path.join(workdir, "merged.json")
+        for mode in ("overwrite", "merge", "skip"):
+            bench(f"merge_json_files[{mode}]",
+                  lambda mode=mode: merge_json_files(record_files, output, conflict_resolution=mode),
+                  len(records), "rec")
+
+        docs = [make_modem(params["depth"], params["array_len"], seed) for seed in range(params["documents"])]
+        doc_bytes = sum(len(jsoncodec.dumps(doc, indent=None)) for doc in docs)
+
+        def fold(merge, mode=None):
+            def run(first):
+                result = first or docs[0]
+                for doc in docs[1:]:
+                    result = merge(result, doc) if mode is None else merge(result, doc, mode)
+            return run
+
+        for mode in ("copy", "share"):
+            bench(f"merge_json[{mode}]", fold(merge_json, mode), doc_bytes / 1e6, "MB", setup=lambda: None)
+        bench("merge_json[inplace]", fold(merge_json, "inplace"), doc_bytes / 1e6, "MB",
+              setup=lambda: copy.deepcopy(docs[0]))  #inplace maina pirmo dokumentu
+        bench("old.merge_json", fold(old.merge_json), doc_bytes / 1e6, "MB", setup=lambda: None)
+
+        big_doc = {"Modems": docs * max(1, params["records"] // (len(docs) * 50))}
+        big_path = os.path.join(workdir, "status_dump.json")
+        with open(big_path, "w", encoding="utf-8") as f:
+            jsoncodec.dump(big_doc, f)
+        size_mb = os.path.getsize(big_path) / 1e6
+        bench("validate_json_file", lambda: validate_json_file(big_path), size_mb, "MB")
+        bench("validate_json_file[streaming]",
+              lambda: validate_json_file(big_path, streaming=True), size_mb, "MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Atgriež regresiju sarakstu: mērījumi, kas ir lēnāki par bāzi vairāk nekā `tolerance`."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        status = "REGRESIJA" if ratio > 1 + tolerance else "ok"
+        print(f"{name:<32} {ratio:6.2f}x pret bāzi  {status}", file=sys.stderr)
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apvienošanas un validācijas veiktspējas mērījumi")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="Datu apjoms")
+    parser.add_argument("--repeat", type=int, default=3, help="Atkārtojumu skaits (tiek ņemts labākais laiks)")
+    parser.add_argument("--only", nargs="+", help="Palaist tikai mērījumus, kuru nosaukumā ir šī virkne")
+    parser.add_argument("--save", metavar="FAILS", help="Saglabāt rezultātus kā bāzi")
+    parser.add_argument("--compare", metavar="FAILS", help="Salīdzināt ar saglabātu bāzi")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Pieļaujamā palēnināšanās (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    print(f"JSON backend: {jsoncodec.BACKEND}, scale: {args.scale}", file=sys.stderr)
+    results = run_benchmarks(args.scale, args.repeat, args.only)
+    report = {"scale": args.scale, "backend": jsoncodec.BACKEND, "python": sys.version.split()[0],
+              "results": results}
+    print(jsoncodec.dumps(report))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            jsoncodec.dump(report, f)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = jsoncodec.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"Brīdinājums: bāze mērīta ar scale={baseline.get('scale')}", file=sys.stderr)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
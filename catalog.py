@@ -0,0 +1,254 @@
+"""
+JSON failu katalogs interaktīvajiem režīmiem (argumntunodnokomandrindas.py, old.py,
+apvieno_json_failus2.py) direktorijām ar desmitiem tūkstošu failu:
+
+- os.scandir vienā piegājienā (izmērs un mtime nāk no direktorijas ieraksta, bez stat katram);
+- refresh() neko nedara, ja direktorijas mtime nav mainījies (faili nav pievienoti/dzēsti);
+- lapošana un filtrs: glob ("*modem*.json") vai apakšvirkne ("modem", bez reģistra);
+- metadati (izmērs, derīgums, augšējā līmeņa atslēgas) tiek aprēķināti tikai parādītajai
+  lapai un kešoti, līdz faila (mtime, izmērs) mainās.
+"""
+import fnmatch
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from mmap_load import load_file
+
+PAGE_SIZE = 20
+RACY_NS = 2_000_000_000  #svaigam direktorijas mtime neuzticas (rupja FS laika izšķirtspēja)
+_GLOB_CHARS = frozenset("*?[")
+
+
+class FileInfo:
+
+    __slots__ = ("name", "size", "mtime_ns", "_meta")
+
+    def __init__(self, name, size, mtime_ns):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self._meta = None
+
+
+class FileCatalog:
+
+    def __init__(self, directory=".", pattern="*.json", page_size=PAGE_SIZE):
+        self.directory = directory
+        self.pattern = pattern
+        self.page_size = page_size
+        self.files = {}  #nosaukums -> FileInfo
+        self.scans = 0
+        self._names = []
+        self._dir_mtime_ns = None
+        self._filtered = {}  #filtrs -> nosaukumu saraksts (derīgs līdz nākamajai izmaiņai)
+
+    def refresh(self, force=False):
+        """Pārskata direktoriju tikai tad, ja tā ir mainījusies (vai force=True)."""
+        mtime_ns = os.stat(self.directory).st_mtime_ns
+        if not force and mtime_ns == self._dir_mtime_ns:
+            return False
+        files = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not fnmatch.fnmatchcase(entry.name, self.pattern):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue  #izdzēsts skenēšanas laikā
+                old = self.files.get(entry.name)
+                if old is not None and (old.size, old.mtime_ns) == (st.st_size, st.st_mtime_ns):
+                    files[entry.name] = old  #saglabā kešotos metadatus
+                else:
+                    files[entry.name] = FileInfo(entry.name, st.st_size, st.st_mtime_ns)
+        self.files = files
+        self._names = sorted(files)
+        self._filtered = {}
+        #ja direktorija mainījās tikko, tajā pašā laika "tikšķī" var parādīties vēl faili
+        self._dir_mtime_ns = mtime_ns if time.time_ns() - mtime_ns > RACY_NS else None
+        self.scans += 1
+        return True
+
+    def names(self, filter_text=None):
+        self.refresh()
+        if not filter_text:
+            return self._names
+        if filter_text not in self._filtered:
+            if _GLOB_CHARS.intersection(filter_text):
+                self._filtered[filter_text] = [name for name in self._names if fnmatch.fnmatch(name, filter_text)]
+            else:
+                needle = filter_text.lower()
+                self._filtered[filter_text] = [name for name in self._names if needle in name.lower()]
+        return self._filtered[filter_text]
+
+    def page_count(self, filter_text=None):
+        return max(1, -(-len(self.names(filter_text)) // self.page_size))
+
+    def page(self, number, filter_text=None):
+        """Atgriež (lapas nosaukumi, pirmā nosaukuma numurs sarakstā, sākot no 0)."""
+        number = min(max(number, 0), self.page_count(filter_text) - 1)
+        start = number * self.page_size
+        return self.names(filter_text)[start:start + self.page_size], start
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def metadata(self, name):
+        """{"size", "valid", "keys", "error"}; fails tiek parsēts tikai, ja mainījies kopš pēdējās reizes."""
+        try:
+            st = os.stat(self.path(name))
+        except FileNotFoundError:
+            self.forget(name)
+            raise
+        info = self.files.get(name)
+        if info is None or (info.size, info.mtime_ns) != (st.st_size, st.st_mtime_ns):
+            info = self.files[name] = FileInfo(name, st.st_size, st.st_mtime_ns)
+        if info._meta is None:
+            meta = {"size": info.size, "valid": True, "keys": None, "error": None}
+            try:
+                data = load_file(self.path(name))
+                if isinstance(data, dict):
+                    meta["keys"] = list(data)
+                elif isinstance(data, list):
+                    meta["keys"] = f"[{len(data)} elementi]"
+            except Exception as e:
+                meta["valid"] = False
+                meta["error"] = str(e)
+            info._meta = meta
+        return info._meta
+
+    def describe(self, name):
+        """Viena rinda sarakstam: nosaukums, izmērs, derīgums, atslēgas."""
+        try:
+            meta = self.metadata(name)
+        except FileNotFoundError:
+            return f"{name}  (izdzēsts)"
+        size = f"{meta['size']} B" if meta["size"] < 1024 else f"{meta['size'] / 1024:.1f} KB"
+        if not meta["valid"]:
+            return f"{name}  {size}  NEDERĪGS"
+        keys = meta["keys"]
+        if isinstance(keys, list):
+            keys = ", ".join(keys[:5]) + (f" (+{len(keys) - 5})" if len(keys) > 5 else "")
+        return f"{name}  {size}  {keys or ''}".rstrip()
+
+    def forget(self, name):
+        """Izņem failu no kataloga (piem. pēc dzēšanas), nepārskatot direktoriju."""
+        if self.files.pop(name, None) is not None:
+            self._names = sorted(self.files)
+            self._filtered = {}
+
+    def remove(self, name):
+        os.remove(self.path(name))
+        self.forget(name)
+
+
+def print_page(catalog, number=0, filter_text=None):
+    names, start = catalog.page(number, filter_text)
+    total = len(catalog.names(filter_text))
+    shown_filter = f", filtrs '{filter_text}'" if filter_text else ""
+    print(f"\nPieejamie JSON faili ({total}{shown_filter}) - lapa "
+          f"{start // catalog.page_size + 1}/{catalog.page_count(filter_text)}:")
+    for i, name in enumerate(names, start + 1):
+        print(f"{i}. {catalog.describe(name)}")
+    return names
+
+
+def choose(catalog, prompt, multiple=False):
+    """
+    Failu izvēle pa lapām. Ievade: numurs(-i) (numerācija visam filtrētajam sarakstam),
+    'n'/'p' - nākamā/iepriekšējā lapa, '/teksts' vai '/*.json' - filtrs ('/' - noņem),
+    'visu' - visi filtrētie faili (ja multiple), tukša ievade - atcelt.
+    Atgriež nosaukumu (vai sarakstu, ja multiple) vai None.
+    """
+    number, filter_text = 0, None
+    hint = "numurs" + ("(-i) vai 'visu'" if multiple else "") + ", n/p - lapa, /filtrs, tukšs - atcelt"
+    while True:
+        print_page(catalog, number, filter_text)
+        choice = input(f"{prompt} ({hint}): ").strip()
+        names = catalog.names(filter_text)
+        if not choice:
+            return None
+        if choice.lower() in ("n", "p"):
+            number = min(max(number + (1 if choice.lower() == "n" else -1), 0), catalog.page_count(filter_text) - 1)
+            continue
+        if choice.startswith("/"):
+            filter_text, number = choice[1:].strip() or None, 0
+            continue
+        if multiple and choice.lower() == "visu":
+            return list(names)
+        try:
+            numbers = [int(part) for part in choice.replace(",", " ").split()]
+            if min(numbers) < 1:
+                raise IndexError
+            selected = [names[n - 1] for n in numbers]
+        except (ValueError, IndexError):
+            print("Kļūda! Ievadiet vēlreiz")
+            continue
+        if multiple:
+            return selected
+        if len(selected) == 1:
+            return selected[0]
+        print("Izvēlies vienu failu!")
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        for i in range(45):
+            self.write(f"modem{i:02d}.json", {"Modem": {"n": i}, "file": f"m{i}"})
+        self.write("bad.json", None, text='{"a": ')
+        self.write("notes.txt", None, text="x")
+        os.utime(self.workdir, ns=(10**18, 10**18))  #sena direktorijas mtime - uzticams
+        self.catalog = FileCatalog(self.workdir, page_size=10)
+
+    def tearDown(self):
+        for name in os.listdir(self.workdir):
+            os.remove(os.path.join(self.workdir, name))
+        os.rmdir(self.workdir)
+
+    def write(self, name, data, text=None):
+        import jsoncodec
+        with open(os.path.join(self.workdir, name), "w", encoding="utf-8") as f:
+            f.write(text if text is not None else jsoncodec.dumps(data))
+
+    def test_scan_filter_page(self):
+        self.assertEqual(len(self.catalog.names()), 46)
+        self.assertFalse(self.catalog.refresh()) #direktorija nav mainījusies - nav jāskenē
+        self.assertEqual(self.catalog.scans, 1)
+        self.assertEqual(self.catalog.names("MODEM1"), [f"modem1{i}.json" for i in range(10)])
+        self.assertEqual(self.catalog.names("*4?.json"), ["modem40.json", "modem41.json", "modem42.json",
+                                                          "modem43.json", "modem44.json"])
+        self.assertEqual(self.catalog.page_count(), 5)
+        self.assertEqual(self.catalog.page(9), (["modem39.json", "modem40.json", "modem41.json", "modem42.json",
+                                                 "modem43.json", "modem44.json"], 40)) #pēdējā lapa; bad.json ir pirmais
+        self.catalog.remove("modem00.json")
+        self.assertNotIn("modem00.json", self.catalog.names())
+        self.write("new.json", {})
+        self.assertIn("new.json", self.catalog.names())
+
+    def test_metadata_cached_until_changed(self):
+        meta = self.catalog.metadata("modem05.json")
+        self.assertEqual((meta["valid"], meta["keys"]), (True, ["Modem", "file"]))
+        self.assertIs(self.catalog.metadata("modem05.json"), meta)
+        self.assertFalse(self.catalog.metadata("bad.json")["valid"])
+        self.assertIn("NEDERĪGS", self.catalog.describe("bad.json"))
+        self.write("modem05.json", [1, 2, 3])
+        self.assertEqual(self.catalog.metadata("modem05.json")["keys"], "[3 elementi]")
+
+    def test_choose(self):
+        with mock.patch("builtins.input", side_effect=["n", "/modem3", "2", ""]), mock.patch("builtins.print"):
+            self.assertEqual(choose(self.catalog, "Izvēlies"), "modem31.json")
+            self.assertIsNone(choose(self.catalog, "Izvēlies"))
+        with mock.patch("builtins.input", side_effect=["/*4?.json", "visu", "abc", "1 46"]), mock.patch("builtins.print"):
+            self.assertEqual(len(choose(self.catalog, "Izvēlies", multiple=True)), 5)
+            self.assertEqual(choose(self.catalog, "Izvēlies", multiple=True), ["bad.json", "modem44.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Kolonnu formāta eksports analītikai: apvienotie ieraksti ({"name", "value"} saraksti)
+un saplacināti Modem.Status bloki no daudziem failiem tiek rakstīti CSV, Parquet vai
+Arrow IPC failā pa partijām (batch), atmiņā neturot visu rezultātu.
+
+    ./columnar.py records programmesanasval.json masinas.json -o records.parquet
+    ./columnar.py status l.json 4.json --section Modem.Status -o status.csv
+
+CSV vienmēr pieejams (csv modulis), Parquet/Arrow prasa pyarrow. Kolonnas nosaka pirmā
+partija; lauki, kas parādās tikai vēlāk, tiek saglabāti kolonnā "_extra" (kompakts JSON),
+saraksti un objekti šūnās tiek rakstīti kā kompakts JSON.
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from itertools import islice
+
+import jsoncodec
+import jsonl
+from atomic_write import DURABILITY_LEVELS, atomic_open
+from merge import merge_records
+from mmap_load import MappedDocument, load_file
+
+DEFAULT_BATCH_SIZE = 10_000
+EXTRA_COLUMN = "_extra"
+SOURCE_COLUMN = "_file"  #Modem sekcijās jau ir lauks "file"
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet",
+           ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+
+def flatten(value, prefix="", sep=".", into=None):
+    """{"a": {"b": 1}} -> {"a.b": 1}. Saraksti paliek kā vērtības."""
+    row = {} if into is None else into
+    for key, child in value.items():
+        name = f"{prefix}{sep}{key}" if prefix else key
+        if isinstance(child, dict) and child:
+            flatten(child, name, sep, row)
+        else:
+            row[name] = child
+    return row
+
+
+def _cell(value):
+    if isinstance(value, (dict, list)):
+        return jsoncodec.dumps(value, indent=None)
+    return value
+
+
+class _CsvSink:
+
+    def __init__(self, f, columns):
+        self.writer = csv.writer(f, lineterminator="\n")
+        self.writer.writerow(columns)
+
+    def write(self, columns, rows):
+        for row in rows:
+            self.writer.writerow(["" if row.get(c) is None else
+                                  ("true" if row[c] is True else "false" if row[c] is False else row[c])
+                                  for c in columns])
+
+    def close(self):
+        pass
+
+
+class _ArrowSink:
+
+    def __init__(self, f, fmt):
+        import pyarrow  #nav obligāta atkarība
+        self.pa = pyarrow
+        self.f = f
+        self.fmt = fmt
+        self.schema = None
+        self.writer = None
+
+    def write(self, columns, rows):
+        pa = self.pa
+        data = {c: [row.get(c) for row in rows] for c in columns}
+        if self.schema is None:
+            table = pa.table(data)
+            fields = [field if not pa.types.is_null(field.type) else pa.field(field.name, pa.string())
+                      for field in table.schema]  #tukša kolonna pirmajā partijā -> string
+            self.schema = pa.schema(fields)
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                self.writer = pq.ParquetWriter(self.f, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.f, self.schema)
+        try:
+            table = pa.table(data, schema=self.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Kolonnas tips mainās starp partijām ({e}); izmantojiet --strings") from e
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def detect_format(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Nezināms formāts: {path} (atbalstīti: {', '.join(sorted(FORMATS))})")
+    return fmt
+
+
+def _prepare(row, known, strings):
+    out = {key: _cell(value) for key, value in row.items() if key in known}
+    extra = {key: value for key, value in row.items() if key not in known}
+    if extra:
+        out[EXTRA_COLUMN] = jsoncodec.dumps(extra, indent=None)
+    if strings:
+        out = {key: None if value is None else str(value) for key, value in out.items()}
+    return out
+
+
+def export_rows(rows, output_file, batch_size=DEFAULT_BATCH_SIZE, fmt=None, columns=None,
+                strings=False, durability="none"):
+    """
+    Raksta vārdnīcu plūsmu kolonnu formātā pa `batch_size` rindām. Atgriež rindu skaitu.
+    Fails tiek aizvietots atomāri tikai tad, ja eksports izdodas līdz galam.
+    strings=True: visas vērtības tiek rakstītas kā teksts (stabils tips visās partijās).
+    """
+    fmt = fmt or detect_format(output_file)
+    rows = iter(rows)
+    count = 0
+    with atomic_open(output_file, durability, binary=fmt != "csv") as f:
+        batch = list(islice(rows, batch_size))
+        columns = list(columns or dict.fromkeys(key for row in batch for key in row))
+        known = set(columns)
+        header = columns + [EXTRA_COLUMN]  #vienmēr ir, lai shēma nemainītos starp partijām
+        sink = _CsvSink(f, header) if fmt == "csv" else _ArrowSink(f, fmt)
+        while True:
+            sink.write(header, [_prepare(row, known, strings) for row in batch])
+            count += len(batch)
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+        sink.close()
+    return count
+
+
+def iter_merged_records(file_names, conflict_resolution="overwrite", key_fields="name"):
+    """Tie paši ieraksti, ko merge_json_files ierakstītu izvadē."""
+    def read_records():
+        for file_name in file_names:
+            if not os.path.exists(file_name):
+                print(f"Brīdinājums: fails '{file_name}' neeksistē!", file=sys.stderr)
+                continue
+            records = jsonl.iter_jsonl(file_name) if jsonl.is_jsonl(file_name) else load_file(file_name)
+            if not isinstance(records, list) and not jsonl.is_jsonl(file_name):
+                print(f"Brīdinājums: fails '{file_name}' nesatur ierakstu sarakstu!", file=sys.stderr)
+                continue
+            yield from (record for record in records if isinstance(record, dict))
+    return merge_records(read_records(), conflict_resolution, key_fields)
+
+
+def iter_section_rows(file_names, section="Modem.Status", sep="."):
+    """
+    Katram failam viena rinda: {"_file": ..., <saplacinātā sekcija>}. No faila tiek parsēts
+    tikai pats apakškoks (mmap + baitu meklēšana), nevis viss dokuments.
+    """
+    for file_name in file_names:
+        try:
+            with MappedDocument(file_name) as doc:
+                block = doc.get(section)
+        except (OSError, KeyError, ValueError, IndexError) as e:
+            print(f"Brīdinājums: {file_name}: sekcija {section} nav nolasāma ({e})", file=sys.stderr)
+            continue
+        if not isinstance(block, dict):
+            print(f"Brīdinājums: {file_name}: {section} nav objekts", file=sys.stderr)
+            continue
+        yield flatten(block, sep=sep, into={SOURCE_COLUMN: file_name})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eksports uz CSV / Parquet / Arrow IPC")
+    commands = parser.add_subparsers(dest="command", required=True)
+    records_parser = commands.add_parser("records", help="Apvienotie ieraksti (kā merge.py)")
+    records_parser.add_argument("files", nargs="+")
+    records_parser.add_argument("--conflict", choices=["overwrite", "merge", "skip"], default="overwrite")
+    records_parser.add_argument("--key", nargs="+", default=["name"], help="Atslēgas lauks(-i)")
+    status_parser = commands.add_parser("status", help="Saplacināti Modem bloki no daudziem failiem")
+    status_parser.add_argument("files", nargs="+")
+    status_parser.add_argument("--section", default="Modem.Status", help="Sekcija (punktu ceļš vai JSON Pointer)")
+    for sub in (records_parser, status_parser):
+        sub.add_argument("-o", "--output", required=True, help="Izvades fails (.csv, .parquet, .arrow)")
+        sub.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        sub.add_argument("--strings", action="store_true", help="Visas kolonnas kā teksts")
+        sub.add_argument("--durability", choices=DURABILITY_LEVELS, default="none")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "records":
+            key = args.key[0] if len(args.key) == 1 else tuple(args.key)
+            rows = iter_merged_records(args.files, args.conflict, key)
+        else:
+            rows = iter_section_rows(args.files, args.section)
+        count = export_rows(rows, args.output, args.batch_size, strings=args.strings, durability=args.durability)
+    except ImportError:
+        print("KĻŪDA: Parquet/Arrow eksportam vajag pyarrow (pip install pyarrow), vai izmantojiet .csv")
+        sys.exit(1)
+    except (OSError, ValueError) as e:
+        print(f"KĻŪDA: {str(e)}")
+        sys.exit(1)
+    print(f"EKSPORTS VEIKSMĪGS: {count} rindas uz {args.output}")
+
+
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.workdir):
+            os.remove(os.path.join(self.workdir, name))
+        os.rmdir(self.workdir)
+
+    def read_csv(self, path):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return list(csv.DictReader(f))
+
+    def test_status_rows(self):
+        output = os.path.join(self.workdir, "status.csv")
+        count = export_rows(iter_section_rows(["l.json", "4.json", "3.json"]), output, batch_size=1)
+        self.assertEqual(count, 2) #3.json nav Modem sekcijas
+        rows = self.read_csv(output)
+        self.assertEqual([row[SOURCE_COLUMN] for row in rows], ["l.json", "4.json"])
+        status = load_file("l.json")["Modem"]["Status"]
+        self.assertEqual(rows[0]["rxSymbolRate"], status["rxSymbolRate"])
+        self.assertEqual(jsoncodec.loads(rows[0]["acm_configuration_modulation"]), status["acm_configuration_modulation"])
+
+    def test_records_batches_and_extra(self):
+        rows = [{"name": "a", "value": 1}, {"name": "b", "value": None, "note": "x"}, {"name": "c", "value": True}]
+        output = os.path.join(self.workdir, "records.csv")
+        self.assertEqual(export_rows(rows, output, batch_size=1), 3)
+        result = self.read_csv(output)
+        self.assertEqual([(r["name"], r["value"]) for r in result], [("a", "1"), ("b", ""), ("c", "true")])
+        self.assertEqual(jsoncodec.loads(result[1][EXTRA_COLUMN]), {"note": "x"})
+        self.assertEqual(export_rows([], output), 0)
+        with self.assertRaises(ValueError):
+            export_rows(rows, os.path.join(self.workdir, "x.xlsx"))
+
+    def test_arrow_formats(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("nav pyarrow")
+        rows = [{"name": f"item{i}", "value": i} for i in range(25)]
+        output = os.path.join(self.workdir, "records.parquet")
+        export_rows(rows, output, batch_size=10)
+        self.assertEqual(pq.read_table(output).column("value").to_pylist(), list(range(25)))
+
+
+if __name__ == "__main__":
+    main()
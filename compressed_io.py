@@ -0,0 +1,263 @@
+"""
+Saspiesti JSON / JSON Lines faili (gzip, zstd, lz4) bez atspiešanas uz diska.
+
+Kodeku nosaka pēc paplašinājuma (".json.gz", ".jsonl.zst", ".json.lz4"), lasot - arī pēc
+pirmajiem baitiem, tāpēc arī "arhivs.json", kas patiesībā ir gzip, tiek nolasīts pareizi.
+Rakstīšanā kodeku nosaka tikai paplašinājums.
+
+gzip vienmēr pieejams (stdlib). zstd: Python 3.14 compression.zstd vai `pip install zstandard`,
+lz4: `pip install lz4`. Ja bibliotēkas nav, tiek izmests ImportError ar instalēšanas norādi.
+"""
+import gzip
+import io
+import os
+import tempfile
+import unittest
+
+EXTENSIONS = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd", ".lz4": "lz4"}
+MAGIC = ((b"\x1f\x8b", "gzip"), (b"\x28\xb5\x2f\xfd", "zstd"), (b"\x04\x22\x4d\x18", "lz4"))
+GZIP_LEVEL = 6  #zlib noklusējums; modema izdrukas saspiež >10x jau ar to
+ZSTD_LEVEL = 3
+
+
+def _zstd():
+    """Atgriež (avots, modulis): stdlib compression.zstd (3.14+) vai zstandard."""
+    try:
+        from compression import zstd
+        return "stdlib", zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd failiem vajag Python 3.14+ vai pip install zstandard") from None
+    return "zstandard", zstandard
+
+
+def _lz4():
+    try:
+        import lz4.frame
+    except ImportError:
+        raise ImportError("lz4 failiem vajag pip install lz4") from None
+    return lz4.frame
+
+
+def codec_from_name(path):
+    """Kodeks pēc paplašinājuma vai None (nesaspiests fails)."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def strip_extension(path):
+    """"dati.jsonl.gz" -> "dati.jsonl" (lai iekšējo formātu noteiktu pēc atlikušā paplašinājuma)."""
+    return os.path.splitext(path)[0] if codec_from_name(path) else path
+
+
+def sniff(head):
+    """Kodeks pēc faila pirmajiem baitiem vai None."""
+    for magic, codec in MAGIC:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def detect(path):
+    """Kodeks pēc paplašinājuma, citādi pēc pirmajiem baitiem."""
+    codec = codec_from_name(path)
+    if codec is None:
+        with open(path, "rb") as f:
+            codec = sniff(f.read(4))
+    return codec
+
+
+class _ZstandardReader(io.RawIOBase):
+    """
+    zstandard lasītājs prot tikai seek uz priekšu; atpakaļ (piem. JSON Lines otrais piegājiens
+    pēc baitu pozīcijām) fails tiek atvērts no jauna, tāpat kā to dara gzip.GzipFile.
+    """
+
+    def __init__(self, module, path):
+        self.module = module
+        self.path = path
+        self._raw = self._reader = None
+        self._reopen()
+
+    def _reopen(self):
+        self._close_streams()
+        self._raw = open(self.path, "rb")
+        self._reader = self.module.ZstdDecompressor().stream_reader(self._raw)
+
+    def _close_streams(self):
+        if self._reader is not None:
+            self._reader.close()
+        if self._raw is not None:
+            self._raw.close()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._reader.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def tell(self):
+        return self._reader.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.tell()
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("zstd: seek no beigām nav iespējams")
+        if offset < self.tell():
+            self._reopen()
+        while self.tell() < offset:
+            if not self._reader.read(min(offset - self.tell(), 1024 * 1024)):
+                break
+        return self.tell()
+
+    def close(self):
+        if not self.closed:
+            self._close_streams()
+        super().close()
+
+
+def _open_binary(path, codec):
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "zstd":
+        source, module = _zstd()
+        if source == "stdlib":
+            return module.ZstdFile(path, "r")
+        return io.BufferedReader(_ZstandardReader(module, path))
+    if codec == "lz4":
+        return _lz4().open(path, "rb")
+    raise ValueError(f"Nezināms saspiešanas veids: {codec}")
+
+
+def open_read(path, text=False):
+    """
+    Atver failu lasīšanai (atspiežot plūsmā, ja tas ir saspiests). text=True -> UTF-8 teksts.
+    Saspiestie faili atbalsta seek (atpakaļ - lēni, atspiežot no sākuma).
+    """
+    codec = detect(path)
+    if codec is None:
+        return open(path, "r", encoding="utf-8") if text else open(path, "rb")
+    f = _open_binary(path, codec)
+    return io.TextIOWrapper(f, encoding="utf-8") if text else f
+
+
+def read_bytes(path):
+    """Viss faila saturs atspiestā veidā (lielākai daļai kodeku - ar vienu izsaukumu)."""
+    codec = detect(path)
+    if codec is None or codec == "gzip":
+        with open(path, "rb") as f:
+            data = f.read()
+        return gzip.decompress(data) if codec else data
+    with _open_binary(path, codec) as f:
+        return f.read()
+
+
+def compress(data, codec):
+    """Saspiež baitus vienā izsaukumā (ātrāk nekā caur plūsmu). gzip bez laika zīmoga - vienāds saturs, vienādi baiti."""
+    if codec == "gzip":
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    if codec == "zstd":
+        source, module = _zstd()
+        if source == "stdlib":
+            return module.compress(data, level=ZSTD_LEVEL)
+        return module.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "lz4":
+        return _lz4().compress(data)
+    raise ValueError(f"Nezināms saspiešanas veids: {codec}")
+
+
+def wrap_writer(raw, codec):
+    """
+    Saspiešanas plūsma virs atvērta binārā faila `raw`. Tās aizvēršana ieraksta saspiestās
+    plūsmas beigas, bet `raw` paliek atvērts (atomic_write vēl to fsync'o un pārsauc).
+    """
+    if codec == "gzip":
+        return gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=GZIP_LEVEL, mtime=0)
+    if codec == "zstd":
+        source, module = _zstd()
+        if source == "stdlib":
+            return module.ZstdFile(raw, "w", level=ZSTD_LEVEL)
+        return module.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+    if codec == "lz4":
+        return _lz4().LZ4FrameFile(raw, mode="wb")
+    raise ValueError(f"Nezināms saspiešanas veids: {codec}")
+
+
+def _available(codec):
+    try:
+        compress(b"", codec)
+    except ImportError:
+        return False
+    return True
+
+
+class TestCompressedIO(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.data = {"Modem": {"Status": {"file": "40_X_NWB_EGEv3a", "rxLevel": "-83 dBm"},
+                               "Alarms": {"file": "40_X_NWB_EGEv3a", "list": [1, 2, 3]}}}
+
+    def tearDown(self):
+        for name in os.listdir(self.workdir):
+            os.remove(os.path.join(self.workdir, name))
+        os.rmdir(self.workdir)
+
+    def roundtrip(self, codec, extension):
+        from atomic_write import write_json_atomic
+        from mmap_load import MappedDocument, load_file
+        path = os.path.join(self.workdir, "out.json" + extension)
+        write_json_atomic(path, self.data, "none")
+        self.assertEqual(detect(path), codec)
+        self.assertEqual(load_file(path), self.data)
+        self.assertEqual(load_file(path, threshold=0), self.data)
+        with MappedDocument(path) as doc:
+            self.assertEqual(doc.get("Modem.Alarms.list"), [1, 2, 3])
+
+    def test_gzip(self):
+        self.roundtrip("gzip", ".gz")
+
+    @unittest.skipUnless(_available("zstd"), "nav zstd")
+    def test_zstd(self):
+        self.roundtrip("zstd", ".zst")
+
+    @unittest.skipUnless(_available("lz4"), "nav lz4")
+    def test_lz4(self):
+        self.roundtrip("lz4", ".lz4")
+
+    def test_jsonl_and_validation(self):
+        import jsonl
+        from valideJSNO import check_json_file
+        path = os.path.join(self.workdir, "records.jsonl.gz")
+        records = [{"name": f"r{i}", "value": i} for i in range(100)]
+        self.assertTrue(jsonl.is_jsonl(path))
+        jsonl.write_jsonl(path, records)
+        with open(path, "rb") as f:
+            first = f.read()
+        jsonl.write_jsonl(path, records)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), first) #bez laika zīmoga - baitu precīzi atkārtojams
+        offsets = list(jsonl.iter_jsonl(path, with_offsets=True))
+        self.assertEqual([record for _, record in offsets], records)
+        with open_read(path) as f: #atpakaļ pēc pozīcijas, kā merge_jsonl_files otrajā piegājienā
+            self.assertEqual(jsonl.read_record_at(f, offsets[50][0]), records[50])
+            self.assertEqual(jsonl.read_record_at(f, offsets[3][0]), records[3])
+
+        disguised = os.path.join(self.workdir, "archive.json")  #gzip bez .gz paplašinājuma
+        with open(disguised, "wb") as f:
+            f.write(compress(b'{"a": [1, 2}', "gzip"))
+        for streaming in (False, True):
+            result = check_json_file(disguised, streaming=streaming)
+            self.assertEqual((result["status"], result["line"], result["column"]), ("invalid", 1, 12))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Pastāvīgi strādājošs apvienošanas serviss. Dokumenti paliek parsēti atmiņā, pieprasījumi
+(merge / overwrite / validate / flush) tiek saņemti caur Unix socket vai localhost TCP,
+izmaiņas tiek rakstītas diskā periodiski (vai uzreiz ar --sync).
+
+    ./daemon.py serve --flush-interval 1
+    ./daemon.py client -c merge -f modem1.json modem2.json -o merged.json
+
+Protokols: katrā rindā viens JSON pieprasījums, atbilde arī viena JSON rinda, piem.
+{"operation": "merge", "input": ["/abs/a.json"], "output": "/abs/merged.json"}
+
+Drošība: Unix socket tiek veidots lietotāja privātā direktorijā ($XDG_RUNTIME_DIR vai
+<tmp>/json_merge-<lietotājs>, 0700) ar tiesībām 0600. TCP režīmā katram pieprasījumam
+vajag "token" (--token, JSON_MERGE_TOKEN vai serviss to ģenerē un saglabā 0600 failā
+privātajā direktorijā, no kurienes klients to nolasa). Izvades drīkst būt tikai servisa
+direktorijā (--root, noklusējums - direktorija, kurā serviss palaists).
+"""
+import argparse
+import asyncio
+import getpass
+import hmac
+import os
+import secrets
+import signal
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import jsoncodec
+import locking
+from argumntunodnokomandrindas import merge_json
+from atomic_write import DURABILITY_LEVELS, BatchWriter
+from mmap_load import load_file
+from valideJSNO import check_json_file, format_result
+
+SOCKET_NAME = "json_merge.sock"
+TOKEN_NAME = "json_merge.token"
+TOKEN_ENV = "JSON_MERGE_TOKEN"
+
+
+def runtime_dir():
+    """Lietotāja privātā direktorija socket un token failiem (citi lietotāji tajā neko nevar mainīt)."""
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base and os.path.isdir(base):
+        return base
+    path = os.path.join(tempfile.gettempdir(), f"json_merge-{getpass.getuser()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or (hasattr(os, "getuid") and st.st_uid != os.getuid()) or st.st_mode & 0o077:
+        raise PermissionError(f"{path} nav droša direktorija (jāpieder šim lietotājam, tiesības 0700)")
+    return path
+
+
+def default_socket():
+    return os.path.join(runtime_dir(), SOCKET_NAME)
+
+
+def _token_path():
+    return os.path.join(runtime_dir(), TOKEN_NAME)
+
+
+def _save_token(token):
+    path = _token_path()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        if hasattr(os, "fchmod"):
+            os.fchmod(f.fileno(), 0o600)  #ja fails jau bija ar citām tiesībām
+        f.write(token)
+    return path
+
+
+def _load_token():
+    token = os.environ.get(TOKEN_ENV)
+    if token:
+        return token
+    try:
+        with open(_token_path(), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class MergeService:
+    """
+    Servisa stāvoklis: parsēto failu kešs (atjaunojas, ja fails diskā mainās) un
+    "netīrās" izvades, kas vēl nav ierakstītas. Visi dokumenti tiek apvienoti ar
+    merge_json(mode="share"), tāpēc kešotie dokumenti nekad netiek mainīti.
+    """
+
+    def __init__(self, durability="fsync", root=None, token=None):
+        self.durability = durability
+        self.root = os.path.realpath(root or os.getcwd())
+        self.token = token  #ja dots, pieprasījumos vajag {"token": ...}
+        self.cache = {}  #ceļš -> ((mtime_ns, izmērs), dati)
+        self.dirty = {}  #ceļš -> dati, kas vēl nav diskā
+        self.flushing = {}  #ceļš -> dati, kas pašlaik tiek rakstīti
+        self.overwritten = set()  #izvades ar overwrite kopš pēdējās ierakstīšanas
+        self._locks = {}
+        self._flush_lock = asyncio.Lock()
+
+    def lock(self, path):
+        return self._locks.setdefault(path, asyncio.Lock())
+
+    def pending(self, paths):
+        """Vēl neierakstītie dati šiem ceļiem (izsauc notikumu cilpā, jo flush tos pārvieto)."""
+        found = {}
+        for path in paths:
+            if path in self.dirty:
+                found[path] = self.dirty[path]
+            elif path in self.flushing:
+                found[path] = self.flushing[path]
+        return found
+
+    def load(self, path):
+        """Parsēts fails no diska vai keša (drīkst izsaukt no pavediena)."""
+        key = _stat_key(path)
+        cached = self.cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        data = load_file(path)
+        self.cache[path] = (key, data)
+        return data
+
+    def merge(self, inputs, output, operation, mode="share", pending=None):
+        """
+        Aprēķina jauno izvadi un atgriež to (izpildās pavedienā, servisa stāvokli nemaina).
+        Ievades tiek apvienotas ar izvadi pa vienai, tāpat kā secīgos pieprasījumos.
+        """
+        pending = pending or {}
+        load = lambda path: pending[path] if path in pending else self.load(path)
+        mode = "share" if mode == "inplace" else mode  #inplace sabojātu kešu
+        if operation == "merge":
+            if output in pending or os.path.exists(output):
+                result = load(output)
+            else:
+                result = {}
+        else:
+            result = None
+        for path in inputs:
+            data = load(path)
+            result = data if result is None else merge_json(result, data, mode)
+        if operation != "merge" and not isinstance(result, (dict, list)):
+            raise ValueError("Ievadei jābūt JSON objektam vai masīvam!")
+        return result
+
+    def _rebase(self, path, data):
+        """
+        Ja izvadi kopš mūsu pēdējās nolasīšanas/ierakstīšanas mainījis cits rakstītājs (piem.
+        argumntunodnokomandrindas.py), mūsu izmaiņas tiek apvienotas ar diska versiju.
+        """
+        try:
+            key = _stat_key(path)
+        except FileNotFoundError:
+            return data
+        cached = self.cache.get(path)
+        if cached is not None and cached[0] == key:
+            return data
+        return merge_json(load_file(path), data, "share")
+
+    def _write(self, pending, overwritten):
+        """Raksta ar izvades slēdzenēm (tās pašas, ko ņem CLI), sakārtotā secībā - bez strupceļiem."""
+        locks = [locking.FileLock(path) for path in sorted(pending)]
+        try:
+            for lock in locks:
+                lock.acquire()
+            batch = BatchWriter(self.durability)
+            for path, data in pending.items():
+                if path not in overwritten:
+                    pending[path] = data = self._rebase(path, data)
+                batch.stage(path, data)
+            written = batch.commit()
+            for path, data in pending.items():
+                self.cache[path] = (_stat_key(path), data)
+            return written
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    async def flush(self):
+        """Ieraksta visas netīrās izvades vienā BatchWriter commit (atsevišķā pavedienā)."""
+        async with self._flush_lock:
+            if not self.dirty:
+                return []
+            pending, self.dirty = self.dirty, {}
+            overwritten, self.overwritten = self.overwritten, set()
+            self.flushing = pending
+            try:
+                written = await asyncio.get_running_loop().run_in_executor(None, self._write, pending, overwritten)
+            except Exception:
+                for path, data in pending.items():
+                    if path not in self.dirty:  #mēģinās vēlreiz nākamajā reizē
+                        self.dirty[path] = data
+                        self.overwritten |= overwritten & {path}
+                raise
+            finally:
+                self.flushing = {}
+            return written
+
+    def allowed(self, path):
+        """Izvade drīkst būt tikai servisa direktorijā (simboliskās saites tiek atrisinātas)."""
+        real = os.path.realpath(path)
+        return os.path.commonpath([real, self.root]) == self.root
+
+    async def handle(self, request):
+        if self.token is not None and not hmac.compare_digest(
+                str(request.get("token") or "").encode("utf-8"), self.token.encode("utf-8")):
+            return {"ok": False, "error": "Nederīgs vai trūkstošs token"}
+        operation = request.get("operation")
+        inputs = request.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if operation == "validate":
+            loop = asyncio.get_running_loop()
+            results = [await loop.run_in_executor(None, check_json_file, path) for path in inputs]
+            return {"ok": all(r["status"] == "valid" for r in results), "results": results}
+        if operation == "flush":
+            return {"ok": True, "written": await self.flush()}
+        if operation not in ("merge", "overwrite"):
+            return {"ok": False, "error": f"Nezināma operācija: {operation}"}
+        output = request.get("output")
+        if not inputs or not output:
+            return {"ok": False, "error": "Vajag 'input' un 'output'"}
+        if not self.allowed(output):
+            return {"ok": False, "error": f"Izvade {output} ir ārpus servisa direktorijas {self.root}"}
+        for path in inputs:
+            if not os.path.exists(path) and path not in self.dirty:
+                return {"ok": False, "error": f"Ievades fails {path} neeksistē!"}
+        async with self.lock(output):
+            #parsēšana un apvienošana pavedienā - citi pieprasījumi tikmēr tiek apkalpoti
+            pending = self.pending(inputs + [output])
+            self.dirty[output] = await asyncio.get_running_loop().run_in_executor(
+                None, self.merge, inputs, output, operation, request.get("merge_mode", "share"), pending)
+            if operation == "overwrite":
+                self.overwritten.add(output)
+        if request.get("sync"):
+            await self.flush()
+        return {"ok": True, "output": output, "pending": output in self.dirty}
+
+
+async def _serve_connection(service, reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                response = await service.handle(jsoncodec.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            writer.write(jsoncodec.dumps(response, indent=None).encode("utf-8") + b"\n")
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def _flush_periodically(service, interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await service.flush()
+        except Exception as e:
+            print(f"KĻŪDA: Neizdevās ierakstīt izvades: {str(e)}", file=sys.stderr)
+
+
+async def serve(socket_path=None, port=None, flush_interval=1.0, durability="fsync", ready=None,
+                root=None, token=None):
+    if port is not None and token is None:
+        token = os.environ.get(TOKEN_ENV) or secrets.token_hex(16)
+        print(f"Token saglabāts: {_save_token(token)}", file=sys.stderr)
+    service = MergeService(durability, root, token if port is not None else None)
+    handler = lambda reader, writer: _serve_connection(service, reader, writer)
+    if port is not None:
+        server = await asyncio.start_server(handler, "127.0.0.1", port)
+        where = f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    else:
+        socket_path = socket_path or default_socket()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  #palicis no iepriekšējas palaišanas
+        old_umask = os.umask(0o177)  #socket ar tiesībām 0600 jau izveidošanas brīdī
+        try:
+            server = await asyncio.start_unix_server(handler, socket_path)
+        finally:
+            os.umask(old_umask)
+        where = socket_path
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  #Windows vai ne galvenais pavediens
+    flusher = asyncio.create_task(_flush_periodically(service, flush_interval))
+    print(f"Serviss klausās: {where}", file=sys.stderr)
+    if ready is not None:
+        ready.set_result(service)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        flusher.cancel()
+        await service.flush()  #neko nepazaudē, beidzot darbu
+        if port is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def request(payload, socket_path=None, port=None, timeout=60, token=None):
+    """Nosūta vienu pieprasījumu servisam un atgriež atbildi (sinhroni). TCP režīmā pievieno token."""
+    if port is not None:
+        token = token or _load_token()
+        if token:
+            payload = dict(payload, token=token)
+        conn = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+    else:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(timeout)
+        conn.connect(socket_path or default_socket())
+    with conn, conn.makefile("rwb") as stream:
+        stream.write(jsoncodec.dumps(payload, indent=None).encode("utf-8") + b"\n")
+        stream.flush()
+        return jsoncodec.loads(stream.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON apvienošanas serviss un klients")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "client"):
+        sub = commands.add_parser(name)
+        sub.add_argument("--socket", help=f"Unix socket ceļš (noklusējums: <privātā direktorija>/{SOCKET_NAME})")
+        sub.add_argument("--port", type=int, help="Izmantot 127.0.0.1 TCP portu Unix socket vietā")
+        sub.add_argument("--token", help=f"TCP režīma token (vai {TOKEN_ENV}; noklusējums - servisa saglabātais)")
+    serve_parser = commands.choices["serve"]
+    serve_parser.add_argument("--flush-interval", type=float, default=1.0, help="Cik bieži rakstīt diskā (sekundes)")
+    serve_parser.add_argument("--durability", choices=DURABILITY_LEVELS, default="fsync")
+    serve_parser.add_argument("--root", help="Direktorija, kurā drīkst rakstīt izvades (noklusējums: pašreizējā)")
+    client_parser = commands.choices["client"]
+    client_parser.add_argument("-c", "--operation", choices=["merge", "overwrite", "validate", "flush"], required=True)
+    client_parser.add_argument("-f", "--input", nargs="+", default=[], help="Ievades fails (vai vairāki faili)")
+    client_parser.add_argument("-o", "--output", help="Izvades fails")
+    client_parser.add_argument("--merge-mode", choices=["copy", "share"], default="share")
+    client_parser.add_argument("--sync", action="store_true", help="Gaidīt, līdz izvade ierakstīta diskā")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.socket, args.port, args.flush_interval, args.durability,
+                              root=args.root, token=args.token))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    payload = {"operation": args.operation, "input": [os.path.abspath(p) for p in args.input],
+               "merge_mode": args.merge_mode, "sync": args.sync}
+    if args.output:
+        payload["output"] = os.path.abspath(args.output)  #serviss var strādāt citā direktorijā
+    try:
+        response = request(payload, args.socket, args.port, token=args.token)
+    except OSError as e:
+        print(f"KĻŪDA: Nevarēja sazināties ar servisu: {str(e)}")
+        sys.exit(1)
+    if "results" in response:
+        for result in response["results"]:
+            print(f"{result['file']}: {format_result(result)}")
+    if not response.get("ok"):
+        if "error" in response:
+            print(f"KĻŪDA: {response['error']}")
+        sys.exit(1)
+    if args.operation == "flush":
+        print(f"IERAKSTĪTS: {', '.join(response['written']) or 'nav izmaiņu'}")
+    else:
+        state = "gaida ierakstīšanu" if response.get("pending") else "ierakstīts"
+        print(f"{'APVIENOŠANA' if args.operation == 'merge' else 'PĀRRAKSTĪŠANA'} VEIKSMĪGA: "
+              f"{', '.join(args.input)} uz {args.output} ({state})")
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "vajag Unix socket")
+class TestMergeService(unittest.TestCase):
+
+    def test_merge_and_flush(self):
+        workdir = tempfile.mkdtemp()
+        socket_path = os.path.join(workdir, "test.sock")
+        a, b, out = (os.path.join(workdir, name) for name in ("a.json", "b.json", "out.json"))
+        for path, data in ((a, {"Modem": {"Status": {"x": "1"}}}), (b, {"Modem": {"Alarms": {"y": "2"}}})):
+            with open(path, "w", encoding="utf-8") as f:
+                jsoncodec.dump(data, f)
+
+        async def scenario():
+            ready = asyncio.get_running_loop().create_future()
+            server = asyncio.create_task(serve(socket_path, flush_interval=3600, durability="none", ready=ready,
+                                                 root=workdir))
+            await ready
+            loop = asyncio.get_running_loop()
+            self.assertEqual(stat.S_IMODE(os.stat(socket_path).st_mode), 0o600)
+            call = lambda payload: loop.run_in_executor(None, request, payload, socket_path)
+            response = await call({"operation": "merge", "input": [a], "output": out})
+            self.assertTrue(response["pending"])
+            self.assertFalse(os.path.exists(out)) #vēl tikai atmiņā
+            await call({"operation": "merge", "input": [b], "output": out, "sync": True})
+            self.assertEqual((await call({"operation": "validate", "input": [out]}))["ok"], True)
+            self.assertFalse((await call({"operation": "nav"}))["ok"])
+            server.cancel()
+
+        asyncio.run(scenario())
+        with open(out, "r", encoding="utf-8") as f:
+            self.assertEqual(jsoncodec.load(f), {"Modem": {"Status": {"x": "1"}, "Alarms": {"y": "2"}}})
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+    def test_token_and_root(self): #TCP režīmā bez token nekas netiek darīts; izvade tikai servisa direktorijā
+        workdir = tempfile.mkdtemp()
+        source = os.path.join(workdir, "a.json")
+        with open(source, "w", encoding="utf-8") as f:
+            jsoncodec.dump({"a": 1}, f)
+        service = MergeService("none", root=workdir, token="s3cret")
+        merge = {"operation": "merge", "input": [source], "output": os.path.join(workdir, "out.json")}
+        try:
+            for token in (None, "wrong", "ā"):
+                response = asyncio.run(service.handle(dict(merge, token=token)))
+                self.assertIn("token", response["error"])
+            self.assertTrue(asyncio.run(service.handle(dict(merge, token="s3cret")))["ok"])
+            for output in (os.path.join(workdir, "..", "out.json"), "/etc/passwd"):
+                response = asyncio.run(service.handle(dict(merge, token="s3cret", output=output)))
+                self.assertFalse(response["ok"])
+            os.symlink(tempfile.gettempdir(), os.path.join(workdir, "link"))
+            self.assertFalse(service.allowed(os.path.join(workdir, "link", "out.json")))
+            self.assertEqual(set(service.dirty), {os.path.join(workdir, "out.json")})
+        finally:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+        self.assertEqual(stat.S_IMODE(os.stat(runtime_dir()).st_mode) & 0o077, 0)
+
+    def test_flush_waits_for_output_lock(self): #CLI tur slēdzeni - daemon gaida un neizdzēš CLI izmaiņas
+        workdir = tempfile.mkdtemp()
+        source, out = os.path.join(workdir, "a.json"), os.path.join(workdir, "out.json")
+        for path, data in ((source, {"a": 1}), (out, {"old": 1})):
+            with open(path, "w", encoding="utf-8") as f:
+                jsoncodec.dump(data, f)
+        service = MergeService("none", root=workdir)
+        try:
+            self.assertTrue(asyncio.run(service.handle({"operation": "merge", "input": [source], "output": out}))["ok"])
+            lock = locking.FileLock(out)
+            lock.acquire()
+            flusher = threading.Thread(target=asyncio.run, args=(service.flush(),))
+            flusher.start()
+            flusher.join(0.3)
+            self.assertTrue(flusher.is_alive())
+            with open(out, "w", encoding="utf-8") as f:
+                jsoncodec.dump({"old": 1, "cli": 2}, f)  #CLI ieraksta, kamēr tur slēdzeni
+            lock.release()
+            flusher.join(5)
+            self.assertFalse(flusher.is_alive())
+            self.assertEqual(load_file(out), {"old": 1, "cli": 2, "a": 1})
+            self.assertEqual(service.load(out), {"old": 1, "cli": 2, "a": 1})
+        finally:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+    def test_slow_merge_does_not_block_loop(self):
+        workdir = tempfile.mkdtemp()
+        slow, fast, out1, out2 = (os.path.join(workdir, name) for name in ("slow.json", "fast.json", "o1.json", "o2.json"))
+        documents = [{"k": {"x": 1}}, {"k": {"z": 0}}, {"k": [1]}, {"k": {"y": 2}}]
+        inputs = [os.path.join(workdir, f"in{i}.json") for i in range(len(documents))]
+        for path, data in [(slow, {"a": 1}), (fast, {"b": 2})] + list(zip(inputs, documents)):
+            with open(path, "w", encoding="utf-8") as f:
+                jsoncodec.dump(data, f)
+        started, release = threading.Event(), threading.Event()
+        original_load = load_file
+
+        def slow_load(path, *args, **kwargs):
+            if path == slow:
+                started.set()
+                release.wait(5)
+            return original_load(path, *args, **kwargs)
+
+        async def scenario():
+            service = MergeService("none", root=workdir)
+            loop = asyncio.get_running_loop()
+            first = asyncio.create_task(service.handle({"operation": "merge", "input": [slow], "output": out1}))
+            await loop.run_in_executor(None, started.wait, 5)
+            second = await asyncio.wait_for(service.handle({"operation": "merge", "input": [fast], "output": out2}), 5)
+            self.assertTrue(second["ok"])
+            self.assertFalse(first.done()) #lēnā apvienošana vēl notiek
+            release.set()
+            self.assertTrue((await first)["ok"])
+            self.assertEqual(service.dirty, {out1: {"a": 1}, out2: {"b": 2}})
+            await service.handle({"operation": "merge", "input": inputs, "output": out1})
+            self.assertEqual(service.dirty[out1], {"a": 1, "k": {"x": 1, "z": 0, "y": 2}}) #kā secīgi pieprasījumi
+
+        try:
+            with mock.patch(__name__ + ".load_file", side_effect=slow_load):
+                asyncio.run(scenario())
+        finally:
+            release.set()
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
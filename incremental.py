@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import unittest
+
+import jsoncodec
+
+MANIFEST_SUFFIX = ".manifest.json"
+SUBTREE_DEPTH = 3  #cik līmeņos glabā apakškoku hash (Modem -> Status -> ...)
+
+
+def manifest_path(output_file):
+    return output_file + MANIFEST_SUFFIX
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def subtree_hashes(value, depth=SUBTREE_DEPTH):
+    """
+    Merkle koks: dict līmeņos līdz `depth` glabā katras atslēgas hash, vecāka hash
+    tiek aprēķināts no bērnu hash, tāpēc katrs mezgls tiek serializēts tikai vienreiz.
+    """
+    if depth > 0 and isinstance(value, dict):
+        children = {key: subtree_hashes(child, depth - 1) for key, child in value.items()}
+        digest = hashlib.sha1()
+        for key in sorted(children):
+            digest.update(json.dumps(key).encode("utf-8"))
+            digest.update(children[key]["#"].encode("ascii"))
+        return {"#": digest.hexdigest(), "keys": children}
+    serialized = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return {"#": hashlib.sha1(serialized).hexdigest()}
+
+
+def changed_part(value, new_tree, old_tree):
+    """
+    Atgriež tikai tās ievades daļas, kuru hash atšķiras no iepriekšējās reizes.
+    merge_json ir idempotents (atkārtota tā paša apakškoka apvienošana neko nemaina),
+    tāpēc nemainītos apakškokus var droši izlaist.
+    """
+    if old_tree is None or "keys" not in old_tree or "keys" not in new_tree:
+        return value
+    part = {}
+    for key, child in value.items():
+        old_child = old_tree["keys"].get(key)
+        new_child = new_tree["keys"][key]
+        if old_child is None or new_child["#"] != old_child["#"]:
+            part[key] = changed_part(child, new_child, old_child)
+    return part
+
+
+def load_manifest(output_file):
+    """
+    Ielādē izvades faila blakusfailu (<output>.manifest.json). Ja izvades fails kopš
+    pēdējās reizes ir mainīts ārpus šī rīka, manifests vairs nav derīgs un tiek atmests.
+    """
+    empty = {"output": None, "inputs": {}}
+    try:
+        with open(manifest_path(output_file), "r", encoding="utf-8") as f:
+            manifest = jsoncodec.load(f)
+    except (OSError, ValueError):
+        return empty
+    if not os.path.exists(output_file) or manifest.get("output") != _stat_key(output_file):
+        return empty
+    return manifest
+
+
+def input_fingerprint(manifest, input_file):
+    """Atgriež ievades nospiedumu, vai None, ja ievade nav mainījusies kopš pēdējās apvienošanas."""
+    stat = _stat_key(input_file)
+    entry = manifest["inputs"].get(os.path.abspath(input_file))
+    if entry and entry["mtime_ns"] == stat["mtime_ns"] and entry["size"] == stat["size"]:
+        return None  #ātrā pārbaude: fails nav aiztikts
+    sha = file_sha256(input_file)
+    if entry and entry["sha256"] == sha:
+        entry.update(stat)  #saturs tas pats, tikai mtime mainījies (piem. "touch")
+        return None
+    return dict(stat, sha256=sha)
+
+
+def previous_subtrees(manifest, input_file):
+    entry = manifest["inputs"].get(os.path.abspath(input_file))
+    return entry.get("subtrees") if entry else None
+
+
+def record_input(manifest, input_file, fingerprint, tree):
+    manifest["inputs"][os.path.abspath(input_file)] = dict(fingerprint, subtrees=tree)
+
+
+def save_manifest(output_file, manifest):
+    """Saglabā manifestu kopā ar izvades faila nospiedumu (izsauc pēc izvades ierakstīšanas)."""
+    manifest["output"] = _stat_key(output_file)
+    path = manifest_path(output_file)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        jsoncodec.dump(manifest, f, indent=None)
+    os.replace(tmp_path, path)
+
+
+class TestIncremental(unittest.TestCase):
+
+    def test_changed_part(self):
+        old = {"Modem": {"Status": {"rxLevel": "-83 dBm", "snr": "20"}, "Alarms": {"a": 1}}}
+        new = {"Modem": {"Status": {"rxLevel": "-80 dBm", "snr": "20"}, "Alarms": {"a": 1}}}
+        self.assertEqual(changed_part(new, subtree_hashes(new), subtree_hashes(old)),
+                         {"Modem": {"Status": {"rxLevel": "-80 dBm"}}})
+        self.assertEqual(changed_part(old, subtree_hashes(old), subtree_hashes(old)), {})
+        self.assertEqual(changed_part([1, 2], subtree_hashes([1, 2]), subtree_hashes([1])), [1, 2])
+
+    def test_manifest_roundtrip(self):
+        with open('test_inc_in.json', 'w', encoding='utf-8') as f:
+            json.dump({"a": 1}, f)
+        with open('test_inc_out.json', 'w', encoding='utf-8') as f:
+            json.dump({"a": 1}, f)
+        try:
+            manifest = load_manifest('test_inc_out.json')
+            fingerprint = input_fingerprint(manifest, 'test_inc_in.json')
+            self.assertIsNotNone(fingerprint)
+            record_input(manifest, 'test_inc_in.json', fingerprint, subtree_hashes({"a": 1}))
+            save_manifest('test_inc_out.json', manifest)
+            self.assertIsNone(input_fingerprint(load_manifest('test_inc_out.json'), 'test_inc_in.json'))
+            with open('test_inc_out.json', 'w', encoding='utf-8') as f: #ārēja izmaiņa padara manifestu nederīgu
+                json.dump({"a": 1, "b": 2}, f)
+            self.assertEqual(load_manifest('test_inc_out.json')["inputs"], {})
+        finally:
+            for name in ('test_inc_in.json', 'test_inc_out.json', manifest_path('test_inc_out.json')):
+                os.remove(name)
+
+
+if __name__ == '__main__':
+    unittest.main()
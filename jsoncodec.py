@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import unittest
+
+# Vienots JSON slānis visiem rīkiem. Ja ir instalēts ātrāks parsētājs (orjson vai ujson),
+# tiek izmantots tas, citādi standarta json. Backend var piespiest ar vidi: JSON_BACKEND=json
+#
+# - loads: ja ātrais parsētājs atsakās (kļūda, NaN, ļoti lieli skaitļi), dokuments tiek
+#   parsēts vēlreiz ar json.loads - tādējādi kļūdas ziņojumi (rinda/kolonna) ir tie paši
+# - loads: UTF-8 BOM baitos tiek noraidīts tāpat kā tekstā (json.loads ar bytes to klusām atmestu)
+# - memoryview bez kopēšanas parsē tikai orjson (parses_memoryview), pārējie kopē visus baitus
+# - dumps: indent=None nozīmē kompaktu izvadi (mašīnām), ātrais serializētājs tiek
+#   izmantots kompaktai izvadei un orjson arī indent=2; indent=4 vienmēr raksta json modulis,
+#   lai izvade paliktu tieši tāda pati kā līdz šim
+# - orjson raksta NaN/Infinity kā null (tie nav derīgs JSON)
+# - orjson veselos skaitļus ārpus 64 bitiem nolasa kā float, tāpēc dokumenti ar 19+ ciparu
+#   virknēm tiek parsēti ar json moduli
+# - objekti ar __json__() metodi (piem. normalize.PackedArray) tiek serializēti kā tās rezultāts
+
+_LONG_DIGITS = re.compile(r"[0-9]{19}")
+_LONG_DIGITS_BYTES = re.compile(rb"[0-9]{19}")
+_BOM = b"\xef\xbb\xbf"
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(obj):
+    to_json = getattr(obj, "__json__", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_json()
+
+
+def _select_backend(preferred=None):
+    candidates = [preferred] if preferred else ["orjson", "ujson"]
+    for name in candidates:
+        if name == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                continue
+
+            def fast_dumps(obj, indent):
+                option = orjson.OPT_INDENT_2 if indent == 2 else 0
+                return orjson.dumps(obj, default=_default, option=option).decode("utf-8")
+            return "orjson", orjson.loads, fast_dumps
+        if name == "ujson":
+            try:
+                import ujson
+            except ImportError:
+                continue
+
+            def fast_dumps(obj, indent):
+                if indent is not None:
+                    raise ValueError("ujson tiek izmantots tikai kompaktai izvadei")
+                return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, default=_default)
+            return "ujson", ujson.loads, fast_dumps
+    return "json", None, None
+
+
+BACKEND, _fast_loads, _fast_dumps = _select_backend(os.environ.get("JSON_BACKEND", "").lower() or None)
+
+
+def loads(data):
+    """Parsē JSON no str, bytes vai memoryview (piem. mmap skats - orjson to lasa bez kopēšanas)."""
+    if _fast_loads is not None and not (_LONG_DIGITS_BYTES if isinstance(data, (bytes, bytearray, memoryview))
+                                        else _LONG_DIGITS).search(data):
+        try:
+            return _fast_loads(data)
+        except (ValueError, TypeError, OverflowError):
+            pass  #json.loads vai nu izdosies (NaN, lieli skaitļi), vai izmetīs precīzu JSONDecodeError
+    if not isinstance(data, str) and data[:3] == _BOM:
+        raise JSONDecodeError("Unexpected UTF-8 BOM (decode using utf-8-sig)", "\ufeff", 0)
+    if isinstance(data, memoryview):
+        data = data.tobytes()  #json modulis memoryview nepieņem
+    return json.loads(data)
+
+
+def parses_memoryview():
+    """Vai loads() parsē memoryview (piem. mmap) bez visa satura kopēšanas."""
+    return BACKEND == "orjson"
+
+
+def load(f):
+    return loads(f.read())
+
+
+def dumps(obj, indent=4, ensure_ascii=False):
+    """Serializē JSON. indent=None -> kompakta izvade bez atstarpēm."""
+    if _fast_dumps is not None and not ensure_ascii and (indent is None or (indent == 2 and BACKEND == "orjson")):
+        try:
+            return _fast_dumps(obj, indent)
+        except (TypeError, ValueError, OverflowError):
+            pass  #piem. int > 64 biti vai nestandarta tips - json modulis tiks ar to galā vai izmetīs kļūdu
+    separators = (",", ":") if indent is None else None
+    return json.dumps(obj, indent=indent, ensure_ascii=ensure_ascii, separators=separators, default=_default)
+
+
+def dump(obj, f, indent=4, ensure_ascii=False):
+    f.write(dumps(obj, indent, ensure_ascii))
+
+
+class TestJsonCodec(unittest.TestCase):
+
+    def test_roundtrip_matches_stdlib(self):
+        data = {"Modem": {"name": "40 MHz", "acmModulations": ["QPSK", ""], "n": [1, 2.5, None, True]}, "ā": {}}
+        self.assertEqual(loads(dumps(data)), data)
+        self.assertEqual(dumps(data), json.dumps(data, indent=4, ensure_ascii=False))
+        self.assertEqual(dumps(data, indent=2), json.dumps(data, indent=2, ensure_ascii=False))
+        self.assertEqual(loads(dumps(data, indent=None)), data)
+        self.assertNotIn(" ", dumps({"a": [1, 2]}, indent=None))
+        self.assertEqual(loads(b'{"a": 1}'), {"a": 1})
+
+    def test_fallback(self):
+        self.assertEqual(loads('[' + '9' * 30 + ']'), [int('9' * 30)]) #ātrie parsētāji neatbalsta tik lielus skaitļus
+        self.assertEqual(dumps([2 ** 70], indent=None), "[" + str(2 ** 70) + "]")
+        with self.assertRaises(JSONDecodeError) as cm: #kļūdas ziņojums tāds pats kā json.loads
+            loads('{"a": 1,\n "b" 2}')
+        self.assertEqual((cm.exception.msg, cm.exception.lineno, cm.exception.colno), ("Expecting ':' delimiter", 2, 6))
+
+    def test_bom_rejected_like_text(self):
+        for data in ('\ufeff{"a": 1}', _BOM + b'{"a": 1}', memoryview(_BOM + b'{"a": 1}')):
+            with self.assertRaisesRegex(JSONDecodeError, "Unexpected UTF-8 BOM"):
+                loads(data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+import argparse
+import copy
+import random
+import sys
+import unittest
+from collections.abc import Mapping
+
+import jsoncodec
+from struct_hash import freeze
+
+
+class PatchError(ValueError):
+    """JSON Patch operāciju nevar izpildīt (nav ceļa, neizdevās "test" u.c.)."""
+
+
+def escape_pointer(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _parts(pointer):
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise PatchError(f"Nederīgs JSON Pointer: {pointer}")
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def _digest(value, memo):
+    """
+    Merkle hash katram mezglam (atmiņā pēc id()), lai identiskus apakškokus varētu
+    atpazīt, tos neapstaigājot vēlreiz. Tipi tiek atšķirti tāpat kā JSON (1 != 1.0 != true).
+    """
+    if isinstance(value, (Mapping, list)):
+        cached = memo.get(id(value))
+        if cached is not None:
+            return cached[1]
+        if isinstance(value, Mapping):
+            digest = hash(('d', frozenset((key, _digest(child, memo)) for key, child in value.items())))
+        else:
+            digest = hash(('l', tuple(_digest(child, memo) for child in value)))
+        memo[id(value)] = (value, digest)
+        return digest
+    return hash(freeze(value))
+
+
+def _same(a, b, memo):
+    if a is b:
+        return True
+    digests, frozen = memo
+    return _digest(a, digests) == _digest(b, digests) and freeze(a, frozen) == freeze(b, frozen)
+
+
+def diff(a, b, path='', _memo=None):
+    """
+    Atgriež RFC 6902 JSON Patch operāciju sarakstu, kas pārvērš `a` par `b`.
+    Identiski apakškoki tiek izlaisti pēc hash (bez rekursijas tajos).
+    """
+    memo = ({}, {}) if _memo is None else _memo  #(Merkle hash, freeze atslēgas)
+    if _same(a, b, memo):
+        return []
+    if isinstance(a, Mapping) and isinstance(b, Mapping):
+        ops = []
+        for key in a:
+            if key not in b:
+                ops.append({"op": "remove", "path": f"{path}/{escape_pointer(key)}"})
+        for key, value in b.items():
+            child = f"{path}/{escape_pointer(key)}"
+            if key not in a:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(diff(a[key], value, child, memo))
+        return ops
+    if isinstance(a, list) and isinstance(b, list):
+        # Nogriež kopīgo sākumu un beigas, vidusdaļu salīdzina pa indeksiem
+        start = 0
+        while start < len(a) and start < len(b) and _same(a[start], b[start], memo):
+            start += 1
+        end_a, end_b = len(a), len(b)
+        while end_a > start and end_b > start and _same(a[end_a - 1], b[end_b - 1], memo):
+            end_a -= 1
+            end_b -= 1
+        ops = []
+        common = min(end_a - start, end_b - start)
+        for offset in range(common):
+            index = start + offset
+            ops.extend(diff(a[index], b[index], f"{path}/{index}", memo))
+        for index in range(end_a - 1, start + common - 1, -1):  #no beigām, lai indeksi nemainās
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        for index in range(start + common, end_b):
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": b[index]})
+        return ops
+    return [{"op": "replace", "path": path, "value": b}]
+
+
+def _resolve(doc, parts):
+    for part in parts:
+        try:
+            doc = doc[int(part)] if isinstance(doc, list) else doc[part]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise PatchError(f"Ceļš nav atrasts: /{'/'.join(parts)}") from None
+    return doc
+
+
+def _list_index(container, part, allow_end):
+    if allow_end and part == '-':
+        return len(container)
+    try:
+        index = int(part)
+    except ValueError:
+        raise PatchError(f"Nederīgs masīva indekss: {part}") from None
+    if index < 0 or index > len(container) - (0 if allow_end else 1):
+        raise PatchError(f"Masīva indekss ārpus robežām: {part}")
+    return index
+
+
+def _add(doc, parts, value):
+    if not parts:
+        return value
+    parent = _resolve(doc, parts[:-1])
+    if isinstance(parent, list):
+        parent.insert(_list_index(parent, parts[-1], True), value)
+    elif isinstance(parent, dict):
+        parent[parts[-1]] = value
+    else:
+        raise PatchError(f"Nevar pievienot pie skalāras vērtības: /{'/'.join(parts)}")
+    return doc
+
+
+def _remove(doc, parts):
+    if not parts:
+        raise PatchError("Nevar izdzēst visu dokumentu")
+    parent = _resolve(doc, parts[:-1])
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, parts[-1], False))
+    try:
+        return parent.pop(parts[-1])
+    except (KeyError, AttributeError):
+        raise PatchError(f"Ceļš nav atrasts: /{'/'.join(parts)}") from None
+
+
+def apply_patch(doc, patch, in_place=False):
+    """Izpilda JSON Patch operācijas secīgi. Atgriež jauno dokumentu (oriģināls netiek mainīts)."""
+    if not in_place:
+        doc = copy.deepcopy(doc)
+    for op in patch:
+        kind = op.get("op")
+        parts = _parts(op.get("path", ""))
+        if kind == "add":
+            doc = _add(doc, parts, copy.deepcopy(op["value"]))
+        elif kind == "remove":
+            _remove(doc, parts)
+        elif kind == "replace":
+            _resolve(doc, parts)  #ceļam jāeksistē
+            if parts:
+                _remove(doc, parts)
+            doc = _add(doc, parts, copy.deepcopy(op["value"]))
+        elif kind in ("move", "copy"):
+            source = _parts(op["from"])
+            if kind == "move" and parts[:len(source)] == source and parts != source:
+                raise PatchError("Nevar pārvietot vērtību pašā sevī")
+            value = _remove(doc, source) if kind == "move" else copy.deepcopy(_resolve(doc, source))
+            doc = _add(doc, parts, value)
+        elif kind == "test":
+            if freeze(_resolve(doc, parts)) != freeze(op["value"]):
+                raise PatchError(f"test neizdevās: {op['path']}")
+        else:
+            raise PatchError(f"Nezināma operācija: {kind}")
+    return doc
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return jsoncodec.load(f)
+
+
+def _write(data, output):
+    if output in (None, "-"):
+        print(jsoncodec.dumps(data))
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            jsoncodec.dump(data, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON atšķirības (RFC 6902 JSON Patch) un to pielietošana",
+                                     epilog="Piemērs: ./jsondiff.py diff 4.json l.json -o delta.json")
+    commands = parser.add_subparsers(dest="command", required=True)
+    diff_parser = commands.add_parser("diff", help="Izveidot patch, kas pārvērš A par B")
+    diff_parser.add_argument("a")
+    diff_parser.add_argument("b")
+    diff_parser.add_argument("-o", "--output", help="Patch fails (noklusējums: konsole)")
+    apply_parser = commands.add_parser("apply", help="Pielietot patch dokumentam")
+    apply_parser.add_argument("document")
+    apply_parser.add_argument("patch")
+    apply_parser.add_argument("-o", "--output", help="Rezultāta fails (noklusējums: konsole)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "diff":
+            _write(diff(_load(args.a), _load(args.b)), args.output)
+        else:
+            _write(apply_patch(_load(args.document), _load(args.patch), in_place=True), args.output)
+    except (OSError, ValueError) as e:
+        print(f"KĻŪDA: {str(e)}")
+        sys.exit(1)
+
+
+class TestJsonDiff(unittest.TestCase):
+
+    def test_modem_roundtrip(self): #4.json -> l.json ar mazu patch
+        a, b = _load('4.json'), _load('l.json')
+        patch = diff(a, b)
+        self.assertEqual(apply_patch(a, patch), b)
+        self.assertLess(len(jsoncodec.dumps(patch, indent=None)), len(jsoncodec.dumps(b, indent=None)))
+        self.assertEqual(diff(a, copy.deepcopy(a)), [])
+
+    def test_types_and_escaping(self):
+        a = {"a/b": 1, "c~": [1, 2, 3], "x": True}
+        b = {"a/b": 1.0, "c~": [1, 3], "x": 1}
+        patch = diff(a, b)
+        self.assertIn({"op": "replace", "path": "/a~1b", "value": 1.0}, patch)
+        self.assertEqual(apply_patch(a, patch), b)
+
+    def test_random_lists(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            a = [rng.choice([1, 2, "x", {"k": 1}, [1]]) for _ in range(rng.randrange(6))]
+            b = [rng.choice([1, 2, "x", {"k": 2}, [1]]) for _ in range(rng.randrange(6))]
+            self.assertEqual(apply_patch({"l": a}, diff({"l": a}, {"l": b})), {"l": b})
+
+    def test_apply_operations(self):
+        doc = {"a": {"b": [1, 2]}}
+        result = apply_patch(doc, [{"op": "add", "path": "/a/b/-", "value": 3},
+                                   {"op": "copy", "from": "/a/b", "path": "/c"},
+                                   {"op": "move", "from": "/a/b/0", "path": "/d"},
+                                   {"op": "test", "path": "/c", "value": [1, 2, 3]}])
+        self.assertEqual(result, {"a": {"b": [2, 3]}, "c": [1, 2, 3], "d": 1})
+        self.assertEqual(doc, {"a": {"b": [1, 2]}})
+        with self.assertRaises(PatchError):
+            apply_patch(doc, [{"op": "test", "path": "/a/b/0", "value": 5}])
+        with self.assertRaises(PatchError):
+            apply_patch(doc, [{"op": "remove", "path": "/nav"}])
+
+
+if __name__ == "__main__":
+    main()
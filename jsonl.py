@@ -0,0 +1,73 @@
+import json
+import os
+import unittest
+
+import compressed_io
+import jsoncodec
+from atomic_write import atomic_open
+from stats import current as current_stats
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+
+def is_jsonl(path):
+    return compressed_io.strip_extension(path).lower().endswith(JSONL_EXTENSIONS)  #arī .jsonl.gz u.c.
+
+
+def iter_jsonl(path, with_offsets=False):
+    """
+    Nolasa JSON Lines failu pa vienam ierakstam (ģenerators, viss fails atmiņā netiek turēts).
+    with_offsets=True atgriež (baitu pozīcija, ieraksts), lai ierakstu vēlāk varētu nolasīt vēlreiz
+    (saspiestam failam - pozīcija atspiestajā plūsmā, skat. compressed_io.open_read). Tukšas rindas tiek izlaistas, bojātas rindas tiek izlaistas ar brīdinājumu.
+    """
+    offset = 0
+    with compressed_io.open_read(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line_offset = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = jsoncodec.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"Brīdinājums: {path} rinda {line_number} netika nolasīta: {e}")
+                continue
+            yield (line_offset, record) if with_offsets else record
+    current_stats().add("bytes_read", offset)
+
+
+def read_record_at(f, offset):
+    """Nolasa vienu ierakstu no binārā faila `f` pēc baitu pozīcijas."""
+    f.seek(offset)
+    return jsoncodec.loads(f.readline())
+
+
+def write_jsonl(path, records, durability='none'):
+    """Ieraksta ierakstus (jebkuru iterējamu, arī ģeneratoru) pa rindai. Atgriež ierakstu skaitu."""
+    count = 0
+    with atomic_open(path, durability) as f, current_stats().stage("write"):  #serializācija un rakstīšana mijas
+        for record in records:
+            f.write(jsoncodec.dumps(record, indent=None))
+            f.write('\n')
+            count += 1
+    return count
+
+
+class TestJsonl(unittest.TestCase):
+
+    def test_roundtrip_with_offsets(self):
+        records = [{"name": "Jānis", "value": 1}, {"name": "Anna", "value": [1, 2]}]
+        try:
+            self.assertEqual(write_jsonl('test_lines.jsonl', iter(records)), 2)
+            with open('test_lines.jsonl', 'a', encoding='utf-8') as f:
+                f.write('\n{bojāta rinda\n')
+            self.assertEqual(list(iter_jsonl('test_lines.jsonl')), records)
+            with open('test_lines.jsonl', 'rb') as f:
+                for offset, record in iter_jsonl('test_lines.jsonl', with_offsets=True):
+                    self.assertEqual(read_record_at(f, offset), record)
+        finally:
+            os.remove('test_lines.jsonl')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+"""
+Vairāku rakstītāju drošība vienai izvadei:
+
+- FileLock: ieteikuma (advisory) slēdzene `<output>.lock` failā (fcntl.flock, Windows - msvcrt).
+- Apvienošanas rinda `<output>.queue`: JSON Lines fails, kurā iesniedzēji tikai pieraksta
+  ierakstus. Tas, kuram izdodas paņemt izvades slēdzeni, apstrādā visu rindu vienā
+  nolasīšanā-apvienošanā-ierakstīšanā (viens fsync visai partijai), pārējie negaida.
+
+Protokols bez pazaudētiem ierakstiem: iesniedzējs vispirms pieraksta ierakstu rindā un tikai
+tad mēģina (negaidot) paņemt slēdzeni; katrs, kas atlaiž izvades slēdzeni, pēc atlaišanas
+vēlreiz pārbauda rindu. Tādējādi katru ierakstu apstrādā vai nu tā iesniedzējs, vai process,
+kas slēdzeni turēja ieraksta pievienošanas brīdī. Ieraksti no rindas tiek izņemti tikai pēc
+tam, kad izvade ir ierakstīta - pēc avārijas partija var tikt pielietota vēlreiz, kas
+apvienošanai neko nemaina (merge_json ir idempotents).
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import jsoncodec
+
+try:
+    import fcntl
+except ImportError:  #Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_SUFFIX = ".lock"
+QUEUE_SUFFIX = ".queue"
+
+
+class FileLock:
+    """
+    Ekskluzīva slēdzene blakus failam. Slēdzenes fails netiek dzēsts (dzēšana radītu sacensību
+    starp procesiem, kas to jau atvēruši). OS atlaiž slēdzeni arī tad, ja process avarē.
+    """
+
+    def __init__(self, path, suffix=LOCK_SUFFIX):
+        self.lock_path = path + suffix
+        self.fd = None
+
+    def acquire(self, blocking=True):
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                while True:
+                    try:
+                        msvcrt.locking(fd, mode, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        #LK_LOCK mēģina tikai ~10 sekundes - turpina gaidīt
+        except OSError:
+            os.close(fd)
+            if blocking:
+                raise
+            return False
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def queue_path(output):
+    return output + QUEUE_SUFFIX
+
+
+def enqueue(output, entry, durability="none"):
+    """Pieraksta vienu ierakstu rindas beigās (īsa rindas slēdzene, izvades slēdzene nav vajadzīga)."""
+    line = (jsoncodec.dumps(entry, indent=None) + "\n").encode("utf-8")
+    with FileLock(queue_path(output)):
+        with open(queue_path(output), "a+b") as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line  #iepriekšējais iesniedzējs avarēja rakstīšanas vidū
+            f.write(line)
+            f.flush()
+            if durability != "none":
+                os.fsync(f.fileno())
+
+
+def queue_size(output):
+    try:
+        return os.path.getsize(queue_path(output))
+    except FileNotFoundError:
+        return 0
+
+
+def read_queue(output):
+    """Atgriež (ieraksti, nolasīto baitu skaits). Rinda netiek mainīta."""
+    with FileLock(queue_path(output)):
+        try:
+            with open(queue_path(output), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+    consumed = data.rfind(b"\n") + 1  #nepabeigtu pēdējo rindu (ja tāda ir) atstāj nākamajai reizei
+    entries = []
+    for line_number, line in enumerate(data[:consumed].splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            entries.append(jsoncodec.loads(line))
+        except ValueError as e:
+            print(f"Brīdinājums: {queue_path(output)} rinda {line_number} netika nolasīta: {e}", file=sys.stderr)
+    return entries, consumed
+
+
+def discard_queue_prefix(output, consumed):
+    """Izņem jau apstrādātos pirmos `consumed` baitus; pa to laiku pievienotie ieraksti paliek."""
+    path = queue_path(output)
+    with FileLock(path):
+        with open(path, "rb") as f:
+            f.seek(consumed)
+            rest = f.read()
+        if not rest:
+            with open(path, "wb"):
+                pass  #iztukšo (fails paliek, lai nevajadzētu to izveidot katru reizi)
+            return
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", dir=os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(fd, "wb") as f:
+            f.write(rest)
+        os.replace(tmp_path, path)
+
+
+def drain(output, apply_batch):
+    """
+    Ja izvades slēdzene ir brīva, apstrādā rindu partijās: apply_batch(ieraksti) veic vienu
+    nolasīšanu-apvienošanu-ierakstīšanu. Atgriež apstrādāto ierakstu skaitu vai None, ja
+    slēdzeni tur cits process (tas apstrādās arī mūsu ierakstus).
+    """
+    applied = None
+    while True:
+        lock = FileLock(output)
+        if not lock.acquire(blocking=False):
+            return applied
+        try:
+            applied = applied or 0
+            while True:
+                entries, consumed = read_queue(output)
+                if entries:
+                    apply_batch(entries)
+                    applied += len(entries)
+                if not consumed:
+                    break
+                discard_queue_prefix(output, consumed)
+            leftover = queue_size(output)  #nepabeigta rinda, ko neviens nepabeigs
+        finally:
+            lock.release()
+        if queue_size(output) <= leftover:  #pārbaude pēc atlaišanas - skat. protokolu augstāk
+            return applied
+
+
+def submit(output, entry, apply_batch, durability="none"):
+    """Ievieto ierakstu rindā un, ja neviens cits to nedara, apstrādā rindu. Atgriež kā drain()."""
+    enqueue(output, entry, durability)
+    return drain(output, apply_batch)
+
+
+class TestLocking(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.workdir, "out.json")
+
+    def tearDown(self):
+        for name in os.listdir(self.workdir):
+            os.remove(os.path.join(self.workdir, name))
+        os.rmdir(self.workdir)
+
+    def test_lock_excludes(self):
+        with FileLock(self.output):
+            other = FileLock(self.output)
+            self.assertFalse(other.acquire(blocking=False))
+        self.assertTrue(other.acquire(blocking=False))
+        other.release()
+
+    def test_busy_writer_drains_for_submitter(self):
+        batches = []
+        holder = FileLock(self.output)
+        holder.acquire()
+        self.assertIsNone(submit(self.output, {"n": 1}, batches.append)) #slēdzene aizņemta - tikai rindā
+        self.assertIsNone(submit(self.output, {"n": 2}, batches.append))
+        holder.release()
+        self.assertEqual(drain(self.output, batches.append), 2) #tas, kas atlaiž slēdzeni, apstrādā rindu
+        self.assertEqual(batches, [[{"n": 1}, {"n": 2}]])
+        self.assertEqual(queue_size(self.output), 0)
+        self.assertEqual(submit(self.output, {"n": 3}, batches.append), 1)
+
+    def test_failed_batch_stays_queued(self):
+        def fail(entries):
+            raise OSError("disks pilns")
+        enqueue(self.output, {"n": 1})
+        with self.assertRaises(OSError):
+            drain(self.output, fail)
+        self.assertEqual(read_queue(self.output)[0], [{"n": 1}])
+        with open(queue_path(self.output), "ab") as f:
+            f.write(b'{"n": 2')  #pusē pārtraukts ieraksts netiek izņemts
+        self.assertEqual(drain(self.output, lambda entries: None), 1)
+        self.assertEqual(read_queue(self.output), ([], 0))
+        with open(queue_path(self.output), "rb") as f:
+            self.assertEqual(f.read(), b'{"n": 2')
+        self.assertEqual(submit(self.output, {"n": 3}, lambda entries: self.assertEqual(entries, [{"n": 3}])), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
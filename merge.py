@@ -2,41 +2,194 @@ import json
 import os
 import unittest
 
-def merge_json_files(file_names, output_file, conflict_resolution='overwrite'):
-    merged_data = [] #kur/kādā formatā dati tiks ievadīti iekšā
+import compressed_io
+import jsoncodec
+import jsonl
+import query_index
+from atomic_write import write_json_atomic
+from mmap_load import load_file
+from policies import compile_policy
+from stats import activate as activate_stats, current as current_stats
+from struct_hash import freeze
 
-    for file_name in file_names:
-        if not os.path.exists(file_name):
-            print(f"Brīdinājums: fails '{file_name}' neeksistē!")  #uzrei pabridina, ja failu nevar atrast
-            continue
+def record_key(obj, key_fields='name'):
+    """
+    Atgriež ieraksta atslēgu pēc viena lauka vai vairākiem laukiem (saliktā atslēga).
+    Saraksti un objekti laukos tiek "sasaldēti" (struct_hash.freeze ar "==" semantiku),
+    lai atslēgu varētu izmantot vārdnīcā.
+    """
+    if isinstance(key_fields, str):
+        return freeze(obj.get(key_fields), exact=False)
+    return tuple(freeze(obj.get(field), exact=False) for field in key_fields)
+
+
+def merge_records(records, conflict_resolution='overwrite', key_fields='name', policy=None):
+    """
+    Apvieno ierakstus, izmantojot vārdnīcu (atslēga -> objekts), nevis lineāru meklēšanu.
+    Dict saglabā ievietošanas secību, tāpēc rezultāta secība ir tāda pati kā iepriekš:
+    - overwrite: vecais ieraksts tiek izņemts un jaunais pievienots beigās
+    - merge: esošais ieraksts tiek papildināts savā vietā
+    - skip: esošais ieraksts paliek neskarts
+    - policy: visas ieraksta versijas tiek savāktas un apvienotas vienā piegājienā pēc
+      politikas noteikumiem (policies.py), ieraksts paliek pirmās parādīšanās vietā
+    """
+    if conflict_resolution == 'policy':
+        return _merge_records_policy(records, key_fields, compile_policy(policy))
+    index = {}
+    seen = conflicts = 0
+    for new_object in records:
+        seen += 1
+        key = record_key(new_object, key_fields)
+        existing_object = index.get(key)
+
+        if existing_object is not None:
+            conflicts += 1
+            if conflict_resolution == 'overwrite':
+                del index[key] #noņem veco (O(1)), lai jaunais nonāktu saraksta beigās
+                index[key] = new_object
+            elif conflict_resolution == 'merge':
+                existing_object.update(new_object)
+            elif conflict_resolution == 'skip':
+                continue
+        else:
+            index[key] = new_object
+
+    stats = current_stats()
+    stats.add("records_in", seen)
+    stats.add(f"conflicts.{conflict_resolution}", conflicts)
+    return list(index.values())
+
+
+def _merge_records_policy(records, key_fields, policy):
+    groups = {} #atslēga -> visas versijas ievades secībā
+    seen = 0
+    for record in records:
+        seen += 1
+        key = record_key(record, key_fields)
+        versions = groups.get(key)
+        if versions is None:
+            groups[key] = [record]
+        else:
+            versions.append(record)
+    stats = current_stats()
+    stats.add("records_in", seen)
+    stats.add("conflicts.policy", seen - len(groups))
+    return [versions[0] if len(versions) == 1 else policy.reduce(versions) for versions in groups.values()]
 
-        try:
-            with open(file_name, 'r', encoding='utf-8') as f: #r = faila lasīšanas režīms // lai nodrošinātu pareizu teksta apstrādi
-                data = json.load(f)  #Lade json datus no faila/iem(cik es sapratu)
-        except json.JSONDecodeError as e:
-            print(f"Kļūda atverot failu {file_name}: {e}") #nevar atvert failu
-            continue
-
-        for new_object in data:
-            existing_object = next((obj for obj in merged_data if obj.get('name') == new_object.get('name')), None) #parbauda, vai objekts eksiste
-
-            if existing_object:
-                if conflict_resolution == 'overwrite':  #overwrite = tiks veikta pārrakstīšana(datu)
-                    merged_data.remove(existing_object) #noņesms veco datus
-                    merged_data.append(new_object) #atjaunos ar jaunajiem
-                elif conflict_resolution == 'merge': #japapildina
-                    existing_object.update(new_object)
-                elif conflict_resolution == 'skip': #izlaiž darbību, nepārrakstot esošo objektu
-                    continue
-            else:
-                merged_data.append(new_object) # ja nekas no iepreikšējajām izvēlēm nenotiks, tad programma vnk tpt pievienos datus
+
+def merge_json_files(file_names, output_file, conflict_resolution='overwrite', key_fields='name', durability='none',
+                     stats=None, policy=None, index=False):
+    """
+    stats: stats.Stats objekts - ja dots, tajā tiek uzskaitīti posmu laiki, baiti, ieraksti un konflikti.
+    policy: conflict_resolution='policy' noteikumi (dict, ceļš uz JSON failu vai policies.Policy).
+    index: izveidot vaicājumu indeksu <output>.idx.json (ja tas jau ir, tiek atjaunots vienmēr).
+    """
+    if stats is not None:
+        with activate_stats(stats):
+            return merge_json_files(file_names, output_file, conflict_resolution, key_fields, durability,
+                                    policy=policy, index=index)
+    if conflict_resolution == 'policy':
+        policy = compile_policy(policy) #nederīga politika -> PolicyError pirms failu lasīšanas
+    elif jsonl.is_jsonl(output_file) and all(jsonl.is_jsonl(name) for name in file_names):
+        return merge_jsonl_files(file_names, output_file, conflict_resolution, key_fields, durability, index) #atmiņā tikai atslēgu indekss
+
+    def read_records(): #ielasa ierakstus no visiem failiem pēc kārtas
+        for file_name in file_names:
+            if not os.path.exists(file_name):
+                print(f"Brīdinājums: fails '{file_name}' neeksistē!")  #uzrei pabridina, ja failu nevar atrast
+                continue
+
+            if jsonl.is_jsonl(file_name): #JSON Lines - pa vienam ierakstam
+                yield from jsonl.iter_jsonl(file_name)
+                continue
+
+            try:
+                data = load_file(file_name)  #Lade json datus no faila/iem (lieli faili caur mmap)
+            except json.JSONDecodeError as e:
+                print(f"Kļūda atverot failu {file_name}: {e}") #nevar atvert failu
+                continue
+
+            yield from data
+
+    with current_stats().stage("merge"): #lasīšana un parsēšana tiek uzskaitīta atsevišķi (load_file)
+        merged_data = merge_records(read_records(), conflict_resolution, key_fields, policy) #key_fields var būt 'name' vai piem. ('name', 'value')
+    current_stats().add("records_out", len(merged_data))
 
     try:
-        with open(output_file, 'w', encoding='utf-8') as output:
-            json.dump(merged_data, output, indent=4, ensure_ascii=False) # Ieraksta datus JSON formātā (ar 4 atstarpem)
+        if jsonl.is_jsonl(output_file):
+            jsonl.write_jsonl(output_file, merged_data, durability) #viens ieraksts rindā
+        else:
+            write_json_atomic(output_file, merged_data, durability) # Ieraksta datus JSON formātā (ar 4 atstarpem), atomāri caur pagaidu failu
         print(f"Summētais fails ir saglabāts kā '{output_file}'")
     except Exception as e: #izņēmums(error)
         print(f"Kļūda saglabājot rezultātu: {e}")
+        return
+    _refresh_index(output_file, index)
+
+
+def _refresh_index(output_file, force):
+    """Atjauno vaicājumu indeksu pēc ierakstīšanas (nemainītie ieraksti netiek parsēti vēlreiz)."""
+    try:
+        query_index.refresh_if_present(output_file, force)
+    except (OSError, ValueError) as e:
+        print(f"Brīdinājums: indekss {query_index.index_path(output_file)} netika atjaunots: {e}")
+
+
+def merge_jsonl_files(file_names, output_file, conflict_resolution='overwrite', key_fields='name', durability='none',
+                      index=False):
+    """
+    JSON Lines apvienošana divos piegājienos, atmiņā turot tikai atslēgu indeksu:
+    1. piegājiens: katrai atslēgai atceras vajadzīgo ierakstu vietas (faila nr., baitu pozīcija)
+    2. piegājiens: ieraksti tiek nolasīti pēc pozīcijām un uzreiz ierakstīti izvadē
+    Secība un overwrite/merge/skip nozīme ir tāda pati kā merge_records.
+    """
+    existing_files = []
+    for file_name in file_names:
+        if os.path.exists(file_name):
+            existing_files.append(file_name)
+        else:
+            print(f"Brīdinājums: fails '{file_name}' neeksistē!")
+
+    stats = current_stats()
+    locations = {} #atslēga -> [(faila nr., pozīcija), ...]
+    seen = conflicts = 0
+    with stats.stage("parse"): #1. piegājiens: lasīšana, parsēšana un indeksēšana kopā
+        for file_number, file_name in enumerate(existing_files):
+            for offset, record in jsonl.iter_jsonl(file_name, with_offsets=True):
+                seen += 1
+                key = record_key(record, key_fields)
+                location = (file_number, offset)
+                if key not in locations:
+                    locations[key] = [location]
+                    continue
+                conflicts += 1
+                if conflict_resolution == 'overwrite':
+                    del locations[key] #jaunais ieraksts nonāk beigās, tāpat kā merge_records
+                    locations[key] = [location]
+                elif conflict_resolution == 'merge':
+                    locations[key].append(location)
+    stats.add("records_in", seen)
+    stats.add(f"conflicts.{conflict_resolution}", conflicts)
+
+    files = [compressed_io.open_read(file_name) for file_name in existing_files]
+    try:
+        def merged_records():
+            for places in locations.values():
+                record = jsonl.read_record_at(files[places[0][0]], places[0][1])
+                for file_number, offset in places[1:]:
+                    record.update(jsonl.read_record_at(files[file_number], offset))
+                yield record
+
+        count = jsonl.write_jsonl(output_file, merged_records(), durability)
+        stats.add("records_out", count)
+        print(f"Summētais fails ir saglabāts kā '{output_file}' ({count} ieraksti)")
+    except Exception as e:
+        print(f"Kļūda saglabājot rezultātu: {e}")
+        return
+    finally:
+        for f in files:
+            f.close()
+    _refresh_index(output_file, index)
 
 
 def create_example_files(): #šeit es izveidoju piemēra json failu(kur ir 3 dažādi faili)
@@ -57,7 +210,7 @@ def create_example_files(): #šeit es izveidoju piemēra json failu(kur ir 3 da
 
     for file_name, content in example_files.items():
         with open(file_name, 'w', encoding='utf-8') as f:
-            json.dump(content, f, indent=4, ensure_ascii=False)  #Ieraksta datus failā (f) ar 4 atstarpēm
+            jsoncodec.dump(content, f)  #Ieraksta datus failā (f) ar 4 atstarpēm
 
 
 class TestMergeJsonFiles(unittest.TestCase): # testa clase
@@ -83,6 +236,72 @@ class TestMergeJsonFiles(unittest.TestCase): # testa clase
         self.assertTrue(any(item.get('name') == 'Tesla' for item in merged_data), "'Tesla' nav apvienotajos datos")
         self.assertTrue(any(item.get('name') == 'John Doe' for item in merged_data), "'John Doe' nav apvienotajos datos")
 
+    def test_merge_records_order(self): #overwrite pārvieto ierakstu uz beigām, merge/skip saglabā vietu
+        records = [{"name": "A", "value": 1}, {"name": "B", "value": 2}, {"name": "A", "value": 3}]
+        self.assertEqual(merge_records([dict(r) for r in records], 'overwrite'),
+                         [{"name": "B", "value": 2}, {"name": "A", "value": 3}])
+        self.assertEqual(merge_records([dict(r) for r in records], 'merge'),
+                         [{"name": "A", "value": 3}, {"name": "B", "value": 2}])
+        self.assertEqual(merge_records([dict(r) for r in records], 'skip'),
+                         [{"name": "A", "value": 1}, {"name": "B", "value": 2}])
+
+    def test_merge_jsonl_files(self): #JSON Lines rezultātam jāsakrīt ar merge_records
+        parts = {'test_a.jsonl': [{"name": "A", "value": 1}, {"name": "B", "value": 2}],
+                 'test_b.jsonl': [{"name": "A", "extra": 3}, {"name": "C", "value": 4}]}
+        for file_name, records in parts.items():
+            jsonl.write_jsonl(file_name, records)
+        try:
+            for mode in ('overwrite', 'merge', 'skip'):
+                merge_json_files(list(parts), 'test_out.jsonl', conflict_resolution=mode)
+                expected = merge_records([dict(r) for records in parts.values() for r in records], mode)
+                self.assertEqual(list(jsonl.iter_jsonl('test_out.jsonl')), expected)
+        finally:
+            for file_name in list(parts) + ['test_out.jsonl']:
+                os.remove(file_name)
+
+    def test_stats(self): #konflikti un baiti tiek uzskaitīti, rezultāts nemainās
+        from stats import Stats
+        create_example_files()
+        stats = Stats()
+        files = ['programmesanasval.json', 'masinas.json', 'programmesanasval.json']
+        merge_json_files(files, 'test_stats_out.json', conflict_resolution='skip', stats=stats)
+        report = stats.report()
+        self.assertEqual(report["counters"]["records_in"], 6)
+        self.assertEqual(report["counters"]["conflicts.skip"], 2)
+        self.assertEqual(report["counters"]["records_out"], 4)
+        self.assertEqual(report["counters"]["bytes_written"], os.path.getsize('test_stats_out.json'))
+        self.assertTrue({"read", "parse", "merge", "serialize", "write"} <= set(report["stages"]))
+        os.remove('test_stats_out.json')
+
+    def test_merge_records_policy(self): #lauku noteikumi visām versijām vienlaikus
+        records = [{"name": "A", "ts": 2, "rx": "-80 dBm", "tags": ["x"]}, {"name": "B", "ts": 1},
+                   {"name": "A", "ts": 3, "rx": "-90 dBm", "tags": ["y"]}, {"name": "A", "ts": 1, "rx": "-70 dBm"}]
+        policy = {"rules": {"rx": {"strategy": "newest", "field": "ts"}, "ts": "max", "tags": "union"}}
+        self.assertEqual(merge_records(records, 'policy', policy=policy),
+                         [{"name": "A", "ts": 3, "rx": "-90 dBm", "tags": ["x", "y"]}, {"name": "B", "ts": 1}])
+
+    def test_merge_records_unhashable_key(self): #name kā saraksts vai objekts - salīdzina pēc satura
+        records = [{"name": ["A", 1], "v": 1}, {"name": {"id": 2}, "v": 2}, {"name": ["A", 1.0], "x": 0},
+                   {"name": {"id": 2}, "v": 3}]
+        self.assertEqual(merge_records([dict(r) for r in records], 'merge'),
+                         [{"name": ["A", 1], "v": 1, "x": 0}, {"name": {"id": 2}, "v": 3}])
+        self.assertEqual(merge_records([dict(r) for r in records], 'policy', policy={"default": "left"}),
+                         [{"name": ["A", 1], "v": 1, "x": 0}, {"name": {"id": 2}, "v": 2}])
+        self.assertEqual(len(merge_records([dict(r) for r in records], 'skip', key_fields=('name', 'v'))), 4)
+        jsonl.write_jsonl('test_key.jsonl', records)
+        try:
+            merge_json_files(['test_key.jsonl'], 'test_key_out.jsonl', conflict_resolution='overwrite')
+            self.assertEqual(list(jsonl.iter_jsonl('test_key_out.jsonl')),
+                             merge_records([dict(r) for r in records], 'overwrite'))
+        finally:
+            for file_name in ('test_key.jsonl', 'test_key_out.jsonl'):
+                os.remove(file_name)
+
+    def test_merge_records_composite_key(self): #saliktā atslēga (name, value)
+        records = [{"name": "A", "value": 1}, {"name": "A", "value": 2}, {"name": "A", "value": 1, "x": 0}]
+        merged = merge_records(records, 'merge', key_fields=('name', 'value'))
+        self.assertEqual(merged, [{"name": "A", "value": 1, "x": 0}, {"name": "A", "value": 2}])
+
 
 if __name__ == '__main__': #vairak paredzet lai palaistu unittest beigās
     unittest.main() #izpilda unittest
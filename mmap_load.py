@@ -0,0 +1,248 @@
+import mmap
+import os
+import re
+import unittest
+from unittest import mock
+
+import compressed_io
+import jsoncodec
+from stats import current as current_stats
+
+MMAP_THRESHOLD = 1024 * 1024  #mazākus failus vienkāršāk un ātrāk nolasīt parastā veidā
+
+_WS = re.compile(rb'[ \t\n\r]*')
+_STRING = re.compile(rb'"(?:[^"\\]++|\\.)*+"')
+_STRUCTURAL = re.compile(rb'["\[\]{}]')
+_SCALAR = re.compile(rb'[^,\]}\s]+')
+
+
+def parse_path(path):
+    """
+    Pārvērš ceļu par atslēgu sarakstu. Atbalsta JSON Pointer ("/Modem/Status",
+    ~1 = "/", ~0 = "~") un punktu pierakstu ("Modem.Status"). Tukšs ceļš = viss dokuments.
+    """
+    if isinstance(path, (list, tuple)):
+        return list(path)
+    if not path:
+        return []
+    if path.startswith('/'):
+        return [part.replace('~1', '/').replace('~0', '~') for part in path[1:].split('/')]
+    return path.split('.')
+
+
+def skip_value(buf, pos):
+    """Atgriež pozīciju tieši aiz JSON vērtības, kas sākas `pos` (vērtība netiek parsēta)."""
+    char = buf[pos:pos + 1]
+    if char == b'"':
+        match = _STRING.match(buf, pos)
+        if not match:
+            raise ValueError(f"Nepabeigta virkne pozīcijā {pos}")
+        return match.end()
+    if char in (b'{', b'['):
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(buf, pos)
+            if not match:
+                raise ValueError("Nepabeigts objekts vai masīvs")
+            token = buf[match.start():match.end()]
+            if token == b'"':
+                pos = skip_value(buf, match.start())
+                continue
+            depth += 1 if token in (b'{', b'[') else -1
+            pos = match.end()
+            if depth == 0:
+                return pos
+    match = _SCALAR.match(buf, pos)
+    if not match:
+        raise ValueError(f"Sagaidīta vērtība pozīcijā {pos}")
+    return match.end()
+
+
+def locate(buf, path):
+    """
+    Atrod apakškoka baitu robežas (sākums, beigas) buferī, pārlecot pāri visam,
+    kas nav pa ceļam. Ja ceļa nav, izmet KeyError.
+    """
+    pos = _WS.match(buf, 0).end()
+    for part in parse_path(path):
+        opening = buf[pos:pos + 1]
+        if opening not in (b'{', b'['):
+            raise KeyError(part)
+        index = -1
+        pos = _WS.match(buf, pos + 1).end()
+        while True:
+            if buf[pos:pos + 1] in (b'}', b']'):
+                raise KeyError(part)
+            if opening == b'{':
+                key_end = skip_value(buf, pos)
+                key = jsoncodec.loads(buf[pos:key_end])
+                pos = _WS.match(buf, key_end).end() + 1  #aiz ':'
+                pos = _WS.match(buf, pos).end()
+                found = key == part
+            else:
+                index += 1
+                found = str(index) == str(part)
+            if found:
+                break
+            pos = _WS.match(buf, skip_value(buf, pos)).end()
+            if buf[pos:pos + 1] == b',':
+                pos = _WS.match(buf, pos + 1).end()
+    return pos, skip_value(buf, pos)
+
+
+class MappedDocument:
+    """
+    JSON fails, kas atvērts ar mmap. Validācija un ielāde izmanto vienu un to pašu
+    skatu (dokuments tiek parsēts vienreiz un saglabāts), get() nolasa tikai vienu
+    apakškoku, neparsējot pārējo failu.
+
+    with MappedDocument("status.json") as doc:
+        status = doc.get("Modem.Status")
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        if compressed_io.detect(path):
+            self._map = compressed_io.read_bytes(path)  #saspiestu failu nevar kartēt - atspiež atmiņā
+            self._data = None
+            self._loaded = False
+            return
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        except BaseException:
+            self._file.close()
+            raise
+        self._data = None
+        self._loaded = False
+
+    @property
+    def size(self):
+        return len(self._map) if self._map is not None else 0
+
+    def load(self):
+        """
+        Parsē visu dokumentu (vienreiz) tieši no kartētajiem baitiem. Ja parsētājs memoryview
+        nolasa tikai ar kopiju (json, ujson), fails tiek nolasīts kā teksts - kopija + teksts būtu
+        vairāk atmiņas nekā parasta nolasīšana.
+        """
+        if not self._loaded:
+            if self._map is None:
+                self._data = jsoncodec.loads(b'')  #izmet to pašu kļūdu kā tukšam failam
+            elif self._file is not None and not jsoncodec.parses_memoryview():
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = jsoncodec.loads(f.read())
+            else:
+                with memoryview(self._map) as view:
+                    self._data = jsoncodec.loads(view)
+            self._loaded = True
+        return self._data
+
+    def span(self, path):
+        return locate(self._map if self._map is not None else b'', path)
+
+    def raw(self, path):
+        """Apakškoka baiti (kopija tikai šim apakškokam)."""
+        start, end = self.span(path)
+        return self._map[start:end]
+
+    def get(self, path):
+        """Nolasa tikai norādīto apakškoku (piem. "Modem.Status" vai "/Modem/Status")."""
+        if self._loaded:
+            value = self._data
+            for part in parse_path(path):
+                value = value[int(part)] if isinstance(value, list) else value[part]
+            return value
+        return jsoncodec.loads(self.raw(path))
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def load_file(path, threshold=MMAP_THRESHOLD):
+    """
+    Ielādē JSON failu; lieliem failiem caur mmap (bez teksta dekodēšanas kopijas), ja
+    parsētājs memoryview lasa bez kopēšanas (orjson), citādi kā tekstu.
+    Saspiesti faili (.gz/.zst/.lz4 vai pēc pirmajiem baitiem) tiek atspiesti atmiņā.
+    """
+    stats = current_stats()
+    size = os.path.getsize(path)
+    stats.add("bytes_read", size)
+    if compressed_io.detect(path):
+        with stats.stage("read"):
+            data = compressed_io.read_bytes(path)
+        stats.add("bytes_decompressed", len(data))
+        with stats.stage("parse"):
+            return jsoncodec.loads(data)
+    if size >= threshold and jsoncodec.parses_memoryview():
+        with stats.stage("parse"), MappedDocument(path) as doc:  #mmap lapas tiek nolasītas parsēšanas laikā
+            return doc.load()
+    with stats.stage("read"), open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    with stats.stage("parse"):
+        return jsoncodec.loads(text)
+
+
+class TestMappedDocument(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {"Modem": {"Alarms": {"rxLevel": "-83 dBm", "a\"b": [1, {"}": "]"}]},
+                               "Status": {"rxLevel": "-80 dBm", "list": [10, "x", {"y": None}]}}}
+        with open('test_mmap.json', 'w', encoding='utf-8') as f:
+            jsoncodec.dump(self.data, f)
+
+    def tearDown(self):
+        os.remove('test_mmap.json')
+
+    def test_lazy_get(self):
+        with MappedDocument('test_mmap.json') as doc:
+            self.assertEqual(doc.get("Modem.Status"), self.data["Modem"]["Status"])
+            self.assertEqual(doc.get("/Modem/Alarms/a\"b/1"), {"}": "]"})
+            self.assertEqual(doc.get("Modem.Status.list.2.y"), None)
+            self.assertEqual(doc.get(""), self.data)
+            with self.assertRaises(KeyError):
+                doc.get("Modem.Nav")
+            self.assertEqual(doc.load(), self.data)
+            self.assertEqual(doc.get("Modem.Status.list.0"), 10) #pēc load() ņem no jau parsētā
+
+    def test_load_file(self):
+        self.assertEqual(load_file('test_mmap.json', threshold=0), self.data)
+        self.assertEqual(load_file('test_mmap.json'), self.data)
+
+    def test_slow_parser_reads_text(self): #json/ujson memoryview kopētu - tad mmap netiek izmantots
+        views = []
+        original_loads = jsoncodec.loads
+
+        def loads(data):
+            views.append(isinstance(data, memoryview))
+            return original_loads(data)
+        with mock.patch.object(jsoncodec, "BACKEND", "json"), mock.patch.object(jsoncodec, "_fast_loads", None), \
+                mock.patch.object(jsoncodec, "loads", loads):
+            self.assertEqual(load_file('test_mmap.json', threshold=0), self.data)
+            with MappedDocument('test_mmap.json') as doc:
+                self.assertEqual(doc.load(), self.data)
+        self.assertEqual(views, [False, False])
+
+    def test_bom_same_on_both_paths(self):
+        with open('test_mmap.json', 'wb') as f:
+            f.write(b'\xef\xbb\xbf' + jsoncodec.dumps(self.data).encode('utf-8'))
+        for threshold in (0, MMAP_THRESHOLD):
+            with self.assertRaisesRegex(jsoncodec.JSONDecodeError, "Unexpected UTF-8 BOM"):
+                load_file('test_mmap.json', threshold=threshold)
+
+
+if __name__ == '__main__':
+    unittest.main()
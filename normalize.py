@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Modem dokumentu skaitļu normalizācija. Modemi visus skaitļus raksta kā virknes
+("40000", "-83 dBm", "3.0e-03", "0x3551"), un garie paralēlie masīvi (acmModulationsPoints,
+acm_configuration_modulation u.c.) ir virkņu saraksti. normalize_document() tos pārvērš:
+
+- Quantity: str apakšklase ar .value (int/float) un .unit ("dBm", "MHz", ... vai None).
+  Joprojām ir tā pati virkne (==, hash, serializācija), tāpēc apvienošana un izvade nemainās.
+- PackedArray: viendabīgs veselu skaitļu virkņu masīvs kompaktā array.array('q') buferī
+  (.numpy() dod NumPy skatu bez kopēšanas, ja NumPy ir instalēts). jsoncodec to serializē
+  atpakaļ tieši tādās pašās virknēs, tāpēc pārveidojums ir bezzudumu.
+
+Normalizācija ir pēdējais solis: merge_json PackedArray neuzskata par sarakstu, tāpēc pirms
+atkārtotas apvienošanas jāizsauc denormalize_document().
+
+Tā ir bibliotēka analītikas kodam (piem. load_normalized("merged.json")); apvienošanas
+rīki dokumentus nenormalizē, jo to izvade no tā nemainītos.
+"""
+import importlib.util
+import re
+import unittest
+from array import array
+from collections.abc import Sequence
+
+import jsoncodec
+
+_QUANTITY = re.compile(r"(-?[0-9]+(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)(?: ([A-Za-z%/]+))?|0[xX][0-9a-fA-F]+")
+_CANONICAL_INT = re.compile(r"0|-?[1-9][0-9]{0,17}")  #str(int(s)) == s un droši ietilpst int64
+MIN_PACKED_LENGTH = 2
+
+
+class Quantity(str):
+    """Skaitliska virkne ar jau izparsētu vērtību un mērvienību."""
+
+    def __new__(cls, text, value, unit=None):
+        self = super().__new__(cls, text)
+        self.value = value
+        self.unit = unit
+        return self
+
+    def __reduce__(self):
+        return Quantity, (str(self), self.value, self.unit)
+
+
+def parse_quantity(text):
+    """Atgriež Quantity vai None, ja virkne nav skaitlis (ar neobligātu mērvienību)."""
+    match = _QUANTITY.fullmatch(text)
+    if match is None:
+        return None
+    number, unit = match.groups()
+    if number is None:
+        return Quantity(text, int(text, 16))
+    if "." in number or "e" in number or "E" in number:
+        return Quantity(text, float(number), unit)
+    return Quantity(text, int(number), unit)
+
+
+class PackedArray(Sequence):
+    """Veselu skaitļu masīvs, kas JSON dokumentā bija virkņu saraksts (["4", "0", "16"])."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, values):
+        self.data = values if isinstance(values, array) else array("q", values)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PackedArray(self.data[index])
+        return self.data[index]
+
+    def __eq__(self, other):
+        if isinstance(other, PackedArray):
+            return self.data == other.data
+        if isinstance(other, list):
+            return self.__json__() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PackedArray({self.data.tolist()!r})"
+
+    def numpy(self):
+        import numpy  #nav obligāta atkarība
+        return numpy.frombuffer(self.data, dtype=numpy.int64)
+
+    def __json__(self):
+        return [str(value) for value in self.data]
+
+
+def _pack(items):
+    if len(items) < MIN_PACKED_LENGTH:
+        return None
+    for item in items:
+        if type(item) is not str or not _CANONICAL_INT.fullmatch(item):
+            return None
+    return PackedArray(int(item) for item in items)
+
+
+def normalize_document(value, _memo=None):
+    """
+    Atgriež jaunu dokumentu ar Quantity virknēm un PackedArray masīviem (oriģināls netiek mainīts).
+    Vienādām virknēm tiek izmantots viens un tas pats Quantity objekts.
+    """
+    memo = {} if _memo is None else _memo
+    if isinstance(value, dict):
+        return {key: normalize_document(child, memo) for key, child in value.items()}
+    if isinstance(value, list):
+        packed = _pack(value)
+        if packed is not None:
+            return packed
+        return [normalize_document(child, memo) for child in value]
+    if type(value) is str:
+        if value not in memo:
+            memo[value] = parse_quantity(value) or value
+        return memo[value]
+    return value
+
+
+def denormalize_document(value):
+    """Pretējais normalize_document: parastas virknes un saraksti (piem. pirms merge_json)."""
+    if isinstance(value, dict):
+        return {key: denormalize_document(child) for key, child in value.items()}
+    if isinstance(value, list):
+        return [denormalize_document(child) for child in value]
+    if isinstance(value, PackedArray):
+        return value.__json__()
+    if isinstance(value, str):
+        return str(value)
+    return value
+
+
+def load_normalized(path):
+    """Nolasa JSON failu (arī saspiestu, lielu - caur mmap) un atgriež normalizētu dokumentu."""
+    from mmap_load import load_file
+    return normalize_document(load_file(path))
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_modem_roundtrip(self):
+        with open("l.json", "r", encoding="utf-8") as f:
+            text = f.read()
+        original = jsoncodec.loads(text)
+        doc = normalize_document(original)
+        status = doc["Modem"]["Status"]
+        self.assertEqual((status["bandwidth_khz"].value, status["bandwidth_khz"].unit), (40000, None))
+        self.assertEqual((status["radialMse"].value, status["radialMse"].unit), (-32.1, "dB"))
+        self.assertEqual(status["profiles"].value, 0x3551)
+        self.assertEqual(doc["Modem"]["Alarms"]["ldpcDecoderStress"].value, 3.0e-03)
+        self.assertIsInstance(status["acm_configuration_modulation"], PackedArray)
+        self.assertEqual(sum(status["acm_configuration_modulation"]), 1024)
+        self.assertNotIsInstance(doc["Modem"]["ConfigurationFile"]["acmModulations"], PackedArray)
+        for indent in (4, 2, None): #serializācija atpakaļ ir baitu precīza
+            self.assertEqual(jsoncodec.dumps(doc, indent), jsoncodec.dumps(original, indent))
+        self.assertEqual(denormalize_document(doc), original)
+        self.assertEqual(jsoncodec.loads(text), original) #oriģināls nav mainīts
+
+    def test_load_normalized(self):
+        import os
+        import tempfile
+        from atomic_write import write_json_atomic
+        data = {"Modem": {"Status": {"rxLevel": "-83 dBm", "points": ["4", "0", "16"]}}}
+        fd, path = tempfile.mkstemp(suffix=".json.gz")
+        os.close(fd)
+        try:
+            write_json_atomic(path, data, "none")
+            doc = load_normalized(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(doc["Modem"]["Status"]["rxLevel"].unit, "dBm")
+        self.assertEqual(list(doc["Modem"]["Status"]["points"].data), [4, 0, 16])
+        self.assertEqual(denormalize_document(doc), data)
+
+    def test_packing_is_lossless_only(self):
+        self.assertIsNone(_pack(["007", "1"])) #"007" nevar atjaunot no int
+        self.assertIsNone(_pack(["1", 2]))
+        self.assertIsNone(_pack(["-0", "1"]))
+        self.assertIsNone(_pack(["1" * 20, "1"]))
+        self.assertEqual(_pack(["-5", "0", "12"]).__json__(), ["-5", "0", "12"])
+        self.assertIsNone(parse_quantity("49800..245100 Mbps"))
+        self.assertEqual(parse_quantity("-83 dBm"), "-83 dBm")
+
+    @unittest.skipIf(importlib.util.find_spec("numpy") is None, "nav NumPy")
+    def test_numpy_view(self):
+        packed = PackedArray([1, 2, 3])
+        self.assertEqual(packed.numpy().sum(), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
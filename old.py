@@ -1,39 +1,57 @@
 #!/usr/bin/env python3
 import argparse
-import json
 import os
 import sys
 
-def merge_json(a, b):
+import catalog
+import jsoncodec
+from struct_hash import freeze
+
+def merge_json(a, b, mode="copy", _memo=None):
     """
     Rekursīvi apvieno divus JSON objektus/dictionaries vai arrays.
     Ja diviem dictionaries atbilst vienādi atslēgas, tiek veikta rekursīva apvienošana.
     Ja divām arrays ir kopīgas vērtības, tās netiek dubļotas.
     Ja datu tipi neatbilst, otrā vērtība pārraksta pirmo.
+    mode: "copy" (kopē katru līmeni), "inplace" (maina `a`) vai "share" (kopē tikai mainīto).
     """
+    if _memo is None:
+        _memo = {}
     if isinstance(a, dict) and isinstance(b, dict):
-        result = a.copy()
+        result = a if mode == "inplace" else a.copy() if mode == "copy" else None
         for key, value in b.items():
-            if key in result:
-                result[key] = merge_json(result[key], value)
+            if key in a:
+                merged = merge_json(a[key], value, mode, _memo)
+                if merged is a[key]:
+                    continue
             else:
-                result[key] = value
-        return result
+                merged = value
+            if result is None:
+                result = a.copy()
+            result[key] = merged
+        return a if result is None else result
     elif isinstance(a, list) and isinstance(b, list):
-        result = a.copy()
+        result = a if mode == "inplace" else a.copy() if mode == "copy" else None
+        seen = {freeze(item, _memo, exact=False) for item in a}  #"==" semantika kā iepriekš ar "in", bet O(1)
         for item in b:
-            if item not in result:
+            key = freeze(item, _memo, exact=False)
+            if key not in seen:
+                seen.add(key)
+                if result is None:
+                    result = a.copy()
                 result.append(item)
-        return result
+        return a if result is None else result
     else:
         # Ja tipi nesakrīt, izmanto jauno vērtību (overwrite)
+        if mode == "share" and type(a) is type(b) and a == b:
+            return a  #vienāda vērtība - nav jāmaina vecāka konteiners
         return b
 
 def process_command_line(args):
     """Apstrad.  merge vai overwrite."""
     try:
         with open(args.input, "r", encoding="utf-8") as f:
-            data_input = json.load(f)
+            data_input = jsoncodec.load(f)
     except Exception as e:
         print("Kļūda ielādējot ievades failu:", e)
         sys.exit(1)
@@ -43,7 +61,7 @@ def process_command_line(args):
         if os.path.exists(args.output):
             try:
                 with open(args.output, "r", encoding="utf-8") as f:
-                    data_output = json.load(f)
+                    data_output = jsoncodec.load(f)
             except Exception as e:
                 print("Kļūda ielādējot izvades failu:", e)
                 data_output = {}
@@ -51,30 +69,29 @@ def process_command_line(args):
             data_output = {}
         merged = merge_json(data_output, data_input)
         with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(merged, f, indent=4, ensure_ascii=False)
+            jsoncodec.dump(merged, f)
         print("Apvienotā informācija saglabāta failā", args.output)
         
     elif args.operation.lower() == "overwrite":
         with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(data_input, f, indent=4, ensure_ascii=False)
+            jsoncodec.dump(data_input, f)
         print("Ievades fails pārrakstīts uz", args.output)
     else:
         print("Neatpazīta operācija. Lūdzu, izmanto 'merge' vai 'overwrite'.")
         sys.exit(1) #m
 
-def list_json_files():
-    """Atrod un izvada sarakstu ar pašreizējā direktorijā esošajiem .json failiem."""
-    files = [f for f in os.listdir(".") if f.endswith(".json")]
+def list_json_files(json_catalog):
+    """Atrod .json failus pašreizējā direktorijā un izvada pirmo lapu (visu sarakstu atgriež)."""
+    files = json_catalog.names()
     if files:
-        print("Pieejamie json faili:")
-        for i, f in enumerate(files):
-            print(f"  {i+1}. {f}")
+        catalog.print_page(json_catalog)
     else:
         print("Nav pieejamu json failu.")
     return files
 
 def interactive_mode():
     """Interaktīvais režīms, kur lietotājam tiek piedāvātas opcijas darbībām ar JSON failiem."""
+    json_catalog = catalog.FileCatalog()  #viens katalogs visai sesijai - metadati tiek kešoti
     while True:
         print("\nIzvēlies opciju:")
         print("  1. Izveidot json")
@@ -84,33 +101,35 @@ def interactive_mode():
         choice = input("Tavs izvēle: ").strip()
         
         if choice == "1":
-            list_json_files()
+            list_json_files(json_catalog)
             filename = input("Ievadi jauna json faila nosaukumu (piem., new.json): ").strip()
             content = input("Ievadi json saturu (piem., {} vai derīgu json tekstu): ").strip()
             try:
-                data = json.loads(content)
+                data = jsoncodec.loads(content)
             except Exception as e:
                 print("Nederīgs json saturs. Kļūda:", e)
                 continue
             try:
                 with open(filename, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
+                    jsoncodec.dump(data, f)
                 print("Fails", filename, "izveidots.")
             except Exception as e:
                 print("Kļūda saglabājot failu:", e)
                 
         elif choice == "2":
-            files = list_json_files()
-            if len(files) < 2:
+            if len(json_catalog.names()) < 2:
                 print("Nepietiekama json failu skaits merge operācijai (vajag vismaz 2 failus).")
                 continue
-            base_file = input("Ievadi bāzes faila nosaukumu (kurš tiks papildināts): ").strip()
-            merge_file = input("Ievadi faila nosaukumu, kuru apvienot ar bāzes failu: ").strip()
+            #izvēle pa lapām - nosaukums nav jāpārraksta no saraksta
+            base_file = catalog.choose(json_catalog, "Bāzes fails (kurš tiks papildināts)")
+            merge_file = base_file and catalog.choose(json_catalog, "Fails, kuru apvienot ar bāzes failu")
+            if not merge_file:
+                continue
             try:
-                with open(base_file, "r", encoding="utf-8") as f:
-                    data_base = json.load(f)
-                with open(merge_file, "r", encoding="utf-8") as f:
-                    data_merge = json.load(f)
+                with open(json_catalog.path(base_file), "r", encoding="utf-8") as f:
+                    data_base = jsoncodec.load(f)
+                with open(json_catalog.path(merge_file), "r", encoding="utf-8") as f:
+                    data_merge = jsoncodec.load(f)
             except Exception as e:
                 print("Kļūda ielādējot failus:", e)
                 continue
@@ -118,22 +137,26 @@ def interactive_mode():
             output_file = input("Ievadi jauna faila nosaukumu, kur saglabāt rezultātu: ").strip()
             try:
                 with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(merged, f, indent=4, ensure_ascii=False)
+                    jsoncodec.dump(merged, f)
                 print("Merge operācija veiksmīgi pabeigta, rezultāts saglabāts failā", output_file)
             except Exception as e:
                 print("Kļūda saglabājot failu:", e)
                 
         elif choice == "3":
-            files = list_json_files()
-            file_to_delete = input("Ievadi dzēšamā json faila nosaukumu: ").strip()
-            if os.path.exists(file_to_delete):
-                try:
-                    os.remove(file_to_delete)
-                    print("Fails", file_to_delete, "dzēsts.")
-                except Exception as e:
-                    print("Kļūda dzēšot failu:", e)
-            else:
+            if not json_catalog.names():
+                print("Nav pieejamu json failu.")
+                continue
+            file_to_delete = catalog.choose(json_catalog, "Dzēšamais json fails")
+            if not file_to_delete:
+                continue
+            try:
+                json_catalog.remove(file_to_delete)
+                print("Fails", file_to_delete, "dzēsts.")
+            except FileNotFoundError:
+                json_catalog.forget(file_to_delete)
                 print("Fails netika atrasts.")
+            except Exception as e:
+                print("Kļūda dzēšot failu:", e)
                 
         elif choice == "4":
             print("Izbeigt interaktīvo režīmu.")
@@ -0,0 +1,261 @@
+import mmap
+import os
+import re
+import unittest
+from contextlib import contextmanager
+
+import compressed_io
+import jsoncodec
+from argumntunodnokomandrindas import merge_json
+from atomic_write import atomic_open, write_json_atomic
+from mmap_load import MappedDocument, locate, parse_path
+
+_LEADING_WS = re.compile(rb'[ \t]*')
+
+
+def _get(doc, parts):
+    for part in parts:
+        doc = doc[int(part)] if isinstance(doc, list) else doc[part]
+    return doc
+
+
+def _set(doc, parts, value):
+    """
+    Ieliek vērtību pēc ceļa, izveidojot trūkstošos objektus pa ceļam. Ja pa ceļam ir
+    skalāra vērtība vai neesošs masīva indekss, izmet ValueError.
+    """
+    try:
+        for part in parts[:-1]:
+            doc = doc[int(part)] if isinstance(doc, list) else doc.setdefault(part, {})
+        if isinstance(doc, list):
+            doc[int(parts[-1])] = value
+        elif isinstance(doc, dict):
+            doc[parts[-1]] = value
+        else:
+            raise TypeError
+    except (IndexError, ValueError, TypeError, AttributeError):
+        raise ValueError(f"Ceļš nav atrasts: /{'/'.join(str(part) for part in parts)}") from None
+
+
+def _combine(old, new, operation, mode):
+    if operation == "overwrite":
+        return new
+    return merge_json(old, new, mode)
+
+
+def _fold(old, values, operation, mode):
+    """
+    Ievades apakškoki secībā, tāpat kā bez ceļiem (merge_inputs): merge - katrs tiek apvienots
+    ar izvadi pa vienam; overwrite - ievades tiek apvienotas savā starpā un aizvieto izvadi.
+    """
+    if operation == "overwrite":
+        old, values, mode = values[0], values[1:], "inplace"  #tikko nolasītās ievades pieder tikai mums
+    for value in values:
+        old = merge_json(old, value, mode)
+    return old
+
+
+def merge_paths(output_doc, input_doc, paths, operation="merge", mode="copy"):
+    """
+    Apvieno (vai pārraksta) tikai norādītos apakškokus no input_doc uz output_doc.
+    Pārējās output_doc daļas netiek apstaigātas. Atgriež output_doc.
+    """
+    if not paths:
+        return _combine(output_doc, input_doc, operation, mode)
+    for path in paths:
+        parts = parse_path(path)
+        if not parts:
+            output_doc = _combine(output_doc, input_doc, operation, mode)  #tukšs ceļš = viss dokuments
+            continue
+        try:
+            new = _get(input_doc, parts)
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue  #ievadē šī ceļa nav - nav ko apvienot
+        try:
+            old = _get(output_doc, parts)
+        except (KeyError, IndexError, TypeError, ValueError):
+            _set(output_doc, parts, new)
+            continue
+        _set(output_doc, parts, _combine(old, new, operation, mode))
+    return output_doc
+
+
+def _indent_unit(buf):
+    """
+    Faila atkāpes solis: json.dumps indent vērtība (2, 4, "\t" ...) vai None kompaktam failam.
+    Pirmā rinda aiz pirmās '\n' ir saknes konteinera elements ar tieši vienu atkāpi.
+    """
+    newline = buf.find(b'\n')
+    if newline < 0:
+        return None
+    match = _LEADING_WS.match(buf, newline + 1)
+    if buf[match.end():match.end() + 1] in (b'', b'\n', b'\r'):
+        return None  #tikai noslēdzošā jaunā rinda - kompakts fails
+    unit = match.group()
+    if not unit.strip(b' '):
+        return len(unit)
+    return unit.decode('ascii')
+
+
+def _serialize_like(value, buf, start, indent):
+    """Serializē vērtību faila stilā: tā pati atkāpe (vai kompakts), nobīdīta par vietas rindas atkāpi."""
+    if indent is None:
+        return jsoncodec.dumps(value, indent=None).encode('utf-8')
+    line_start = buf.rfind(b'\n', 0, start) + 1
+    prefix = _LEADING_WS.match(buf, line_start).group()
+    text = jsoncodec.dumps(value, indent=indent).encode('utf-8')
+    return text.replace(b'\n', b'\n' + prefix)
+
+
+def merge_file_paths(input_files, output_file, paths, operation="merge", mode="copy", durability="fsync",
+                     indent=4):
+    """
+    Apvieno tikai norādītos apakškokus failu līmenī:
+    - ievadēs tiek parsēti tikai šie apakškoki (mmap + locate)
+    - izvadē tiek parsēti un pārrakstīti tikai šie apakškoki, pārējie baiti tiek
+      nokopēti nemainīti; jaunie apakškoki tiek serializēti ar faila atkāpi
+    Ja kāda ceļa izvadē vēl nav (vai ceļi pārklājas), izvade tiek parsēta pilnībā un
+    ierakstīta ar `indent` (None - kompakti).
+    Atgriež izmainīto ceļu skaitu.
+    """
+    patches = []
+    for path in paths:
+        values = []  #katras ievades apakškoks, argumentu secībā
+        for input_file in input_files:
+            with MappedDocument(input_file) as doc:
+                try:
+                    values.append(doc.get(path))
+                except KeyError:
+                    continue
+        if values:
+            patches.append((path, values))
+        else:
+            print(f"Brīdinājums: ceļš '{path}' nav atrasts nevienā ievades failā")
+    if not patches:
+        return 0
+
+    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+        with _output_bytes(output_file) as buf:
+            try:
+                spans = sorted((locate(buf, path) + (path, values) for path, values in patches), key=lambda s: s[0])
+            except KeyError:
+                spans = None  #ceļa izvadē nav - jāpievieno jauna atslēga
+            if spans and all(prev[1] <= nxt[0] for prev, nxt in zip(spans, spans[1:])):
+                file_indent = _indent_unit(buf)
+                with atomic_open(output_file, durability, binary=True) as out:
+                    position = 0
+                    for start, end, _path, values in spans:
+                        old = jsoncodec.loads(buf[start:end])
+                        out.write(buf[position:start])
+                        out.write(_serialize_like(_fold(old, values, operation, mode), buf, start, file_indent))
+                        position = end
+                    out.write(buf[position:])
+                return len(spans)
+            with memoryview(buf) as view:
+                output_doc = jsoncodec.loads(view)
+    else:
+        output_doc = {}
+
+    for path, values in patches:
+        if operation == "overwrite":
+            values = [_fold(None, values, operation, mode)]
+        for value in values:
+            output_doc = merge_paths(output_doc, _set_root(path, value), [path], operation, mode)
+    write_json_atomic(output_file, output_doc, durability, indent)
+    return len(patches)
+
+
+@contextmanager
+def _output_bytes(output_file):
+    """Izvades faila baiti: mmap vai (saspiestam failam) atspiests saturs atmiņā."""
+    if compressed_io.detect(output_file):
+        yield compressed_io.read_bytes(output_file)
+        return
+    with open(output_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        yield buf
+
+
+def _set_root(path, value):
+    """Izveido minimālu dokumentu, kurā `value` atrodas pēc ceļa `path`."""
+    doc = {}
+    parts = parse_path(path)
+    if not parts:
+        return value
+    _set(doc, parts, value)
+    return doc
+
+
+class TestPartialMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.output = {"Modem": {"Alarms": {"rxLevel": "-83 dBm", "list": ["a"]},
+                                 "Status": {"snr": "20"}, "Other": [1, 2, 3]}}
+        self.patch = {"Modem": {"Alarms": {"rxLevel": "-70 dBm", "list": ["b"], "new": "1"},
+                                "Status": {"snr": "99"}}}
+        with open('test_partial_out.json', 'w', encoding='utf-8') as f:
+            jsoncodec.dump(self.output, f)
+        with open('test_partial_in.json', 'w', encoding='utf-8') as f:
+            jsoncodec.dump(self.patch, f)
+
+    def tearDown(self):
+        for name in ('test_partial_out.json', 'test_partial_in.json'):
+            os.remove(name)
+
+    def _read(self):
+        with open('test_partial_out.json', 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_splice_matches_full_merge(self):
+        for operation in ("merge", "overwrite"):
+            self.setUp()
+            expected = merge_paths(jsoncodec.loads(self._read()), self.patch, ["Modem.Alarms"], operation)
+            self.assertEqual(merge_file_paths(['test_partial_in.json'], 'test_partial_out.json',
+                                              ["/Modem/Alarms"], operation), 1)
+            self.assertEqual(self._read(), jsoncodec.dumps(expected)) #arī atkāpes paliek tādas pašas
+
+    def test_splice_keeps_file_indent(self): #2 atstarpes, tabulācija un kompakts fails paliek tādi paši
+        for indent in (2, "\t", None):
+            with open('test_partial_out.json', 'w', encoding='utf-8') as f:
+                jsoncodec.dump(self.output, f, indent=indent)
+            expected = merge_paths(jsoncodec.loads(self._read()), self.patch, ["Modem.Alarms", "Modem.Status.snr"])
+            merge_file_paths(['test_partial_in.json'], 'test_partial_out.json', ["Modem.Alarms", "Modem.Status.snr"])
+            self.assertEqual(self._read(), jsoncodec.dumps(expected, indent=indent))
+
+    def test_fallback_uses_indent_and_bad_path(self):
+        merge_file_paths(['test_partial_in.json'], 'test_partial_out.json', ["Modem.Alarms.new"], indent=None)
+        self.assertEqual(self._read(), jsoncodec.dumps(merge_paths(self.output, self.patch, ["Modem.Alarms.new"]),
+                                                       indent=None))
+        with self.assertRaisesRegex(ValueError, "Ceļš nav atrasts"):
+            merge_paths({"Modem": {"Other": [1]}}, {"Modem": {"Other": {"x": {"y": 1}}}}, ["Modem.Other.x.y"])
+        with self.assertRaisesRegex(ValueError, "Ceļš nav atrasts"):
+            merge_paths({"Modem": "off"}, self.patch, ["Modem.Status.snr"])
+
+    def test_inputs_folded_in_order(self): #kā pilna apvienošana - merge_json nav asociatīvs
+        from argumntunodnokomandrindas import merge_inputs
+        inputs = ['test_partial_in.json', 'test_partial_in2.json']
+        try:
+            for operation in ("merge", "overwrite"):
+                for name, data in zip(inputs, ({"k": {"z": 0}}, {"k": [1]})):
+                    with open(name, 'w', encoding='utf-8') as f:
+                        jsoncodec.dump(data, f)
+                for existing in (True, False):
+                    with open('test_partial_out.json', 'w', encoding='utf-8') as f:
+                        jsoncodec.dump({"k": [0]} if existing else {"other": 1}, f)
+                    tasks = [(name, None, False) for name in inputs]
+                    if operation == "merge":
+                        expected = merge_inputs(tasks, base=jsoncodec.loads(self._read()), mode="copy")[0]["k"]
+                    else:
+                        expected = merge_inputs(tasks)[0]["k"]
+                    merge_file_paths(inputs, 'test_partial_out.json', ["k"], operation)
+                    self.assertEqual(jsoncodec.loads(self._read())["k"], expected, (operation, existing))
+        finally:
+            os.remove('test_partial_in2.json')
+
+    def test_missing_path_falls_back(self):
+        merge_file_paths(['test_partial_in.json'], 'test_partial_out.json', ["Modem.Alarms.new"])
+        self.assertEqual(jsoncodec.loads(self._read())["Modem"]["Alarms"]["new"], "1")
+        self.assertEqual(merge_file_paths(['test_partial_in.json'], 'test_partial_out.json', ["Modem.Nav"]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+"""
+Konfliktu politikas: noteikumi pa ceļiem, kā apvienot vairākas viena ieraksta/dokumenta versijas.
+
+    {
+        "default": "right",
+        "rules": {
+            "Status": {"strategy": "newest", "field": "timestamp"},
+            "Alarms.*": "max",
+            "tags": "union",
+            "id": "error"
+        }
+    }
+
+Ceļi ir relatīvi pret ieraksta (vai dokumenta) sakni, punktu vai JSON Pointer pierakstā
+(kā mmap_load.parse_path); "*" atbilst jebkurai vienai atslēgai, precīza atslēga ir
+prioritārāka par "*". Stratēģijas:
+
+- right / left: pēdējā / pirmā versija (ievades secībā);
+- newest: versija ar lielāko `field` vērtību (ceļš no saknes, piem. laika zīmogs);
+- max / min: skaitliski, arī virknes kā "-83 dBm" (salīdzina normalize.parse_quantity vērtību);
+  ja neviena vērtība nav skaitlis, virknes salīdzina kā tekstu (ISO datumi);
+- union: sarakstu apvienojums bez dublikātiem (secība saglabājas);
+- error: dažādas vērtības -> PolicyError;
+- merge: vārdnīcas apvieno pa atslēgām ar apakšceļu noteikumiem (noklusējums vārdnīcām).
+
+Noteikumi tiek nokompilēti vienreiz (ceļu koks + kešotas pārejas), un visas versijas tiek
+apstrādātas vienā piegājienā (reduce), nevis pa pāriem - rezultāts nav atkarīgs no tā,
+kā ievades sadalītas, tikai no to secības.
+"""
+import unittest
+
+import jsoncodec
+from mmap_load import parse_path
+from normalize import parse_quantity
+from struct_hash import freeze
+
+STRATEGIES = ("right", "left", "newest", "max", "min", "union", "error", "merge")
+
+
+class PolicyError(ValueError):
+    """Nederīga politika vai konflikts ceļā ar stratēģiju "error"."""
+
+
+class _Node:
+
+    __slots__ = ("children", "rule")
+
+    def __init__(self):
+        self.children = {}
+        self.rule = None
+
+
+def _number(value, path):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        quantity = parse_quantity(value)
+        if quantity is not None:
+            return quantity.value
+    raise PolicyError(f"{_label(path)}: vērtība {value!r} nav skaitlis")
+
+
+def _stamp(value):
+    """Laika zīmogu salīdzināšanai: skaitļi pirms virknēm, trūkstošs - vecākais."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    return (2, str(value))
+
+
+def _label(path):
+    return "/" + "/".join(str(part) for part in path)
+
+
+def _get(doc, field):
+    for part in field:
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+
+class Policy:
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise PolicyError("Politikai jābūt JSON objektam")
+        unknown = set(spec) - {"default", "rules"}
+        if unknown:
+            raise PolicyError(f"Nezināmas politikas atslēgas: {', '.join(sorted(unknown))}")
+        self.spec = spec
+        self.default = self._compile_rule(spec.get("default", "right"), "default")
+        if self.default[0] in ("newest", "merge"):
+            raise PolicyError(f"default nevar būt {self.default[0]}")
+        self._root = _Node()
+        for path, rule in spec.get("rules", {}).items():
+            node = self._root
+            for part in parse_path(path):
+                node = node.children.setdefault(part, _Node())
+            node.rule = self._compile_rule(rule, path)
+        self._transitions = {}  #(stāvoklis, atslēga) -> nākamais stāvoklis
+
+    @staticmethod
+    def _compile_rule(rule, path):
+        if isinstance(rule, str):
+            rule = {"strategy": rule}
+        strategy = rule.get("strategy") if isinstance(rule, dict) else None
+        if strategy not in STRATEGIES:
+            raise PolicyError(f"{path}: nezināma stratēģija {strategy!r} (atbalstītas: {', '.join(STRATEGIES)})")
+        field = rule.get("field")
+        if strategy == "newest" and not field:
+            raise PolicyError(f"{path}: stratēģijai newest vajag \"field\" (laika zīmoga ceļš)")
+        return (strategy, tuple(parse_path(field)) if field else None)
+
+    def _next(self, state, key):
+        """Stāvoklis = noteikumu koka mezglu kortežs (precīzās atslēgas pirms "*")."""
+        if not state:
+            return state  #ārpus noteikumu koka - nekas nav jākešo
+        transition = (state, key)
+        nxt = self._transitions.get(transition)
+        if nxt is None:
+            nodes = []
+            for node in state:
+                for child in (node.children.get(key), node.children.get("*")):
+                    if child is not None:
+                        nodes.append(child)
+            nxt = self._transitions[transition] = tuple(nodes)
+        return nxt
+
+    @staticmethod
+    def _rule(state):
+        for node in state:
+            if node.rule is not None:
+                return node.rule
+        return None
+
+    def reduce(self, versions):
+        """Apvieno visas versijas (vecākā pirmā) vienā rezultātā."""
+        versions = list(versions)
+        if not versions:
+            return None
+        if len(versions) == 1:
+            return versions[0]
+        stamps = {}
+        return self._reduce(list(enumerate(versions)), (self._root,), (), versions, stamps)
+
+    def merge(self, a, b):
+        return self.reduce([a, b])
+
+    def _reduce(self, items, state, path, versions, stamps):
+        rule = self._rule(state)
+        values = [value for _, value in items]
+        if rule is None or rule[0] == "merge":
+            if all(isinstance(value, dict) for value in values):
+                result = {}
+                for key in dict.fromkeys(key for value in values for key in value):
+                    column = [(i, value[key]) for i, value in items if key in value]
+                    result[key] = column[0][1] if len(column) == 1 else \
+                        self._reduce(column, self._next(state, key), path + (key,), versions, stamps)
+                return result
+            if rule is not None:  #merge ne-vārdnīcām: saraksti - apvienojums, pārējais - pēdējā vērtība
+                rule = ("union", None) if all(isinstance(value, list) for value in values) else ("right", None)
+            else:
+                rule = self.default
+        strategy, field = rule
+        if strategy == "right":
+            return values[-1]
+        if strategy == "left":
+            return values[0]
+        if strategy == "newest":
+            if field not in stamps:
+                stamps[field] = [_stamp(_get(version, field)) for version in versions]
+            column = stamps[field]
+            best = items[0]
+            for item in items[1:]:
+                if column[item[0]] >= column[best[0]]:  #vienādiem zīmogiem uzvar vēlākā versija
+                    best = item
+            return best[1]
+        if strategy in ("max", "min"):
+            pick = max if strategy == "max" else min
+            if all(isinstance(value, str) and parse_quantity(value) is None for value in values):
+                return pick(values)
+            return pick(values, key=lambda value: _number(value, path))
+        if strategy == "union":
+            if not all(isinstance(value, list) for value in values):
+                raise PolicyError(f"{_label(path)}: union prasa sarakstus")
+            memo = {}
+            seen, result = set(), []
+            for value in values:
+                for item in value:
+                    key = freeze(item, memo, exact=False)
+                    if key not in seen:
+                        seen.add(key)
+                        result.append(item)
+            return result
+        #error
+        if len({freeze(value, exact=False) for value in values}) > 1:
+            raise PolicyError(f"{_label(path)}: konflikts starp vērtībām {', '.join(jsoncodec.dumps(v, indent=None) for v in values)}")
+        return values[0]
+
+
+_compiled = {}
+
+
+def compile_policy(policy):
+    """Politika (dict vai ceļš uz JSON failu) -> Policy. Viena procesa ietvaros tiek atkārtoti izmantota."""
+    if not isinstance(policy, (dict, str)):
+        return policy  #jau nokompilēta
+    if isinstance(policy, str):
+        with open(policy, "r", encoding="utf-8") as f:
+            policy = jsoncodec.load(f)
+    key = jsoncodec.dumps(policy, indent=None)
+    if key not in _compiled:
+        _compiled[key] = Policy(policy)
+    return _compiled[key]
+
+
+class TestPolicies(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = compile_policy({
+            "rules": {
+                "Status": {"strategy": "newest", "field": "ts"},
+                "Alarms.*": "max",
+                "Alarms.count": "min",
+                "tags": "union",
+                "id": "error",
+                "note": "left",
+            }
+        })
+
+    def test_reduce_records(self):
+        versions = [
+            {"id": 1, "ts": "2024-05-01T10:00", "Status": {"rx": "-80 dBm"}, "Alarms": {"temp": "40", "count": 3},
+             "tags": ["a"], "note": "first"},
+            {"id": 1, "ts": "2024-05-03T10:00", "Status": {"rx": "-83 dBm"}, "Alarms": {"temp": "45", "count": 1},
+             "tags": ["b", "a"], "note": "second", "extra": True},
+            {"id": 1, "ts": "2024-05-02T10:00", "Status": {"rx": "-90 dBm"}, "Alarms": {"temp": "41", "count": 7},
+             "tags": ["c"]},
+        ]
+        self.assertEqual(self.policy.reduce(versions), {
+            "id": 1, "ts": "2024-05-02T10:00", "Status": {"rx": "-83 dBm"}, "Alarms": {"temp": "45", "count": 1},
+            "tags": ["a", "b", "c"], "note": "first", "extra": True})
+        with self.assertRaises(PolicyError):
+            self.policy.merge({"id": 1}, {"id": 2})
+        with self.assertRaises(PolicyError):
+            self.policy.merge({"Alarms": {"temp": "40"}}, {"Alarms": {"temp": "n/a"}})
+        self.assertEqual(self.policy.merge({"Alarms": {"t": "2024-05-03"}}, {"Alarms": {"t": "2024-05-01"}}),
+                         {"Alarms": {"t": "2024-05-03"}})
+
+    def test_compile_errors_and_merge_json(self):
+        from argumntunodnokomandrindas import merge_json
+        with self.assertRaises(PolicyError):
+            compile_policy({"rules": {"a": "sum"}})
+        with self.assertRaises(PolicyError):
+            compile_policy({"rules": {"a": "newest"}})
+        self.assertIs(compile_policy(self.policy.spec), self.policy)
+        self.assertEqual(merge_json({"Alarms": {"temp": "50"}, "x": 1}, {"Alarms": {"temp": "42"}, "x": "y"},
+                                    policy=self.policy), {"Alarms": {"temp": "50"}, "x": "y"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Vaicājumu indekss apvienotajai izvadei: `<output>.idx.json` glabā katra ieraksta baitu
+robežas un (ceļš, vērtība) -> ierakstu numuri, lai vaicājums nolasītu tikai atbilstošos
+ierakstus, nevis parsētu visu failu.
+
+    ./query_index.py merged_output.json "name = Python"
+    ./query_index.py merged.json "Status.rxLevel < -80" --count
+
+Ieraksti: saraksta elementi (merge.py izvade), JSON Lines rindas vai, ja sakne ir objekts,
+tā augšējā līmeņa vērtības (piem. viens modems katrā atslēgā). Ceļi ir relatīvi pret ierakstu
+(punktu pieraksts), indeksētas tiek skalāras vērtības līdz MAX_DEPTH līmenim (saraksti nē).
+Salīdzinājumi <, >, <=, >= ir skaitliski arī virknēm kā "-83 dBm" (normalize.parse_quantity,
+mērvienība netiek ņemta vērā); ja labā puse nav skaitlis - teksta salīdzināšana (ISO datumi).
+
+Indekss tiek atjaunots inkrementāli: ieraksta robežas tiek atrastas, neparsējot failu, un
+ieraksti, kuru baiti nav mainījušies (blake2b), tiek ņemti no iepriekšējā indeksa bez
+parsēšanas. Ja izvade mainīta bez indeksa atjaunošanas (mtime/izmērs nesakrīt), indekss
+tiek uzskatīts par novecojušu un pirms vaicājuma pārbūvēts.
+"""
+import argparse
+import bisect
+import hashlib
+import mmap
+import os
+import re
+import sys
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+import compressed_io
+import jsoncodec
+import jsonl
+from atomic_write import write_json_atomic
+from mmap_load import skip_value
+from normalize import parse_quantity
+from stats import current as current_stats
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+MAX_DEPTH = 4
+_WS = re.compile(rb'[ \t\n\r]*')
+_CONDITION = re.compile(r'\s*(.+?)\s*(<=|>=|!=|=|<|>)\s*(.*?)\s*$')
+
+
+def index_path(output_file):
+    return output_file + INDEX_SUFFIX
+
+
+def _source_key(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+@contextmanager
+def _output_bytes(path):
+    """Izvades baiti: mmap vai (saspiestam failam) atspiests saturs atmiņā."""
+    if compressed_io.detect(path):
+        yield compressed_io.read_bytes(path)
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def record_spans(buf, lines=False):
+    """
+    Atgriež (saknes veids, [(sākums, beigas, atslēga vai None), ...]), neparsējot ierakstus.
+    lines=True: JSON Lines - katra netukšā rinda ir ieraksts.
+    """
+    spans = []
+    if lines:
+        start = 0
+        while start < len(buf):
+            end = buf.find(b"\n", start)
+            end = len(buf) if end < 0 else end
+            if buf[start:end].strip():
+                spans.append((start, end, None))
+            start = end + 1
+        return "jsonl", spans
+    pos = _WS.match(buf, 0).end()
+    opening = buf[pos:pos + 1]
+    if opening not in (b"[", b"{"):
+        raise ValueError("Indeksējama izvade ir JSON masīvs vai objekts")
+    pos = _WS.match(buf, pos + 1).end()
+    while buf[pos:pos + 1] not in (b"]", b"}"):
+        key = None
+        if opening == b"{":
+            key_end = skip_value(buf, pos)
+            key = jsoncodec.loads(buf[pos:key_end])
+            pos = _WS.match(buf, _WS.match(buf, key_end).end() + 1).end()  #aiz ':'
+        end = skip_value(buf, pos)
+        spans.append((pos, end, key))
+        pos = _WS.match(buf, end).end()
+        if buf[pos:pos + 1] == b",":
+            pos = _WS.match(buf, pos + 1).end()
+        elif buf[pos:pos + 1] not in (b"]", b"}"):
+            raise ValueError(f"Sagaidīts ',' pozīcijā {pos}")
+    return ("list" if opening == b"[" else "object"), spans
+
+
+def _leaves(value, prefix="", depth=0, max_depth=MAX_DEPTH):
+    if isinstance(value, dict):
+        if depth >= max_depth:
+            return
+        for key, child in value.items():
+            yield from _leaves(child, f"{prefix}.{key}" if prefix else key, depth + 1, max_depth)
+    elif not isinstance(value, list) and prefix:
+        yield prefix, jsoncodec.dumps(value, indent=None)
+
+
+def _number(text):
+    """Skaitliskā vērtība no JSON skalāra (arī "-83 dBm") vai None."""
+    value = jsoncodec.loads(text)
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        quantity = parse_quantity(value)
+        return quantity.value if quantity is not None else None
+    return None
+
+
+def _previous_entries(index):
+    """Iepriekšējais indekss -> {ieraksta blake2b: [(ceļš, vērtība), ...]} (bez izvades parsēšanas)."""
+    by_record = [[] for _ in index["records"]]
+    for path, entry in index["paths"].items():
+        for text, rids in entry["exact"].items():
+            for rid in rids:
+                by_record[rid].append((path, text))
+    return {record[2]: entries for record, entries in zip(index["records"], by_record)}
+
+
+def build_index(output_file, previous=None, max_depth=MAX_DEPTH):
+    """Uzbūvē indeksu; ieraksti, kas nav mainījušies kopš `previous`, netiek parsēti."""
+    stats = current_stats()
+    source = _source_key(output_file)
+    reuse = {}
+    if previous is not None and previous.get("version") == INDEX_VERSION and previous.get("max_depth") == max_depth:
+        reuse = _previous_entries(previous)
+    records, paths = [], {}
+    parsed = 0
+    with stats.stage("index"), _output_bytes(output_file) as buf:
+        root, spans = record_spans(buf, lines=jsonl.is_jsonl(output_file))
+        for rid, (start, end, key) in enumerate(spans):
+            raw = buf[start:end]
+            digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+            entries = reuse.get(digest)
+            if entries is None:
+                entries = list(_leaves(jsoncodec.loads(raw), max_depth=max_depth))
+                parsed += 1
+            records.append([start, end, digest, key])
+            for path, text in entries:
+                paths.setdefault(path, {}).setdefault(text, []).append(rid)
+    stats.add("index_records_parsed", parsed)
+    stats.add("index_records_reused", len(records) - parsed)
+    index_paths = {}
+    for path, exact in paths.items():
+        numeric = [[number, rid] for text, rids in exact.items() if (number := _number(text)) is not None for rid in rids]
+        numeric.sort()
+        index_paths[path] = {"exact": exact, "numeric": numeric}
+    return {"version": INDEX_VERSION, "source": source, "root": root, "max_depth": max_depth,
+            "parsed": parsed, "records": records, "paths": index_paths}
+
+
+def load_index(output_file, check=True):
+    """Saglabātais indekss vai None (nav, bojāts vai - ja check - neatbilst izvadei)."""
+    try:
+        with open(index_path(output_file), "r", encoding="utf-8") as f:
+            index = jsoncodec.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != INDEX_VERSION:
+        return None
+    if check:
+        try:
+            if index["source"] != _source_key(output_file):
+                return None
+        except OSError:
+            return None
+    return index
+
+
+def update_index(output_file, max_depth=MAX_DEPTH):
+    """Pārbūvē indeksu, izmantojot iepriekšējo (arī novecojušu) nemainīto ierakstu vērtībām."""
+    index = build_index(output_file, load_index(output_file, check=False), max_depth)
+    write_json_atomic(index_path(output_file), index, "none", indent=None)
+    return index
+
+
+def refresh_if_present(output_file, force=False):
+    """Pēc apvienošanas: atjauno indeksu, ja tas jau ir izveidots (vai force=True)."""
+    if force or os.path.exists(index_path(output_file)):
+        return update_index(output_file)
+    return None
+
+
+def parse_condition(text):
+    """"Status.rxLevel < -80" -> ("Status.rxLevel", "<", "-80"); tikai ceļš -> (ceļš, "exists", None)."""
+    match = _CONDITION.match(text)
+    if match is None:
+        return text.strip(), "exists", None
+    return match.groups()
+
+
+def _exact_keys(value):
+    """Labās puses teksts -> iespējamie JSON pieraksti (Python, "Python", 5)."""
+    keys = {jsoncodec.dumps(value, indent=None)}
+    try:
+        keys.add(jsoncodec.dumps(jsoncodec.loads(value), indent=None))
+    except ValueError:
+        pass
+    return keys
+
+
+def matching_records(index, path, op, value=None):
+    """Ierakstu numuru kopa, kas atbilst vienam nosacījumam (tikai pēc indeksa)."""
+    entry = index["paths"].get(path)
+    if entry is None:
+        return set()
+    exact = entry["exact"]
+    if op == "exists":
+        return {rid for rids in exact.values() for rid in rids}
+    if op in ("=", "!="):
+        equal = {rid for key in _exact_keys(value) for rid in exact.get(key, ())}
+        if op == "=":
+            return equal
+        return {rid for rids in exact.values() for rid in rids} - equal
+    quantity = parse_quantity(value)
+    if quantity is None:  #teksta salīdzināšana (piem. ISO datumi)
+        compare = {"<": str.__lt__, "<=": str.__le__, ">": str.__gt__, ">=": str.__ge__}[op]
+        return {rid for text, rids in exact.items() if isinstance(current := jsoncodec.loads(text), str)
+                and compare(current, value) for rid in rids}
+    numeric = entry["numeric"]
+    numbers = [number for number, _ in numeric]
+    bound = quantity.value
+    if op == "<":
+        selected = numeric[:bisect.bisect_left(numbers, bound)]
+    elif op == "<=":
+        selected = numeric[:bisect.bisect_right(numbers, bound)]
+    elif op == ">":
+        selected = numeric[bisect.bisect_right(numbers, bound):]
+    else:
+        selected = numeric[bisect.bisect_left(numbers, bound):]
+    return {rid for _, rid in selected}
+
+
+def query(output_file, conditions, rebuild=True):
+    """
+    Ieraksti, kas atbilst visiem nosacījumiem (UN): ģenerators ar (atslēga vai None, ieraksts).
+    Nolasa tikai atbilstošo ierakstu baitus. Novecojis indekss tiek pārbūvēts (rebuild=True)
+    vai izmests ValueError.
+    """
+    index = load_index(output_file)
+    if index is None:
+        if not rebuild:
+            raise ValueError(f"{index_path(output_file)} nav vai neatbilst {output_file}")
+        index = update_index(output_file)
+    selected = None
+    for condition in conditions:
+        rids = matching_records(index, *(parse_condition(condition) if isinstance(condition, str) else condition))
+        selected = rids if selected is None else selected & rids
+    if selected is None:
+        selected = range(len(index["records"]))
+    with _output_bytes(output_file) as buf:
+        for rid in sorted(selected):
+            start, end, _digest, key = index["records"][rid]
+            yield key, jsoncodec.loads(buf[start:end])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vaicājumi apvienotajai izvadei pēc indeksa (<output>.idx.json)")
+    parser.add_argument("output", help="Apvienotais fails (merged.json, merged_output.json, *.jsonl)")
+    parser.add_argument("conditions", nargs="*",
+                        help="Nosacījumi (visiem jāizpildās): 'name = Python', 'Status.rxLevel < -80', 'Status.rxLevel'")
+    parser.add_argument("--name", help="Saīsinājums nosacījumam 'name = NOSAUKUMS'")
+    parser.add_argument("--count", action="store_true", help="Izdrukāt tikai atbilstošo ierakstu skaitu")
+    parser.add_argument("--build", action="store_true", help="Tikai (pār)būvēt indeksu")
+    args = parser.parse_args()
+
+    conditions = list(args.conditions)
+    if args.name is not None:
+        conditions.append(("name", "=", args.name))
+    try:
+        if args.build:
+            index = update_index(args.output)
+            print(f"INDEKSS IZVEIDOTS: {len(index['records'])} ieraksti, {len(index['paths'])} ceļi "
+                  f"({index['parsed']} parsēti) → {index_path(args.output)}")
+            return
+        count = 0
+        for key, record in query(args.output, conditions):
+            count += 1
+            if not args.count:
+                print(jsoncodec.dumps(record if key is None else {key: record}, indent=None))
+        if args.count:
+            print(count)
+    except (OSError, ValueError) as e:
+        print(f"KĻŪDA: {str(e)}")
+        sys.exit(1)
+
+
+class TestQueryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.output = os.path.join(self.workdir, "merged.json")
+        self.records = [{"name": f"modem{i}", "Status": {"rxLevel": f"{-70 - i} dBm", "up": i % 2 == 0}}
+                        for i in range(20)]
+        write_json_atomic(self.output, self.records, "none")
+
+    def tearDown(self):
+        for name in os.listdir(self.workdir):
+            os.remove(os.path.join(self.workdir, name))
+        os.rmdir(self.workdir)
+
+    def names(self, *conditions):
+        return [record["name"] for _, record in query(self.output, conditions)]
+
+    def test_query_and_incremental_update(self):
+        self.assertEqual(update_index(self.output)["parsed"], 20)
+        self.assertEqual(self.names("name = modem3"), ["modem3"])
+        self.assertEqual(self.names("Status.rxLevel < -87"), ["modem18", "modem19"])
+        self.assertEqual(self.names("Status.rxLevel <= -87 dBm", "Status.up = true"), ["modem18"])
+        self.assertEqual(self.names("Status.up != true", "Status.rxLevel >= -73"), ["modem1", "modem3"])
+        self.assertEqual(len(self.names("Status.rxLevel")), 20)
+        self.assertEqual(self.names("missing.path = 1"), [])
+
+        self.records[5]["Status"]["rxLevel"] = "-99 dBm"
+        write_json_atomic(self.output, self.records, "none")
+        self.assertIsNone(load_index(self.output)) #izvade mainīta - indekss novecojis
+        self.assertEqual(refresh_if_present(self.output)["parsed"], 1) #pārējie 19 no iepriekšējā indeksa
+        self.assertEqual(self.names("Status.rxLevel < -90"), ["modem5"])
+
+    def test_merge_keeps_index_current(self):
+        from merge import merge_json_files
+        update_index(self.output)
+        extra = os.path.join(self.workdir, "extra.json")
+        write_json_atomic(extra, [{"name": "modem3", "Status": {"rxLevel": "-95 dBm"}}], "none")
+        merge_json_files([self.output, extra], self.output, conflict_resolution="merge")
+        index = load_index(self.output)
+        self.assertEqual(index["parsed"], 1) #tikai mainītais ieraksts
+        self.assertEqual(self.names("Status.rxLevel < -90"), ["modem3"])
+
+    def test_merge_creates_index_only_on_request(self): #bez index=True un bez esoša indeksa - nekāda .idx.json
+        import jsonl
+        from merge import merge_json_files
+        parts = [os.path.join(self.workdir, name) for name in ("a.jsonl", "b.jsonl")]
+        for i, part in enumerate(parts):
+            jsonl.write_jsonl(part, [{"name": "modem1", "n": i}, {"name": f"other{i}"}])
+        extra = os.path.join(self.workdir, "extra.json")
+        write_json_atomic(extra, [{"name": "new"}], "none")
+        for inputs, output in (([self.output, extra], os.path.join(self.workdir, "out.json")),
+                               (parts, os.path.join(self.workdir, "out.jsonl"))):
+            merge_json_files(inputs, output)
+            self.assertFalse(os.path.exists(index_path(output)))
+            merge_json_files(inputs, output, index=True)
+            self.assertTrue(os.path.exists(index_path(output)))
+            merge_json_files(inputs[:1], output) #esošais indekss tiek atjaunots arī bez index=True
+            self.assertIsNotNone(load_index(output))
+
+    def test_object_root_and_jsonl(self):
+        write_json_atomic(self.output, {"a": {"Status": {"rxLevel": "-85 dBm"}}, "b": {"Status": {"rxLevel": "-60 dBm"}}}, "none")
+        self.assertEqual([key for key, _ in query(self.output, ["Status.rxLevel < -80"])], ["a"])
+        lines = os.path.join(self.workdir, "merged.jsonl")
+        jsonl.write_jsonl(lines, self.records)
+        self.assertEqual([record["name"] for _, record in query(lines, [("name", "=", "modem7")])], ["modem7"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Tipu pārbaude pēc shēmas (JSON Schema apakškopa). Shēma tiek vienreiz pārvērsta Python
+kodā bez rekursijas un vārdnīcu apstaigāšanas izpildes laikā, nokompilēta un kešota diskā
+(marshal) pēc shēmas hash, tāpēc nākamās palaišanas kompilāciju izlaiž.
+
+Atbalstīts: type, enum, const, properties, required, additionalProperties, items,
+minItems, maxItems, minLength, maxLength, pattern, minimum, maximum, exclusiveMinimum,
+exclusiveMaximum, $defs/definitions ar "$ref": "#/$defs/<vārds>".
+
+    ./schema.py modem.schema.json l.json 4.json
+"""
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+import jsoncodec
+from atomic_write import atomic_open
+from jsondiff import escape_pointer
+
+SCHEMA_CACHE_DIR = os.environ.get("JSON_SCHEMA_CACHE") or os.path.join(
+    os.path.expanduser("~"), ".cache", "json_schema")
+_GENERATOR_VERSION = 1  #jāpalielina, ja mainās ģenerētais kods (citādi paliks vecais kešs)
+
+_TYPES = {
+    "string": "isinstance({v}, str)",
+    "integer": "(isinstance({v}, int) and not isinstance({v}, bool))",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+}
+_GROUPS = {  #atslēgvārdi, kas attiecas tikai uz konkrētu tipu
+    "string": ("minLength", "maxLength", "pattern"),
+    "number": ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"),
+    "object": ("properties", "required", "additionalProperties"),
+    "array": ("items", "minItems", "maxItems"),
+}
+_KEYWORDS = {"type", "enum", "const", "$ref", "$defs", "definitions"}.union(*_GROUPS.values())
+_IGNORED = {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+
+
+class SchemaError(ValueError):
+    """Shēma ir nederīga vai izmanto neatbalstītu atslēgvārdu."""
+
+
+class _Generator:
+
+    def __init__(self, root):
+        self.root = root
+        self.header = []
+        self.lines = []
+        self.counter = 0
+        self.refs = []
+
+    def const(self, expr):
+        name = f"_C{len(self.header)}"
+        self.header.append(f"{name} = {expr}")
+        return name
+
+    def var(self, prefix="v"):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def line(self, indent, text):
+        self.lines.append("    " * indent + text)
+
+    def error(self, indent, path, message):
+        self.line(indent, f"e.append(({path}, {message}))")
+
+    def resolve(self, ref):
+        if not ref.startswith("#/"):
+            raise SchemaError(f"Atbalstītas tikai lokālas atsauces: {ref}")
+        target = self.root
+        for part in ref[2:].split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(target, dict) or part not in target:
+                raise SchemaError(f"Atsauce nav atrasta: {ref}")
+            target = target[part]
+        return target
+
+    def block(self, indent, emit):
+        """Izsauc emit(indent); ja tas neko neuzģenerēja, ieliek pass."""
+        before = len(self.lines)
+        emit(indent)
+        if len(self.lines) == before:
+            self.line(indent, "pass")
+
+    def emit(self, schema, v, path, indent):
+        if schema is True or schema == {}:
+            return
+        if schema is False:
+            self.error(indent, path, repr("Vērtība nav atļauta"))
+            return
+        if not isinstance(schema, dict):
+            raise SchemaError(f"Shēmai jābūt objektam vai true/false: {schema!r}")
+        unknown = set(schema) - _KEYWORDS - _IGNORED
+        if unknown:
+            raise SchemaError(f"Neatbalstīti shēmas atslēgvārdi: {', '.join(sorted(unknown))}")
+        if "$ref" in schema:
+            ref = schema["$ref"]
+            if ref in self.refs:
+                raise SchemaError(f"Rekursīvas atsauces nav atbalstītas: {ref}")
+            self.refs.append(ref)
+            self.emit(self.resolve(ref), v, path, indent)
+            self.refs.pop()
+
+        types = schema.get("type")
+        if isinstance(types, str):
+            types = [types]
+        if types is not None:
+            for name in types:
+                if name not in _TYPES:
+                    raise SchemaError(f"Nezināms tips: {name}")
+            self.line(indent, f"if not ({' or '.join(_TYPES[name].format(v=v) for name in types)}):")
+            self.error(indent + 1, path, f"{'Sagaidīts ' + '/'.join(types) + ', atrasts '!r} + type({v}).__name__")
+            checks = [group for group in _GROUPS if any(k in schema for k in _GROUPS[group])]
+            if not checks and "enum" not in schema and "const" not in schema:
+                return
+            self.line(indent, "else:")
+            self.block(indent + 1, lambda i: self._emit_checks(schema, v, path, i, types))
+        else:
+            self._emit_checks(schema, v, path, indent, None)
+
+    def _emit_checks(self, schema, v, path, indent, types):
+        if "enum" in schema or "const" in schema:
+            values = schema["enum"] if "enum" in schema else [schema["const"]]
+            if all(isinstance(value, str) for value in values):
+                allowed = self.const(repr(frozenset(values)))
+                self.line(indent, f"if not (isinstance({v}, str) and {v} in {allowed}):")
+            else:
+                allowed = self.const(f"frozenset(freeze(x) for x in {values!r})")
+                self.line(indent, f"if freeze({v}) not in {allowed}:")
+            self.error(indent + 1, path, repr(f"Vērtība nav atļauta, sagaidīts viens no: {values}"[:200]))
+        for group, keywords in _GROUPS.items():
+            if not any(k in schema for k in keywords):
+                continue
+            if types is not None and group not in types and not (group == "number" and "integer" in types):
+                continue  #šis tips nav atļauts - tipa kļūda jau ziņota
+            emit = getattr(self, f"_emit_{group}")
+            if types is not None and len(types) == 1:
+                emit(schema, v, path, indent)  #tips jau pārbaudīts
+            else:
+                self.line(indent, f"if {_TYPES[group].format(v=v)}:")
+                self.block(indent + 1, lambda i: emit(schema, v, path, i))
+
+    def _emit_string(self, schema, v, path, indent):
+        if "minLength" in schema:
+            self.line(indent, f"if len({v}) < {int(schema['minLength'])}:")
+            self.error(indent + 1, path, repr(f"Garums mazāks par {schema['minLength']}"))
+        if "maxLength" in schema:
+            self.line(indent, f"if len({v}) > {int(schema['maxLength'])}:")
+            self.error(indent + 1, path, repr(f"Garums lielāks par {schema['maxLength']}"))
+        if "pattern" in schema:
+            pattern = self.const(f"re.compile({schema['pattern']!r})")
+            self.line(indent, f"if not {pattern}.search({v}):")
+            self.error(indent + 1, path, repr(f"Neatbilst šablonam {schema['pattern']}"))
+
+    def _emit_number(self, schema, v, path, indent):
+        for keyword, op, text in (("minimum", "<", "mazāka par"), ("maximum", ">", "lielāka par"),
+                                  ("exclusiveMinimum", "<=", "nav lielāka par"),
+                                  ("exclusiveMaximum", ">=", "nav mazāka par")):
+            if keyword in schema:
+                self.line(indent, f"if {v} {op} {schema[keyword]!r}:")
+                self.error(indent + 1, path, repr(f"Vērtība {text} {schema[keyword]}"))
+
+    def _emit_object(self, schema, v, path, indent):
+        for key in schema.get("required", ()):
+            self.line(indent, f"if {key!r} not in {v}:")
+            self.error(indent + 1, path, repr(f"Trūkst obligātā lauka '{key}'"))
+        properties = schema.get("properties", {})
+        for key, subschema in properties.items():
+            if subschema is True or subschema == {}:
+                continue
+            child = self.var()
+            self.line(indent, f"{child} = {v}.get({key!r}, _MISSING)")
+            self.line(indent, f"if {child} is not _MISSING:")
+            self.block(indent + 1, lambda i: self.emit(subschema, child, f"({path}, {key!r})", i))
+        extra = schema.get("additionalProperties", True)
+        if extra is True or extra == {}:
+            return
+        key, child = self.var("k"), self.var()
+        known = self.const(repr(frozenset(properties)))
+        self.line(indent, f"for {key}, {child} in {v}.items():")
+        self.line(indent + 1, f"if {key} not in {known}:")
+        if extra is False:
+            self.error(indent + 2, f"({path}, {key})", repr("Lieks lauks"))
+        else:
+            self.block(indent + 2, lambda i: self.emit(extra, child, f"({path}, {key})", i))
+
+    def _emit_array(self, schema, v, path, indent):
+        if "minItems" in schema:
+            self.line(indent, f"if len({v}) < {int(schema['minItems'])}:")
+            self.error(indent + 1, path, repr(f"Mazāk par {schema['minItems']} elementiem"))
+        if "maxItems" in schema:
+            self.line(indent, f"if len({v}) > {int(schema['maxItems'])}:")
+            self.error(indent + 1, path, repr(f"Vairāk par {schema['maxItems']} elementiem"))
+        items = schema.get("items", True)
+        if isinstance(items, list):
+            raise SchemaError("items kā saraksts nav atbalstīts")
+        if items is True or items == {}:
+            return
+        index, child = self.var("i"), self.var()
+        self.line(indent, f"for {index}, {child} in enumerate({v}):")
+        self.block(indent + 1, lambda i: self.emit(items, child, f"({path}, {index})", i))
+
+
+def generate_source(schema):
+    """Atgriež Python moduļa tekstu ar funkciju validate(v0, e), kas kļūdas pievieno sarakstam e."""
+    generator = _Generator(schema)
+    generator.block(1, lambda i: generator.emit(schema, "v0", "None", i))
+    return "\n".join(["import re", "from struct_hash import freeze", "_MISSING = object()"]
+                     + generator.header + ["def validate(v0, e):"] + generator.lines) + "\n"
+
+
+def schema_digest(schema):
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{_GENERATOR_VERSION}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def _load_code(schema, digest, cache_dir):
+    cache_file = os.path.join(cache_dir, f"{digest}.{sys.implementation.cache_tag}.marshal")
+    try:
+        with open(cache_file, "rb") as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass  #nav kešā vai kešs bojāts - kompilē no jauna
+    code = compile(generate_source(schema), f"<schema {digest[:12]}>", "exec")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with atomic_open(cache_file, durability="none", binary=True) as f:
+            marshal.dump(code, f)
+    except OSError:
+        pass  #kešs nav obligāts (piem. direktorija tikai lasāma)
+    return code
+
+
+def _pointer(path):
+    parts = []
+    while path is not None:
+        path, key = path
+        parts.append(escape_pointer(key))
+    return "".join("/" + part for part in reversed(parts))
+
+
+class Validator:
+    """Nokompilēta shēma. errors(doc) atgriež visas kļūdas kā [{"path": JSON Pointer, "msg": ...}]."""
+
+    def __init__(self, schema, cache_dir=None):
+        self.schema = schema
+        self.digest = schema_digest(schema)
+        namespace = {}
+        exec(_load_code(schema, self.digest, cache_dir or SCHEMA_CACHE_DIR), namespace)
+        self._validate = namespace["validate"]
+
+    def errors(self, document):
+        found = []
+        self._validate(document, found)
+        return [{"path": _pointer(path), "msg": msg} for path, msg in found]
+
+    def is_valid(self, document):
+        found = []
+        self._validate(document, found)
+        return not found
+
+    def __reduce__(self):
+        return compile_schema, (self.schema,)  #procesu pūlā kompilētais kods tiek ielādēts no diska keša
+
+
+_compiled = {}
+
+
+def compile_schema(schema, cache_dir=None):
+    """Shēma (dict/bool vai ceļš uz JSON failu) -> Validator. Viena procesa ietvaros tiek atkārtoti izmantots."""
+    if not isinstance(schema, (dict, bool, str)):
+        return schema  #jau nokompilēts Validator (arī ja schema.py palaists kā __main__)
+    if isinstance(schema, str):
+        with open(schema, "r", encoding="utf-8") as f:
+            schema = jsoncodec.load(f)
+    digest = schema_digest(schema)
+    if digest not in _compiled:
+        _compiled[digest] = Validator(schema, cache_dir)
+    return _compiled[digest]
+
+
+def main():
+    from valideJSNO import check_json_file, format_result
+    parser = argparse.ArgumentParser(description="Pārbaudīt JSON failus pēc shēmas")
+    parser.add_argument("schema", help="Shēmas fails")
+    parser.add_argument("files", nargs="+", help="Pārbaudāmie faili")
+    parser.add_argument("--show-source", action="store_true", help="Izdrukāt ģenerēto kodu")
+    args = parser.parse_args()
+
+    try:
+        validator = compile_schema(args.schema)
+    except (OSError, ValueError) as e:
+        print(f"KĻŪDA: Nevarēja ielādēt shēmu: {str(e)}")
+        sys.exit(1)
+    if args.show_source:
+        print(generate_source(validator.schema))
+    ok = True
+    for path in args.files:
+        result = check_json_file(path, schema=validator)
+        ok &= result["status"] == "valid"
+        print(f"{path}: {format_result(result)}")
+    sys.exit(0 if ok else 1)
+
+
+class TestSchema(unittest.TestCase):
+
+    SCHEMA = {
+        "$defs": {
+            "numeric": {"type": "string", "pattern": "^-?[0-9]+$"},
+            "section": {"type": "object", "properties": {
+                "profile_min": {"$ref": "#/$defs/numeric"},
+                "bandwidth_khz": {"$ref": "#/$defs/numeric"},
+                "acmModulations": {"type": "array", "maxItems": 16, "items": {
+                    "enum": ["", "QPSK", "8PSK", "16APSK", "32APSK", "64QAM", "128QAM", "256QAM"]}},
+            }},
+        },
+        "type": "object",
+        "required": ["Modem"],
+        "properties": {"Modem": {"type": "object", "additionalProperties": {"$ref": "#/$defs/section"}}},
+    }
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_modem_documents(self):
+        validator = Validator(self.SCHEMA, self.cache_dir)
+        for name in ("l.json", "4.json"):
+            with open(name, "r", encoding="utf-8") as f:
+                self.assertEqual(validator.errors(jsoncodec.load(f)), [])
+        bad = {"Modem": {"Status": {"profile_min": 0, "bandwidth_khz": "40 MHz",
+                                    "acmModulations": ["QPSK", "9PSK", "QPSK", None]}, "a/b": []}}
+        errors = validator.errors(bad)
+        self.assertEqual([e["path"] for e in errors],
+                         ["/Modem/Status/profile_min", "/Modem/Status/bandwidth_khz",
+                          "/Modem/Status/acmModulations/1", "/Modem/Status/acmModulations/3", "/Modem/a~1b"])
+        self.assertIn("atrasts int", errors[0]["msg"])
+        self.assertEqual(validator.errors([]), [{"path": "", "msg": "Sagaidīts object, atrasts list"}])
+
+    def test_keywords(self):
+        validator = Validator({"type": "object", "required": ["a"], "additionalProperties": False,
+                               "properties": {"a": {"type": ["integer", "null"], "minimum": 1, "maximum": 3},
+                                              "b": {"const": {"x": [1]}},
+                                              "c": {"type": "array", "minItems": 1, "items": {"minLength": 2}}}},
+                              self.cache_dir)
+        self.assertTrue(validator.is_valid({"a": None, "b": {"x": [1]}, "c": ["ab", 5]}))
+        self.assertEqual(len(validator.errors({"a": True, "b": {"x": [1.0]}, "c": ["a"], "d": 1})), 4)
+        self.assertEqual(len(validator.errors({"a": 5, "c": []})), 2)
+        with self.assertRaises(SchemaError):
+            Validator({"type": "object", "oneOf": []}, self.cache_dir)
+
+    def test_disk_cache(self):
+        Validator(self.SCHEMA, self.cache_dir)
+        cached = os.listdir(self.cache_dir)
+        self.assertEqual(len(cached), 1)
+        self.assertTrue(cached[0].startswith(schema_digest(self.SCHEMA)))
+        self.assertTrue(Validator(self.SCHEMA, self.cache_dir).is_valid({"Modem": {}}))
+        self.assertTrue(pickle.loads(pickle.dumps(compile_schema(self.SCHEMA, self.cache_dir))).is_valid({"Modem": {}}))
+
+
+if __name__ == "__main__":
+    main()
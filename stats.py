@@ -0,0 +1,245 @@
+"""
+Mērījumi apvienošanas posmiem: laiks pa posmiem (read, parse, merge, serialize, write,
+fsync), nolasītie/ierakstītie baiti, ierakstu un konfliktu skaits, maksimālā atmiņa.
+
+Posmu laiki ir ekskluzīvi - ja posms sākas cita posma iekšienē (piem. parse iekš merge),
+ārējā posma laiks tiek apturēts, tāpēc posmu summa nepārsniedz kopējo laiku.
+Mērījumi tiek ieslēgti ar activate(); bez tā current() atgriež objektu, kas neko nedara.
+
+    stats = Stats()
+    with capture(stats, profile_path="merge.prof", trace_memory=True):
+        ...
+    print(stats.format())
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+from contextlib import contextmanager, nullcontext
+
+import jsoncodec
+
+try:
+    import resource
+except ImportError:  #Windows
+    resource = None
+
+
+def peak_rss():
+    """Procesa maksimālā rezidentā atmiņa baitos (None, ja OS to nepiedāvā)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  #Linux atgriež KiB
+
+
+class Stats:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {}
+        self.counters = {}
+        self.extra = {}
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            parent, since = self._stack[-1]
+            self.stages[parent] = self.stages.get(parent, 0.0) + now - since
+        self._stack.append((name, now))
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            _, since = self._stack.pop()
+            self.stages[name] = self.stages.get(name, 0.0) + now - since
+            if self._stack:
+                self._stack[-1] = (self._stack[-1][0], now)
+
+    def add(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def absorb(self, report):
+        """Pieskaita citā procesā savāktos mērījumus (posmu laiki - summa pa procesiem)."""
+        for name, seconds in report["stages"].items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        for name, amount in report["counters"].items():
+            self.add(name, amount)
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def report(self):
+        total = (self.finished or time.perf_counter()) - self.started
+        result = {
+            "total_seconds": round(total, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "peak_rss_bytes": peak_rss(),
+        }
+        result.update(self.extra)
+        return result
+
+    def format(self):
+        report = self.report()
+        lines = [f"Kopā: {report['total_seconds'] * 1000:.1f} ms"]
+        for name, seconds in sorted(report["stages"].items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<12} {seconds * 1000:10.1f} ms")
+        for name, amount in sorted(report["counters"].items()):
+            lines.append(f"  {name:<24} {amount:,}")
+        if report["peak_rss_bytes"] is not None:
+            lines.append(f"  Maksimālā atmiņa (RSS): {report['peak_rss_bytes'] / 1024 / 1024:.1f} MB")
+        if "tracemalloc_peak_bytes" in report:
+            lines.append(f"  tracemalloc maksimums: {report['tracemalloc_peak_bytes'] / 1024 / 1024:.1f} MB")
+            for site in report["tracemalloc_top"]:
+                lines.append(f"    {site['size_bytes'] / 1024:10.1f} KB  {site['where']}")
+        return "\n".join(lines)
+
+
+class _NullStats:
+    """Mērījumi izslēgti - posmi un skaitītāji neko nemaksā."""
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def add(self, name, amount=1):
+        pass
+
+    def absorb(self, report):
+        pass
+
+
+_active = _NullStats()
+
+
+def current():
+    return _active
+
+
+@contextmanager
+def activate(stats):
+    global _active
+    previous, _active = _active, stats
+    try:
+        yield stats
+    finally:
+        _active = previous
+
+
+@contextmanager
+def capture(stats, profile_path=None, trace_memory=False, top=10):
+    """
+    activate() + neobligāti cProfile (saglabā pstats failā) un tracemalloc
+    (maksimums un `top` vietas kodā, kas aizņem visvairāk atmiņas).
+    """
+    profiler = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with activate(stats):
+            if profiler:
+                profiler.enable()
+            try:
+                yield stats
+            finally:
+                if profiler:
+                    profiler.disable()
+    finally:
+        stats.stop()
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            stats.extra["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            stats.extra["tracemalloc_top"] = [
+                {"where": str(entry.traceback), "size_bytes": entry.size, "count": entry.count}
+                for entry in snapshot.statistics("lineno")[:top]]
+        if profiler:
+            profiler.dump_stats(profile_path)
+
+
+def profile_summary(profile_path, limit=20):
+    """Saglabātā profila kopsavilkums (funkcijas pēc kumulatīvā laika)."""
+    out = io.StringIO()
+    pstats.Stats(profile_path, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def add_arguments(parser):
+    """Kopīgie CLI karogi mērījumiem."""
+    parser.add_argument("--stats", action="store_true", help="Izdrukāt posmu laikus un skaitītājus (stderr)")
+    parser.add_argument("--stats-json", metavar="FAILS", help="Saglabāt mērījumus JSON failā vai '-' (stdout)")
+    parser.add_argument("--profile", metavar="FAILS", help="cProfile rezultāts (pstats formātā)")
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc: atmiņas maksimums un lielākās vietas")
+
+
+def wanted(args):
+    return bool(args.stats or args.stats_json or args.profile or args.trace_memory)
+
+
+@contextmanager
+def from_args(args):
+    """Ja kāds no mērījumu karogiem ir dots, mēra with bloku un beigās izvada rezultātu."""
+    if not wanted(args):
+        yield None
+        return
+    stats = Stats()
+    try:
+        with capture(stats, args.profile, args.trace_memory):
+            yield stats
+    finally:
+        if args.stats or args.trace_memory:
+            print(stats.format(), file=sys.stderr)
+        if args.profile:
+            print(profile_summary(args.profile), file=sys.stderr)
+        if args.stats_json == "-":
+            print(jsoncodec.dumps(stats.report()))
+        elif args.stats_json:
+            with open(args.stats_json, "w", encoding="utf-8") as f:
+                jsoncodec.dump(stats.report(), f)
+
+
+class TestStats(unittest.TestCase):
+
+    def test_exclusive_stages(self):
+        stats = Stats()
+        with stats.stage("merge"):
+            time.sleep(0.01)
+            with stats.stage("parse"):
+                time.sleep(0.02)
+        stats.stop()
+        report = stats.report()
+        self.assertGreaterEqual(report["stages"]["parse"], 0.02)
+        self.assertLess(report["stages"]["merge"], 0.02)
+        self.assertLessEqual(sum(report["stages"].values()), report["total_seconds"])
+
+    def test_activate_and_capture(self):
+        self.assertIsInstance(current(), _NullStats)
+        def allocate():
+            current().add("records", 3)
+            return [str(i) for i in range(10000)]
+
+        stats = Stats()
+        fd, profile_path = tempfile.mkstemp(suffix=".prof")
+        os.close(fd)
+        with capture(stats, profile_path, trace_memory=True):
+            allocate()
+        self.assertIsInstance(current(), _NullStats)
+        report = stats.report()
+        self.assertEqual(report["counters"], {"records": 3})
+        self.assertGreater(report["tracemalloc_peak_bytes"], 10000)
+        self.assertIn("allocate", profile_summary(profile_path))
+        os.remove(profile_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
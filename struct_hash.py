@@ -0,0 +1,59 @@
+import json
+import unittest
+from collections.abc import Mapping
+
+
+def freeze(value, memo=None, exact=True):
+    """
+    Pārvērš JSON vērtību (dict/list/skalārs) par hashējamu atslēgu, lai dublikātus
+    varētu meklēt set/dict struktūrā, nevis ar json.dumps vai lineāru salīdzināšanu.
+
+    exact=True atšķir tipus tāpat kā json.dumps(sort_keys=True): 1, 1.0 un True ir
+    dažādas vērtības. exact=False atbilst parastajam "==" (1 == 1.0 == True).
+    memo (dict) glabā jau aprēķinātās konteineru atslēgas pēc id(), lai viens un tas
+    pats mezgls rekursijas laikā netiktu apstrādāts atkārtoti.
+    """
+    if isinstance(value, Mapping):
+        if memo is not None and id(value) in memo:
+            return memo[id(value)][1]
+        key = ('d', frozenset((k, freeze(v, memo, exact)) for k, v in value.items()))
+    elif isinstance(value, list):
+        if memo is not None and id(value) in memo:
+            return memo[id(value)][1]
+        key = ('l', tuple(freeze(item, memo, exact) for item in value))
+    elif exact and isinstance(value, bool):
+        return ('b', value)
+    elif exact and isinstance(value, float):
+        return ('f', repr(value))  #json.dumps raksta float tieši tāpat kā repr()
+    else:
+        return value
+    if memo is not None:
+        memo[id(value)] = (value, key)  #tur atsauci uz objektu, lai id() netiktu izmantots atkārtoti
+    return key
+
+
+class TestFreeze(unittest.TestCase):
+
+    def test_matches_json_dumps(self): #vienādas atslēgas <=> vienāds json.dumps(sort_keys=True)
+        values = [1, 1.0, True, 0.0, -0.0, None, "1", [1, 2], [2, 1], {"a": 1, "b": [1]}, {"b": [1], "a": 1},
+                  {"a": 1.0, "b": [1]}, [{"x": None}], [{"x": False}]]
+        for a in values:
+            for b in values:
+                same = json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+                self.assertEqual(freeze(a) == freeze(b), same, (a, b))
+
+    def test_loose_matches_equality(self):
+        values = [1, 1.0, True, "1", [1], [True], {"a": [1.0]}, {"a": [1]}]
+        for a in values:
+            for b in values:
+                self.assertEqual(freeze(a, exact=False) == freeze(b, exact=False), a == b, (a, b))
+
+    def test_memo(self):
+        shared = {"acmModulations": ["QPSK", "16APSK"]}
+        memo = {}
+        self.assertEqual(freeze([shared, shared], memo), ('l', (freeze(shared), freeze(shared))))
+        self.assertIn(id(shared), memo)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,282 @@
 import json
 import os
+import re
 import unittest  # vajadzig, lai varu veidot testu
 
-def validate_json_file(file_path):
+import compressed_io
+import jsoncodec
+from schema import compile_schema
+
+DEFAULT_CHUNK_SIZE = 64 * 1024  # cik simbolus nolasa vienā reizē streaming režīmā
+
+_WS = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')
+_STRING_CHUNK = re.compile(r'[^"\\\x00-\x1f]*')  #viss, kas nav pēdiņa, "\" vai kontrolsimbols
+_HEX4 = re.compile(r'[0-9a-fA-F]{4}')
+_LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity')
+
+
+class JSONStreamError(ValueError):
+    """Sintakses kļūda no streaming validatora (tie paši lauki kā json.JSONDecodeError)."""
+
+    def __init__(self, msg, pos, lineno, colno):
+        super().__init__(f"{msg}: line {lineno} column {colno} (char {pos})")
+        self.msg = msg
+        self.pos = pos
+        self.lineno = lineno
+        self.colno = colno
+
+
+class _ChunkReader:
+    """
+    Lasa failu fiksēta izmēra gabalos. Buferī glabājas tikai vēl neapstrādātā daļa,
+    tāpēc atmiņa ir ierobežota ar gabala izmēru (neatkarīgi no faila izmēra).
+    """
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0  #pozīcija buferī
+        self.base = 0  #bufera sākuma absolūtā pozīcija failā
+        self.eof = False
+        self._cursor = 0  #līdz kurai absolūtajai pozīcijai rindas jau saskaitītas
+        self._line = 1
+        self._last_newline = -1
+
+    def fill(self):
+        """Izmet apstrādāto bufera daļu un nolasa nākamo gabalu. False = faila beigas."""
+        if self.eof:
+            return False
+        self.locate(self.base + self.pos)  #saskaita rindas, pirms izmet bufera sākumu
+        self.buf = self.buf[self.pos:]
+        self.base += self.pos
+        self.pos = 0
+        data = self.file.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf += data
+        return True
+
+    def ensure(self, n):
+        """Nodrošina, ka buferī no pašreizējās pozīcijas ir vismaz n simboli (ja fails to atļauj)."""
+        while len(self.buf) - self.pos < n and self.fill():
+            pass
+
+    def peek(self):
+        if self.pos >= len(self.buf):
+            self.fill()
+        return self.buf[self.pos:self.pos + 1]
+
+    def skip_ws(self):
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return
+
+    def locate(self, abs_pos):
+        """Atgriež (rinda, kolonna) absolūtajai pozīcijai; pozīcijām jābūt augošā secībā."""
+        start = self._cursor - self.base
+        end = abs_pos - self.base
+        newlines = self.buf.count('\n', start, end)
+        if newlines:
+            self._line += newlines
+            self._last_newline = self.base + self.buf.rfind('\n', start, end)
+        self._cursor = abs_pos
+        return self._line, abs_pos - self._last_newline
+
+    def error(self, msg, abs_pos=None, location=None):
+        if abs_pos is None:
+            abs_pos = self.base + self.pos
+        lineno, colno = location or self.locate(abs_pos)
+        return JSONStreamError(msg, abs_pos, lineno, colno)
+
+    def scan_string(self):
+        """Izlaiž JSON virkni, sākot ar atverošo pēdiņu (virkne netiek saglabāta)."""
+        quote = self.base + self.pos
+        quote_location = None
+        self.pos += 1
+        while True:
+            self.pos = _STRING_CHUNK.match(self.buf, self.pos).end()
+            if len(self.buf) - self.pos < 7 and not self.eof:  #escape (\\uXXXX) + nākamais simbols
+                if quote_location is None:
+                    quote_location = self.locate(quote)  #atceras pēdiņas vietu, pirms to izmet no bufera
+                self.ensure(7)
+                continue
+            if self.pos >= len(self.buf):
+                raise self.error("Unterminated string starting at", quote, quote_location)
+            char = self.buf[self.pos]
+            if char == '"':
+                self.pos += 1
+                return
+            if char != '\\':
+                raise self.error("Invalid control character at")
+            escape = self.buf[self.pos + 1:self.pos + 2]
+            if not escape:
+                raise self.error("Unterminated string starting at", quote, quote_location)
+            if escape == 'u':
+                if self.pos + 6 >= len(self.buf) or not _HEX4.match(self.buf, self.pos + 2):
+                    raise self.error("Invalid \\uXXXX escape", self.base + self.pos + 1)
+                self.pos += 6
+            elif escape in '"\\/bfnrt':
+                self.pos += 2
+            else:
+                raise self.error("Invalid \\escape")
+
+    def scan_scalar(self):
+        """Izlaiž skaitli vai literāli (true/false/null/NaN/Infinity). False, ja tur nav vērtības."""
+        self.ensure(10)
+        for literal in _LITERALS:
+            if self.buf.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return True
+        if self.buf.startswith('-Infinity', self.pos):
+            self.pos += 9
+            return True
+        match = _NUMBER.match(self.buf, self.pos)
+        while match and match.end() + 2 >= len(self.buf) and not self.eof:
+            self.ensure(len(self.buf) - self.pos + self.chunk_size)  #skaitlis var turpināties nākamajā gabalā
+            match = _NUMBER.match(self.buf, self.pos)
+        if not match:
+            return False
+        self.pos = match.end()
+        return True
+
+
+def validate_json_stream(file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Pārbauda JSON sintaksi, lasot failu gabalos un neveidojot Python objektus.
+    Atmiņā ir tikai viens gabals un ligzdojuma steks ('{' / '['), kļūdas gadījumā
+    tiek izmests JSONStreamError ar tādu pašu ziņojumu/rindu/kolonnu kā json.loads.
+    """
+    reader = _ChunkReader(file, chunk_size)
+    stack = []
+    if reader.peek() == '\ufeff':
+        raise reader.error("Unexpected UTF-8 BOM (decode using utf-8-sig)")
+    expect_value = True
+
+    while True:
+        if expect_value:
+            reader.skip_ws()
+            char = reader.peek()
+            if char == '{':
+                reader.pos += 1
+                reader.skip_ws()
+                char = reader.peek()
+                if char == '}':
+                    reader.pos += 1
+                    expect_value = False
+                    continue
+                if char != '"':
+                    raise reader.error("Expecting property name enclosed in double quotes")
+                stack.append('{')
+                reader.scan_string()
+                reader.skip_ws()
+                if reader.peek() != ':':
+                    raise reader.error("Expecting ':' delimiter")
+                reader.pos += 1
+            elif char == '[':
+                reader.pos += 1
+                reader.skip_ws()
+                if reader.peek() == ']':
+                    reader.pos += 1
+                    expect_value = False
+                else:
+                    stack.append('[')
+            elif char == '"':
+                reader.scan_string()
+                expect_value = False
+            elif reader.scan_scalar():
+                expect_value = False
+            else:
+                raise reader.error("Expecting value")
+            continue
+
+        # Pēc vērtības: jābūt ',' vai aizverošajai iekavai (vai faila beigām)
+        reader.skip_ws()
+        char = reader.peek()
+        if not stack:
+            if char:
+                raise reader.error("Extra data")
+            return
+        if stack[-1] == '{':
+            if char == '}':
+                stack.pop()
+                reader.pos += 1
+            elif char == ',':
+                reader.pos += 1
+                reader.skip_ws()
+                if reader.peek() != '"':
+                    raise reader.error("Expecting property name enclosed in double quotes")
+                reader.scan_string()
+                reader.skip_ws()
+                if reader.peek() != ':':
+                    raise reader.error("Expecting ':' delimiter")
+                reader.pos += 1
+                expect_value = True
+            else:
+                raise reader.error("Expecting ',' delimiter")
+        else:
+            if char == ']':
+                stack.pop()
+                reader.pos += 1
+            elif char == ',':
+                reader.pos += 1
+                expect_value = True
+            else:
+                raise reader.error("Expecting ',' delimiter")
+
+
+def check_json_file(file_path, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, document=None, schema=None):
+    """
+    Pārbauda failu un atgriež rezultātu kā dict (status: valid / invalid / schema / missing / unreadable).
+    document: jau atvērts mmap_load.MappedDocument - tad parsē tieši no kartētajiem baitiem,
+    un parsētais rezultāts paliek pieejams ielādei (doc.load()) bez atkārtotas parsēšanas.
+    schema: shēma (dict, ceļš vai schema.Validator) - parsētais dokuments uzreiz tiek pārbaudīts
+    arī pēc tipiem, "errors" satur visas atrastās kļūdas. Ar shēmu streaming netiek izmantots,
+    jo pārbaudei vajag parsētu dokumentu.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file: #r = read režīms // cik saprat, apstrada faila saturu
-            content = file.read()
-            json.loads(content)  #lade json
-        return "Pareizs!"  #Ja faila formats ir pareizs
-    except json.JSONDecodeError as e:
-        return f"Kļūda JSON sintaksē: {e.msg} (pozīcija: rinda {e.lineno}, kolonna {e.colno})"  #Ja atrasta kāda(pirmā) kļūda failā
+        validator = compile_schema(schema) if schema is not None else None
+        if document is not None:
+            data = document.load()
+        else:
+            with compressed_io.open_read(file_path, text=True) as file: #lasīšanai (saspiests fails tiek atspiests plūsmā)
+                if streaming and validator is None:
+                    validate_json_stream(file, chunk_size)  #lasa pa gabaliem, atmiņā netur visu failu
+                    return {"file": file_path, "status": "valid"}
+                content = file.read()
+                data = jsoncodec.loads(content)  #lade json (ātrais parsētājs, kļūdas gadījumā json modulis)
+        if validator is not None:
+            errors = validator.errors(data)
+            if errors:
+                return {"file": file_path, "status": "schema", "errors": errors}
+        return {"file": file_path, "status": "valid"}
+    except (json.JSONDecodeError, JSONStreamError) as e:
+        return {"file": file_path, "status": "invalid", "msg": e.msg, "line": e.lineno, "column": e.colno}
     except FileNotFoundError:
-        return "Fails netika atrasts. Lūdzu, pārbaudiet faila ceļu."  #Ja neatrada failu
+        return {"file": file_path, "status": "missing"}
     except Exception as e:
-        return f"Nezināma kļūda: {str(e)}"  #Kautkads cits iemesls
+        return {"file": file_path, "status": "unreadable", "error": str(e)}
+
+
+def format_result(result):
+    """check_json_file rezultāts kā cilvēkam lasāms teksts."""
+    if result["status"] == "valid":
+        return "Pareizs!"  #Ja faila formats ir pareizs
+    if result["status"] == "invalid":
+        return f"Kļūda JSON sintaksē: {result['msg']} (pozīcija: rinda {result['line']}, kolonna {result['column']})"  #Ja atrasta kāda(pirmā) kļūda failā
+    if result["status"] == "schema":
+        details = "; ".join(f"{error['path'] or '/'}: {error['msg']}" for error in result["errors"])
+        return f"Neatbilst shēmai ({len(result['errors'])} kļūdas): {details}"
+    if result["status"] == "missing":
+        return "Fails netika atrasts. Lūdzu, pārbaudiet faila ceļu."  #Ja neatrada failu
+    return f"Nezināma kļūda: {result['error']}"  #Kautkads cits iemesls
+
+
+def validate_json_file(file_path, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, schema=None):
+    return format_result(check_json_file(file_path, streaming, chunk_size, schema=schema))
 
 # Vajadzigs lai uzreiz testetu(cik es sapratu) // name piešķir main = prioritāti
 if __name__ == "__main__":
@@ -42,6 +305,39 @@ if __name__ == "__main__":
             self.assertTrue(result.startswith("Kļūda JSON sintaksē:"))
             os.remove(invalid_file) #nonem(dzēš) pagaidu failu
 
+        def test_streaming_matches_full(self): #streaming režīmam jādod tāda pati atbilde kā pilnai ielādei
+            stream_file = 'test_stream.json'
+            cases = ['[{"name": "item1", "value": 100},\n {"name": "item2", "value": 2.5e-3}]',
+                     '{"a": [1, 2,\n "b\\u00e9"]}  x', '{"a": "unterminated\n', '[1,\n2,]']
+            for content in cases:
+                with open(stream_file, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                expected = validate_json_file(stream_file)
+                for chunk_size in (1, 5, DEFAULT_CHUNK_SIZE): #mazs gabals pārbauda gabalu robežas
+                    self.assertEqual(validate_json_file(stream_file, streaming=True, chunk_size=chunk_size), expected)
+            os.remove(stream_file)
+
+        def test_mapped_document(self): #validācija un ielāde no viena mmap skata
+            from mmap_load import MappedDocument
+            mapped_file = 'test_mapped.json'
+            with open(mapped_file, 'w', encoding='utf-8') as f:
+                f.write('{"Modem": {"Status": {"rxLevel": "-83 dBm"}}}')
+            with MappedDocument(mapped_file) as doc:
+                self.assertEqual(check_json_file(mapped_file, document=doc)["status"], "valid")
+                self.assertEqual(doc.load()["Modem"]["Status"]["rxLevel"], "-83 dBm")
+            os.remove(mapped_file)
+
+        def test_schema(self): #tipu kļūdas tiek ziņotas visas, ne tikai pirmā
+            schema_file = 'test_schema.json'
+            with open(schema_file, 'w', encoding='utf-8') as f:
+                f.write('{"Modem": {"Status": {"profile_min": 0, "bandwidth_khz": "40000", "rxLevel": []}}}')
+            schema = {"properties": {"Modem": {"additionalProperties": {"additionalProperties": {"type": "string"}}}}}
+            result = check_json_file(schema_file, schema=schema)
+            self.assertEqual(result["status"], "schema")
+            self.assertEqual([e["path"] for e in result["errors"]], ["/Modem/Status/profile_min", "/Modem/Status/rxLevel"])
+            self.assertTrue(validate_json_file(schema_file, streaming=True, schema=schema).startswith("Neatbilst shēmai (2 kļūdas)"))
+            os.remove(schema_file)
+
         def test_file_not_found(self): #tests, kur netiek atrasts fails
             missing_file = 'non_existing_file.json'
             result = validate_json_file(missing_file) 
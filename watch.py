@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Novērošanas režīms: seko direktorijai (inotify, ja pieejams, citādi periodiska pārbaude)
+un pēc katras izmaiņu sērijas pārbauda un pārparsē tikai mainītos failus, tad no jauna
+uzbūvē apvienoto izvadi. Nemainītie faili paliek parsēti atmiņā.
+
+    ./watch.py . -o merged.json
+    ./watch.py dati/ --validate-only --poll
+"""
+import argparse
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import tempfile
+import time
+import unittest
+
+import locking
+from argumntunodnokomandrindas import merge_json
+from atomic_write import DURABILITY_LEVELS, write_json_atomic
+from incremental import MANIFEST_SUFFIX
+from mmap_load import load_file
+from query_index import INDEX_SUFFIX
+from valideJSNO import validate_json_file
+
+# inotify(7) konstantes
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+_EVENT_HEADER = struct.Struct("iIII")  #wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """Linux inotify caur ctypes. wait() atgriež mainīto failu vārdus vai None (jāpārskata viss)."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 neizdevās")
+        mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch neizdevās: {directory}")
+
+    def wait(self, timeout):
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        pos = 0
+        while pos < len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                return None  #notikumi pazaudēti
+            if length:
+                names.add(os.fsdecode(data[pos:pos + length].rstrip(b"\0")))
+            pos += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Rezerves variants bez inotify: salīdzina (mtime, izmērs) momentuzņēmumus ar os.scandir."""
+
+    def __init__(self, directory, interval=0.5):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    st = entry.stat()
+                    snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {name for name in current.keys() | self.snapshot.keys()
+                       if current.get(name) != self.snapshot.get(name)}
+            self.snapshot = current
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory, poll=False, interval=0.5):
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError, TypeError):
+            pass  #nav libc ar inotify (piem. musl bez simbola) - izmanto pārbaudi
+    return PollingWatcher(directory, interval)
+
+
+class WatchMerger:
+    """
+    Parsēto failu kešs un apvienošanas prefiksi: prefixes[i] ir pirmo i+1 failu (pēc vārda)
+    apvienojums, tāpēc izmaiņa failā i prasa pārrēķināt tikai no i uz priekšu.
+    """
+
+    def __init__(self, directory, output=None, pattern="*.json", durability="none", log=print):
+        self.directory = directory
+        self.output = os.path.abspath(output) if output else None
+        #izvade un tās blakusfaili (indekss, slēdzene, rinda) nav ievades
+        self.outputs = ({self.output + suffix for suffix in ("", INDEX_SUFFIX, locking.LOCK_SUFFIX, locking.QUEUE_SUFFIX)}
+                        if output else set())
+        self.pattern = pattern
+        self.durability = durability
+        self.log = log
+        self.cache = {}
+        self.names = []
+        self.prefixes = []
+
+    def wanted(self, name):
+        path = os.path.abspath(os.path.join(self.directory, name))
+        return (fnmatch.fnmatch(name, self.pattern) and not name.startswith(".")
+                and not name.endswith(MANIFEST_SUFFIX) and path not in self.outputs)
+
+    def refresh(self, names=None):
+        """Pārparsē norādītos failus (None - visu direktoriju). Atgriež True, ja kešs mainījās."""
+        if names is None:
+            with os.scandir(self.directory) as entries:
+                names = set(self.cache) | {entry.name for entry in entries}
+        changed = False
+        for name in sorted(n for n in names if self.wanted(n)):
+            path = os.path.join(self.directory, name)
+            if not os.path.isfile(path):
+                changed |= self.cache.pop(name, None) is not None
+                continue
+            try:
+                self.cache[name] = load_file(path)
+                self.log(f"{name}: Pareizs!")
+                changed = True
+            except (ValueError, OSError) as e:
+                #nederīgu failu izlaiž, līdz to izlabo
+                changed |= self.cache.pop(name, None) is not None
+                self.log(f"{name}: {validate_json_file(path) if isinstance(e, ValueError) else f'Nezināma kļūda: {e}'}")
+        return changed
+
+    def rebuild(self):
+        """Apvieno kešotos dokumentus un ieraksta izvadi."""
+        names = sorted(self.cache)
+        # Prefikss der, kamēr sakrīt gan vārdi, gan dokumenti (refresh vienmēr ieliek jaunu objektu)
+        start = 0
+        limit = min(len(names), len(self.prefixes))
+        while (start < limit and names[start] == self.names[start]
+               and self.prefixes[start][1] is self.cache[names[start]]):
+            start += 1
+        self.names = names
+        self.prefixes = self.prefixes[:start]
+        result = self.prefixes[-1][0] if self.prefixes else {}
+        for name in names[start:]:
+            document = self.cache[name]
+            result = merge_json(result, document, "share")  #kešotie dokumenti netiek mainīti
+            self.prefixes.append((result, document))
+        if self.output:
+            with locking.FileLock(self.output):  #tā pati slēdzene, ko ņem CLI un daemon
+                write_json_atomic(self.output, result, self.durability)
+            self.log(f"APVIENOŠANA VEIKSMĪGA: {len(names)} faili uz {self.output}")
+        return result
+
+
+def watch(directory, output=None, pattern="*.json", debounce=0.2, poll=False, interval=0.5,
+          durability="none", log=print, should_stop=lambda: False):
+    merger = WatchMerger(directory, output, pattern, durability, log)
+    watcher = make_watcher(directory, poll, interval)
+    log(f"Novēro {os.path.abspath(directory)} ({type(watcher).__name__})")
+    try:
+        merger.refresh()
+        if output:
+            merger.rebuild()
+        while not should_stop():
+            names = watcher.wait(1.0)
+            if names is not None and not names:
+                continue
+            # Debounce: gaida, līdz rakstīšanas sērija apklust
+            while names is not None:
+                more = watcher.wait(debounce)
+                if more is None:
+                    names = None
+                elif more:
+                    names |= more
+                    continue
+                break
+            if merger.refresh(names) and output:
+                merger.rebuild()
+    finally:
+        watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Novērot direktoriju un uzturēt apvienoto JSON aktuālu")
+    parser.add_argument("directory", nargs="?", default=".", help="Novērojamā direktorija")
+    parser.add_argument("-o", "--output", help="Apvienotās izvades fails (bez tā - tikai validācija)")
+    parser.add_argument("--validate-only", action="store_true", help="Tikai pārbaudīt mainītos failus")
+    parser.add_argument("--pattern", default="*.json", help="Kurus failus novērot")
+    parser.add_argument("--debounce", type=float, default=0.2, help="Klusuma laiks pirms apstrādes (sekundes)")
+    parser.add_argument("--poll", action="store_true", help="Neizmantot inotify")
+    parser.add_argument("--interval", type=float, default=0.5, help="Pārbaudes intervāls --poll režīmā")
+    parser.add_argument("--durability", choices=DURABILITY_LEVELS, default="none")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"KĻŪDA: Direktorija {args.directory} neeksistē!")
+        sys.exit(1)
+    output = None if args.validate_only else (args.output or "merged.json")
+    try:
+        watch(args.directory, output, args.pattern, args.debounce, args.poll, args.interval, args.durability)
+    except KeyboardInterrupt:
+        pass
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.messages = []
+
+    def tearDown(self):
+        for name in os.listdir(self.workdir):
+            os.remove(os.path.join(self.workdir, name))
+        os.rmdir(self.workdir)
+
+    def write(self, name, text):
+        with open(os.path.join(self.workdir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_merger_reparses_only_changed(self):
+        self.write("a.json", '{"Modem": {"x": "1"}}')
+        self.write("b.json", '{"Modem": {"y": "2"}}')
+        merger = WatchMerger(self.workdir, os.path.join(self.workdir, "merged.json"), log=self.messages.append)
+        merger.refresh()
+        first = merger.cache["a.json"]
+        self.assertEqual(merger.rebuild(), {"Modem": {"x": "1", "y": "2"}})
+        self.write("b.json", '{"Modem": {"y": "3"}}')
+        self.write("c.json", '{"Modem": ')
+        merger.refresh({"b.json", "c.json", "merged.json"})
+        self.assertIs(merger.cache["a.json"], first)
+        self.assertNotIn("c.json", merger.cache)
+        self.assertTrue(any(m.startswith("c.json: Kļūda JSON sintaksē") for m in self.messages))
+        self.assertEqual(merger.rebuild(), {"Modem": {"x": "1", "y": "3"}})
+        os.remove(os.path.join(self.workdir, "b.json"))
+        merger.refresh({"b.json"})
+        self.assertEqual(merger.rebuild(), {"Modem": {"x": "1"}})
+
+    def test_output_sidecars_ignored(self): #indekss "merged.json.idx.json" arī atbilst "*.json"
+        self.write("a.json", '{"x": 1}')
+        self.write("merged.json.idx.json", '{"index": 1}')
+        merger = WatchMerger(self.workdir, os.path.join(self.workdir, "merged.json"), pattern="*", log=self.messages.append)
+        merger.refresh()
+        self.assertEqual(merger.rebuild(), {"x": 1})
+        merger.refresh()
+        self.assertEqual(set(merger.cache), {"a.json"})
+
+    def test_watchers_report_changes(self):
+        watchers = [PollingWatcher(self.workdir, interval=0.01)]
+        if sys.platform.startswith("linux"):
+            watchers.append(make_watcher(self.workdir))
+        for watcher in watchers:
+            self.write("d.json", "{}")
+            self.assertIn("d.json", watcher.wait(2.0))
+            watcher.close()
+
+
+if __name__ == "__main__":
+    main()